@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+cold-start benchmark of df-select
+
+measure the time of `import dfselect` and of the first query in fresh interpreters, as paid by the short-lived CLI
+jobs and serverless invocations, and fail if the import exceeds the budget or imports the engine eagerly
+
+    python -m benchmarks.startup --repeat 5 --max-import-ms 100
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# the script run in a fresh interpreter, it reports the timings and the heavy modules imported by `import dfselect`
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import dfselect
+imported = time.perf_counter()
+eager = sorted(m for m in ('pandas', 'numpy', 'dfselect.exec.pandas', 'importlib.metadata') if m in sys.modules)
+import pandas as pd
+ready = time.perf_counter()
+dfselect.df_select('select a, b + 1 as c from t where a > 0', t=pd.DataFrame({'a': [0, 1, 2], 'b': [1, 2, 3]}))
+done = time.perf_counter()
+print(json.dumps(dict(import_ms=(imported - start) * 1000, first_query_ms=(done - ready) * 1000, eager=eager)))
+"""
+
+
+def measure_startup(repeat: int = 5):
+    """
+    measure the cold start in fresh interpreters
+    :param repeat: the times to start the interpreter
+    :return: the best import time and first query time in milliseconds, and the modules imported eagerly
+    """
+    records = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _PROBE], check=True, capture_output=True, text=True).stdout
+        records.append(json.loads(output.strip().splitlines()[-1]))
+    return (min(r['import_ms'] for r in records), min(r['first_query_ms'] for r in records),
+            sorted({m for r in records for m in r['eager']}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='cold-start benchmark of df-select')
+    parser.add_argument('--repeat', type=int, default=5, help='the times to start the interpreter')
+    parser.add_argument('--max-import-ms', type=float, default=100, help='the budget of `import dfselect`')
+    args = parser.parse_args(argv)
+
+    import_ms, first_query_ms, eager = measure_startup(args.repeat)
+    print('{:>12} {:>16}  {}'.format('import_ms', 'first_query_ms', 'eager'))
+    print('{:>12.3f} {:>16.3f}  {}'.format(import_ms, first_query_ms, ', '.join(eager) or '-'))
+    if eager:
+        print('error: `import dfselect` imports {} eagerly'.format(', '.join(eager)))
+        return 1
+    if import_ms > args.max_import_ms:
+        print('error: `import dfselect` takes {:.3f}ms, over the budget {}ms'.format(import_ms, args.max_import_ms))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
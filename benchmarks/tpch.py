@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""
+TPC-H-like end-to-end benchmark of df-select
+
+generate the TPC-H-like tables at the given scale factors, run a fixed query set through `df_select` on each
+engine, record the latency and peak memory, and validate the results against the same queries run in sqlite3
+
+    python -m benchmarks.tpch --scale 0.01 0.1 --engine pandas --repeat 3
+"""
+import argparse
+import importlib
+import json
+import math
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from dfselect import df_select, ctx_init
+from dfselect.context import ctx_set_config
+
+# the row count of each table at scale factor 1
+_BASE_ROWS = dict(
+    supplier=10000,
+    part=200000,
+    customer=150000,
+    orders=1500000,
+)
+
+_SEGMENTS = ['AUTOMOBILE', 'BUILDING', 'FURNITURE', 'HOUSEHOLD', 'MACHINERY']
+_PRIORITIES = ['1-URGENT', '2-HIGH', '3-MEDIUM', '4-NOT SPECIFIED', '5-LOW']
+_REGIONS = ['AFRICA', 'AMERICA', 'ASIA', 'EUROPE', 'MIDDLE EAST']
+_BRANDS = ['Brand#{}{}'.format(i, j) for i in range(1, 6) for j in range(1, 6)]
+
+# the query set: (query key, query, whether the result order is defined by the query)
+QUERIES = [
+    ('q1', """
+select l_returnflag, l_linestatus, sum(l_quantity), sum(l_extendedprice), avg(l_discount), count(*)
+from lineitem where l_shipdate <= 19980902 group by l_returnflag, l_linestatus
+""", False),
+    ('q3', """
+select o_orderkey, o_totalprice, o_orderdate from orders as o join customer as c on o.o_custkey = c.c_custkey
+where c_mktsegment = 'BUILDING' and o_orderdate < 19950315 order by o_totalprice desc, o_orderkey limit 10
+""", True),
+    ('q5', """
+select n_name, sum(c_acctbal), count(*) from customer as c join nation as n on c.c_nationkey = n.n_nationkey
+group by n_name
+""", False),
+    ('q6', """
+select l_orderkey, l_linenumber, l_extendedprice*l_discount from lineitem
+where l_shipdate >= 19940101 and l_shipdate < 19940201 and l_discount > 0.08 and l_quantity < 24
+""", False),
+    ('q10', """
+select c_custkey, c_acctbal, o_orderkey from customer as c left join orders as o on c.c_custkey = o.o_custkey
+where c_acctbal > 9900 order by c_custkey, o_orderkey limit 50
+""", True),
+    ('q12', """
+select o_orderpriority, count(*) from orders where o_orderstatus = 'F' or o_orderstatus = 'P'
+group by o_orderpriority
+""", False),
+    ('q14', """
+select l_orderkey, l_linenumber, l_quantity, p_brand, p_retailprice from lineitem as l
+join part as p on l.l_partkey = p.p_partkey where p_size > 45 and l_quantity > 48
+order by l_orderkey, l_linenumber limit 100
+""", True),
+    ('q18', """
+select l_orderkey, l_extendedprice from lineitem where l_quantity > 49 order by l_extendedprice desc,
+l_orderkey, l_linenumber limit 5, 20
+""", True),
+]
+
+# the engines by the registered engine name, of the adapter to convert the generated tables
+ENGINES = dict(
+    pandas=None,
+    odps=lambda df: importlib.import_module('odps.df').DataFrame(df),
+)
+
+
+def _to_date_int(days):
+    dates = pd.DatetimeIndex(np.datetime64('1992-01-01') + days.astype('timedelta64[D]'))
+    return np.asarray(dates.year * 10000 + dates.month * 100 + dates.day, dtype=np.int64)
+
+
+def generate_tables(scale: float, seed: int = 0):
+    """
+    generate the TPC-H-like tables
+    :param scale: the scale factor, 1 for ~6M lineitem rows
+    :param seed: the random seed
+    :return: the table dict keyed by the table name
+    """
+    rng = np.random.default_rng(seed)
+    n_supplier, n_part, n_customer, n_orders = [max(int(_BASE_ROWS[k] * scale), 10) for k in
+                                                ('supplier', 'part', 'customer', 'orders')]
+
+    region = pd.DataFrame({'r_regionkey': np.arange(5), 'r_name': _REGIONS})
+    nation = pd.DataFrame({'n_nationkey': np.arange(25), 'n_name': ['NATION_{:02d}'.format(i) for i in range(25)],
+                           'n_regionkey': np.arange(25) % 5})
+    supplier = pd.DataFrame({
+        's_suppkey': np.arange(1, n_supplier + 1),
+        's_nationkey': rng.integers(0, 25, n_supplier),
+        's_acctbal': np.round(rng.uniform(-999.99, 9999.99, n_supplier), 2),
+    })
+    part = pd.DataFrame({
+        'p_partkey': np.arange(1, n_part + 1),
+        'p_brand': rng.choice(_BRANDS, n_part),
+        'p_size': rng.integers(1, 51, n_part),
+        'p_retailprice': np.round(rng.uniform(900, 2100, n_part), 2),
+    })
+    customer = pd.DataFrame({
+        'c_custkey': np.arange(1, n_customer + 1),
+        'c_nationkey': rng.integers(0, 25, n_customer),
+        'c_acctbal': np.round(rng.uniform(-999.99, 9999.99, n_customer), 2),
+        'c_mktsegment': rng.choice(_SEGMENTS, n_customer),
+    })
+    order_days = rng.integers(0, 2400, n_orders)
+    orders = pd.DataFrame({
+        'o_orderkey': np.arange(1, n_orders + 1),
+        # only two thirds of the customers have orders, as the spec does
+        'o_custkey': rng.integers(1, n_customer * 2 // 3 + 1, n_orders),
+        'o_orderstatus': rng.choice(['F', 'O', 'P'], n_orders, p=[0.49, 0.49, 0.02]),
+        'o_totalprice': np.round(rng.uniform(800, 500000, n_orders), 2),
+        'o_orderdate': _to_date_int(order_days),
+        'o_orderpriority': rng.choice(_PRIORITIES, n_orders),
+    })
+
+    # 1 to 7 line items per order
+    line_counts = rng.integers(1, 8, n_orders)
+    n_lineitem = int(line_counts.sum())
+    l_orderkey = np.repeat(orders['o_orderkey'].to_numpy(), line_counts)
+    starts = np.repeat(np.cumsum(line_counts) - line_counts, line_counts)
+    l_quantity = rng.integers(1, 51, n_lineitem)
+    l_partkey = rng.integers(1, n_part + 1, n_lineitem)
+    ship_days = np.repeat(order_days, line_counts) + rng.integers(1, 122, n_lineitem)
+    lineitem = pd.DataFrame({
+        'l_orderkey': l_orderkey,
+        'l_partkey': l_partkey,
+        'l_suppkey': rng.integers(1, n_supplier + 1, n_lineitem),
+        'l_linenumber': np.arange(n_lineitem) - starts + 1,
+        'l_quantity': l_quantity,
+        'l_extendedprice': np.round(l_quantity * part['p_retailprice'].to_numpy()[l_partkey - 1], 2),
+        'l_discount': np.round(rng.integers(0, 11, n_lineitem) / 100, 2),
+        'l_tax': np.round(rng.integers(0, 9, n_lineitem) / 100, 2),
+        'l_returnflag': rng.choice(['A', 'N', 'R'], n_lineitem),
+        'l_linestatus': rng.choice(['F', 'O'], n_lineitem),
+        'l_shipdate': _to_date_int(ship_days),
+    })
+
+    return dict(region=region, nation=nation, supplier=supplier, part=part, customer=customer, orders=orders,
+                lineitem=lineitem)
+
+
+def _normalize_value(val):
+    if val is None:
+        return None
+    if isinstance(val, (float, np.floating)):
+        return None if math.isnan(val) else float(val)
+    if isinstance(val, (int, np.integer)):
+        return float(val)
+    return val
+
+
+def _normalize_rows(rows, ordered: bool):
+    rows = [tuple(_normalize_value(v) for v in row) for row in rows]
+    if not ordered:
+        rows.sort(key=lambda r: tuple((v is None, '' if v is None else str(type(v)), v) for v in r))
+    return rows
+
+
+def _rows_match(actual, expected, rel_tol=1e-6):
+    if len(actual) != len(expected):
+        return False
+    for actual_row, expected_row in zip(actual, expected):
+        if len(actual_row) != len(expected_row):
+            return False
+        for actual_val, expected_val in zip(actual_row, expected_row):
+            if isinstance(actual_val, float) and isinstance(expected_val, float):
+                if not math.isclose(actual_val, expected_val, rel_tol=rel_tol, abs_tol=1e-9):
+                    return False
+            elif actual_val != expected_val:
+                return False
+    return True
+
+
+def run_query(query: str, tables: dict, engine_key: str):
+    """
+    run a query with df-select on the engine
+    :param query: the query to run
+    :param tables: the table dict
+    :param engine_key: the engine key
+    :return: the result table
+    """
+    adapter = ENGINES[engine_key]
+    if adapter:
+        tables = {k: adapter(v) for k, v in tables.items()}
+    ctx = ctx_init(tables=tables)
+    ctx_set_config(ctx, 'exec_engine', engine_key)
+    return df_select(query, ctx=ctx)
+
+
+def measure_query(query: str, tables: dict, engine_key: str, repeat: int = 3):
+    """
+    measure the latency and peak memory of a query
+    :param query: the query to measure
+    :param tables: the table dict
+    :param engine_key: the engine key
+    :param repeat: the times to run the query for the latency
+    :return: the last result, the median latency in seconds, and the traced peak memory in bytes
+    """
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_query(query, tables, engine_key)
+        latencies.append(time.perf_counter() - start)
+
+    # trace the memory in a separated run, tracemalloc slows down the execution
+    tracemalloc.start()
+    try:
+        run_query(query, tables, engine_key)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, float(np.median(latencies)), peak_memory
+
+
+def run_benchmark(scales, engines, query_keys=None, repeat: int = 3, seed: int = 0):
+    """
+    run the benchmark
+    :param scales: the scale factors
+    :param engines: the engine keys
+    :param query_keys: the query keys to run, all the queries if not provided
+    :param repeat: the times to run each query
+    :param seed: the random seed of data generation
+    :return: the benchmark records
+    """
+    queries = [q for q in QUERIES if not query_keys or q[0] in query_keys]
+    records = []
+    for scale in scales:
+        tables = generate_tables(scale, seed=seed)
+        conn = sqlite3.connect(':memory:')
+        for table_key, df in tables.items():
+            df.to_sql(table_key, conn, index=False)
+
+        for query_key, query, ordered in queries:
+            expected = _normalize_rows(conn.execute(query).fetchall(), ordered)
+            for engine_key in engines:
+                record = dict(scale=scale, engine=engine_key, query=query_key,
+                              rows=None, latency_ms=None, peak_mb=None, status='ok')
+                try:
+                    result, latency, peak_memory = measure_query(query, tables, engine_key, repeat=repeat)
+                    actual = _normalize_rows(result.itertuples(index=False, name=None), ordered)
+                    record.update(rows=len(result), latency_ms=round(latency * 1000, 3),
+                                  peak_mb=round(peak_memory / 2 ** 20, 3))
+                    if not _rows_match(actual, expected):
+                        record['status'] = 'mismatch'
+                except Exception as e:
+                    record['status'] = 'error: {}'.format(e)
+                records.append(record)
+                print('{scale:>8} {engine:>8} {query:>5} {rows!s:>8} {latency_ms!s:>12} {peak_mb!s:>10}  {status}'
+                      .format(**record), flush=True)
+        conn.close()
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='TPC-H-like end-to-end benchmark of df-select')
+    parser.add_argument('--scale', type=float, nargs='+', default=[0.01], help='the scale factors')
+    parser.add_argument('--engine', nargs='+', default=['pandas'], choices=sorted(ENGINES.keys()),
+                        help='the engines to benchmark')
+    parser.add_argument('--query', nargs='+', help='the query keys to run')
+    parser.add_argument('--repeat', type=int, default=3, help='the times to run each query')
+    parser.add_argument('--seed', type=int, default=0, help='the random seed of data generation')
+    parser.add_argument('--output', help='the json file to dump the records')
+    args = parser.parse_args(argv)
+
+    print('{:>8} {:>8} {:>5} {:>8} {:>12} {:>10}  {}'.format(
+        'scale', 'engine', 'query', 'rows', 'latency_ms', 'peak_mb', 'status'))
+    records = run_benchmark(args.scale, args.engine, query_keys=args.query, repeat=args.repeat, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=2)
+    return 0 if all(r['status'] == 'ok' for r in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,93 @@
-from .context import ctx_init, ctx_config_get_exec_engine
-from .parse import parse_select
-from .exec import exec_operators
+from .cache import readonly_view
+from .errors import DFSelectExecError
+from .engine import register_engine
+from .context import ctx_init, ctx_config_get_exec_engine, ctx_config_get_result_cache, \
+    ctx_config_get_result_cache_size, ctx_config_get_compact_dtypes, ctx_table_version
+from .parse import parse_select, referenced_tables, query_key
+from .exec import exec_operators, exec_partial_aggregate
+from .sink import ResultSink, CsvSink, ParquetSink, CallbackSink, write_sink, frame_batches
 
 
-def df_select(query: str, ctx: dict = None, tables: dict = None, config: dict = None, **kwargs):
+def df_select(query: str, ctx: dict = None, tables: dict = None, config: dict = None, sink: ResultSink = None,
+              **kwargs):
     """
     process an select query on dataframe
     :param query: the single select query
     :param ctx: the provided context dict object
     :param tables: the tables loaded into context
     :param config: the config dict object
-    :return:
+    :param sink: the sink to write the result into batch by batch instead of returning it, see `dfselect.sink`. the
+    cached result of the query is written into the sink if the result cache is enabled, but the result streamed into
+    the sink is never collected, so it is not cached
+    :return: the query result, or the count of the rows written if the sink is provided
     """
-    operators = parse_select(query)
     if kwargs:
         if not tables:
             tables = {}
         tables = {**tables, **kwargs}
     ctx = ctx_init(ctx, tables=tables, config=config)
-    result = exec_operators(operators, ctx)
     engine = ctx_config_get_exec_engine(ctx)
+    if sink is not None:
+        result_cache = ctx_config_get_result_cache(ctx)
+        if result_cache is not None:
+            result = result_cache.get(_result_cache_key(ctx, engine, query), lambda t: ctx_table_version(ctx, t))
+            if result is not None:
+                return write_sink(frame_batches(result, sink.batch_rows), sink)
+        result = exec_operators(parse_select(query), ctx)
+        # the engine produces the batches of the result lazily if possible, e.g. of the chunked table
+        if hasattr(engine, 'output_batches'):
+            return write_sink(engine.output_batches(result, sink.batch_rows), sink)
+        return write_sink([engine.output(result) if hasattr(engine, 'output') else result], sink)
+
+    # the cached result is valid until any of the referenced tables changes, a hit skips parsing. the result of the
+    # table sampled without a seed is never cached, which differs on every run, so it never hits either
+    result_cache = ctx_config_get_result_cache(ctx)
+    if result_cache is not None:
+        cache_key = _result_cache_key(ctx, engine, query)
+        result = result_cache.get(cache_key, lambda t: ctx_table_version(ctx, t))
+        if result is not None:
+            return readonly_view(result)
+
+    operators = parse_select(query)
+    result = exec_operators(operators, ctx)
     if hasattr(engine, 'output'):
         result = engine.output(result)
+
+    if result_cache is not None and not _is_random(operators):
+        table_versions = [(t, ctx_table_version(ctx, t)) for t in referenced_tables(operators)]
+        if result_cache.put(cache_key, table_versions, result, max_size=ctx_config_get_result_cache_size(ctx)):
+            return readonly_view(result)
     return result
+
+
+def _result_cache_key(ctx, engine, query):
+    # the config changing the result of the same tables is a part of the key, e.g. the compacted dtypes
+    return engine.__name__, ctx_config_get_compact_dtypes(ctx), query_key(query)
+
+
+def _is_random(operators):
+    # the table sample of form (sample_size, sample_unit, seed) is of the LOAD operator
+    return any(op_code == 'LOAD' and len(op_args) > 1 and op_args[1] and op_args[1][2] is None
+               for op_code, op_args in operators)
+
+
+def df_select_partial(query: str, ctx: dict = None, tables: dict = None, config: dict = None, **kwargs):
+    """
+    compute the mergeable partial states of an aggregate query on a part of the tables, e.g. a partition processed
+    by a worker process. the partial states of all the parts are merged and finalized into the query result by
+    `partials[0].merge(*partials[1:]).finalize()`
+    :param query: the single select query of aggregation
+    :param ctx: the provided context dict object
+    :param tables: the tables loaded into context
+    :param config: the config dict object
+    :return: the partial states object, which can be pickled to merge in another process
+    """
+    if kwargs:
+        if not tables:
+            tables = {}
+        tables = {**tables, **kwargs}
+    ctx = ctx_init(ctx, tables=tables, config=config)
+    aggregate = exec_partial_aggregate(parse_select(query), ctx, exact=False)
+    if aggregate is None:
+        raise DFSelectExecError('the query can not be aggregated by partial states')
+    return aggregate
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+from .log import log
+from .util import is_copy_on_write
+
+# the default memory bound of the result cache, in bytes
+DEFAULT_RESULT_CACHE_SIZE = 256 * 2 ** 20
+
+
+def sizeof_result(result):
+    """
+    estimate the memory size of a query result
+    :param result: the query result
+    :return: the size in bytes
+    """
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    import sys
+    return sys.getsizeof(result)
+
+
+def readonly_view(result):
+    """
+    get a view of the cached result which can not modify the cached data
+    :param result: the cached result
+    :return: the view of result
+    """
+    if not hasattr(result, 'copy'):
+        return result
+    # with copy-on-write the shallow copy shares the buffers and copies them lazily on write,
+    # otherwise we have to copy the data to protect the cached result
+    return result.copy(deep=not is_copy_on_write())
+
+
+class ResultCache(object):
+    """
+    the LRU cache of query results, bounded by the memory size of the cached results
+
+    each entry is keyed by the normalized query and records the version of every referenced table,
+    the entry is stale once any of the table versions is bumped. the cache can be shared by the queries run in
+    threads, e.g. of the query server
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key, table_version_func):
+        """
+        get the cached result
+        :param key: the cache key
+        :param table_version_func: the function to get the current version of a table
+        :return: the cached result or None if missed or stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            table_versions, result, _ = entry
+            for table_key, version in table_versions:
+                if version is None or table_version_func(table_key) != version:
+                    self._pop(key)
+                    return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, table_versions, result, max_size: int = DEFAULT_RESULT_CACHE_SIZE):
+        """
+        cache the query result
+        :param key: the cache key
+        :param table_versions: the (table_key, version) pairs of the referenced tables
+        :param result: the query result
+        :param max_size: the memory bound of the cache in bytes
+        :return: whether the result is cached
+        """
+        with self._lock:
+            self._pop(key)
+        if any(version is None for _, version in table_versions):
+            # some table has no version (loaded by loader without cache), the result can not be validated later
+            return False
+        result_size = sizeof_result(result)
+        if result_size > max_size:
+            log.debug(f'result of size {result_size} exceeds the result cache size {max_size}, skip caching')
+            return False
+        with self._lock:
+            self._pop(key)
+            while self._entries and self._size + result_size > max_size:
+                self._pop(next(iter(self._entries)))
+            self._entries[key] = (tuple(table_versions), result, result_size)
+            self._size += result_size
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
@@ -0,0 +1,108 @@
+"""
+the command line of df-select
+
+    dfselect serve --table orders=orders.parquet --data-dir ./tables --port 8765
+"""
+import argparse
+import os
+import sys
+
+from .context import ctx_init, ctx_add_table, ctx_set_config, ctx_config_add_table_loader, \
+    ctx_config_set_exec_engine, ctx_attach_store
+from .errors import DFSelectContextError
+from .log import log
+from .server import DEFAULT_SERVER_WORKERS, DEFAULT_SERVER_MAX_PENDING, serve
+
+# the readers of the table files by the file extension, the names of the pandas functions
+_TABLE_READERS = {
+    '.csv': 'read_csv',
+    '.parquet': 'read_parquet',
+    '.feather': 'read_feather',
+    '.pkl': 'read_pickle',
+    '.pickle': 'read_pickle',
+    '.json': 'read_json',
+}
+
+
+def read_table_file(path: str):
+    """
+    read the table from the file by its extension
+    :param path: the file path
+    :return: the table data object
+    """
+    reader = _TABLE_READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise DFSelectContextError(f'unknown table file type: {path}, should be one of {sorted(_TABLE_READERS)}')
+    import pandas as pd
+    return getattr(pd, reader)(path)
+
+
+def file_table_loader(data_dir: str):
+    """
+    the table loader of the files in the directory, the table is loaded from the file named by the table with any of
+    the known extensions
+    :param data_dir: the directory of the table files
+    :return: the table loader
+    """
+    def _load(table_source: str):
+        for ext in _TABLE_READERS:
+            path = os.path.join(data_dir, table_source + ext)
+            if os.path.isfile(path):
+                log.info(f'load table {table_source} from {path}')
+                return read_table_file(path)
+        return None
+    return _load
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog='dfselect', description='process select queries on dataframes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='serve the queries over the tables kept in memory')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='the host to listen on')
+    serve_parser.add_argument('--port', type=int, default=8765, help='the port to listen on')
+    serve_parser.add_argument('--socket', dest='socket_path', help='the unix socket to listen on instead of the port')
+    serve_parser.add_argument('--workers', type=int, default=DEFAULT_SERVER_WORKERS,
+                              help='the count of the queries run at the same time')
+    serve_parser.add_argument('--max-pending', type=int, default=DEFAULT_SERVER_MAX_PENDING,
+                              help='the count of the queries waiting for a worker before rejecting')
+    serve_parser.add_argument('--table', action='append', default=[], metavar='NAME=PATH',
+                              help='register the table read from the file at start, can be repeated')
+    serve_parser.add_argument('--data-dir', help='load the other tables from the files <table>.<ext> in the '
+                                                 'directory on first use')
+    serve_parser.add_argument('--store-dir', help='open the other tables from the column stores in the directory, '
+                                                  'see `ctx_save_tables`')
+    serve_parser.add_argument('--engine', help='the name of the executor engine')
+    serve_parser.add_argument('--result-cache', action='store_true', help='cache the query results')
+    serve_parser.add_argument('--memory-budget', type=int, help='the memory budget of the operators in bytes')
+    serve_parser.add_argument('--compact-dtypes', action='store_true',
+                              help='compact the dtypes of the tables loaded from the directories')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        ctx = ctx_init()
+        if args.engine:
+            ctx_config_set_exec_engine(ctx, args.engine)
+        for table in args.table:
+            name, sep, path = table.partition('=')
+            if not sep or not name or not path:
+                parser.error(f'invalid table {table}, should be NAME=PATH')
+            ctx_add_table(ctx, name, read_table_file(path))
+        if args.store_dir:
+            ctx_attach_store(ctx, args.store_dir)
+        if args.data_dir:
+            # the tables loaded from the directory are kept by the loader cache
+            ctx_config_add_table_loader(ctx, file_table_loader(args.data_dir))
+            ctx_set_config(ctx, 'loader_cache', True)
+        if args.result_cache:
+            ctx_set_config(ctx, 'result_cache', True)
+        if args.memory_budget:
+            ctx_set_config(ctx, 'memory_budget', args.memory_budget)
+        if args.compact_dtypes:
+            ctx_set_config(ctx, 'compact_dtypes', True)
+        serve(ctx, args.host, args.port, args.socket_path, args.workers, args.max_pending)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
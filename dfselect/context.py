@@ -1,3 +1,8 @@
+import itertools
+import os
+
+from .cache import ResultCache, DEFAULT_RESULT_CACHE_SIZE
+from .engine import get_engine, resolve_engine
 from .errors import DFSelectContextError
 from .log import log
 
@@ -5,11 +10,50 @@ from .log import log
 _CTX_TABLES = 'tables'
 # the key to get the configuration of parser and executor
 _CTX_CONFIG = 'config'
+# the key to get the version tokens of the registered/loaded tables
+_CTX_TABLE_VERSIONS = 'table_versions'
+# the key to get the tables kept from the table loaders
+_CTX_LOADED_TABLES = 'loaded_tables'
+# the key to get the query result cache
+_CTX_RESULT_CACHE = 'result_cache'
+# the key to get the materialized views
+_CTX_VIEWS = 'views'
+# the key to get the column statistics of the registered/loaded tables
+_CTX_TABLE_STATS = 'table_stats'
+# the key to get the zone maps of the registered tables
+_CTX_ZONE_MAPS = 'zone_maps'
+# the key of the sort orders of the registered tables in context
+_CTX_SORT_ORDERS = 'sort_orders'
+# the key of the bitmap indexes of the registered tables in context
+_CTX_BITMAP_INDEXES = 'bitmap_indexes'
+# the engine hooks to maintain the indexes of the table appended with rows, by the key of the indexes in context
+_TABLE_INDEX_APPEND_HOOKS = {
+    _CTX_ZONE_MAPS: 'append_zone_map',
+    _CTX_SORT_ORDERS: 'append_sort_order',
+    _CTX_BITMAP_INDEXES: 'append_bitmap_index',
+}
 
 # the config key to extra table loaders
 _CONF_TABLE_LOADERS = 'table_loaders'
 # the config key to user-defined executor engine
 _CONF_EXEC_ENGINE = 'exec_engine'
+# the config key to keep the tables loaded by the table loaders in context
+_CONF_LOADER_CACHE = 'loader_cache'
+# the config key to enable the query result cache
+_CONF_RESULT_CACHE = 'result_cache'
+# the config key to the memory bound (in bytes) of the query result cache
+_CONF_RESULT_CACHE_SIZE = 'result_cache_size'
+# the config key to run the operators with copy-on-write, so that the intermediate tables share the buffers
+_CONF_COPY_ON_WRITE = 'copy_on_write'
+# the config key to the memory budget (in bytes) of the operators, the operator spills to disk over budget
+_CONF_MEMORY_BUDGET = 'memory_budget'
+# the config key to the directory to place the spilled files, the system temp directory by default
+_CONF_SPILL_DIR = 'spill_dir'
+# the config key to compact the dtypes of the tables loaded by the table loaders, e.g. downcast the integers
+_CONF_COMPACT_DTYPES = 'compact_dtypes'
+
+# the sequence to generate the table version tokens, unique in process
+_table_version_seq = itertools.count(1)
 
 
 def ctx_init(init_ctx: dict = None, tables: dict = None, config: dict = None):
@@ -21,10 +65,20 @@ def ctx_init(init_ctx: dict = None, tables: dict = None, config: dict = None):
     :return: the initialized context object
     """
     ctx = dict(init_ctx) if init_ctx else dict()
+    ctx[_CTX_TABLE_VERSIONS] = ctx.get(_CTX_TABLE_VERSIONS, dict())
+    ctx[_CTX_LOADED_TABLES] = ctx.get(_CTX_LOADED_TABLES, dict())
+    ctx[_CTX_RESULT_CACHE] = ctx.get(_CTX_RESULT_CACHE, ResultCache())
+    ctx[_CTX_VIEWS] = ctx.get(_CTX_VIEWS, dict())
+    ctx[_CTX_TABLE_STATS] = ctx.get(_CTX_TABLE_STATS, dict())
+    for indexes_key in _TABLE_INDEX_APPEND_HOOKS:
+        ctx[indexes_key] = ctx.get(indexes_key, dict())
 
     # merge the table dict into the context
     _tables = ctx.get(_CTX_TABLES, dict())
     if tables:
+        for table_key, df in tables.items():
+            if _tables.get(table_key) is not df:
+                _bump_table_version(ctx, table_key)
         _tables.update(**tables)
     ctx[_CTX_TABLES] = _tables
 
@@ -46,9 +100,12 @@ def ctx_load_table(ctx: dict, table_source: str, table_alias: str = None, alias_
     :param alias_replace: whether to replace the entry by table_source to table_alias during table-load
     :return: the loaded table object
     """
-    if table_source not in ctx[_CTX_TABLES]:
+    if table_source in ctx[_CTX_TABLES]:
+        df = ctx[_CTX_TABLES][table_source]
+    elif table_source in ctx.get(_CTX_LOADED_TABLES, {}):
+        df = ctx[_CTX_LOADED_TABLES][table_source]
+    else:
         raise DFSelectContextError('table {} not found'.format(table_source))
-    df = ctx[_CTX_TABLES][table_source]
 
     # if the table key and alias is different and we want to replace the table key with alias
     if table_alias and table_alias != table_source:
@@ -58,21 +115,396 @@ def ctx_load_table(ctx: dict, table_source: str, table_alias: str = None, alias_
     return df
 
 
-def ctx_add_table(ctx: dict, table_key: str, df, replace=False):
+def ctx_add_table(ctx: dict, table_key: str, df, replace=False, zone_map_block_rows: int = None, sorted_by=None,
+                  bitmap_columns: list = None):
     """
     register a table into the context
     :param ctx: the context object
     :param table_key: the table key
     :param df: the table data object
     :param replace: whether to replace the existed table entry
+    :param zone_map_block_rows: the rows of each block to build the zone map (the min/max of the columns in each
+    block) of the table by, so that the filter skips the blocks which can not match, e.g. 65536. no zone map is
+    built if not provided
+    :param sorted_by: the names of the columns the table is sorted by in ascending order without null, which are
+    trusted without check, or True to detect the sorted columns by the executor engine, so that the range filter of
+    the sorted column is found by binary search and the order by it is not sorted again. not tracked if not provided
+    :param bitmap_columns: the names of the low-cardinality columns to build the bitmap index (a bitmap of the rows
+    for each distinct value) of, so that the equality and in-list filters of the columns are evaluated by the bitwise
+    and/or of the bitmaps. no bitmap index is built if not provided
     :return: None
     """
     if table_key in ctx[_CTX_TABLES]:
         if not replace:
             log.warning(f'table {table_key} already exists, ignore this operation')
+            return
         else:
             log.warning(f'table {table_key} already exists, will be replaced')
+    zone_map = sort_order = bitmap_index = None
+    if zone_map_block_rows:
+        zone_map = _engine_hook(ctx, 'build_zone_map', 'zone map')(df, zone_map_block_rows)
+    if sorted_by:
+        sort_order = _engine_hook(ctx, 'build_sort_order', 'sort order')(
+            df, None if sorted_by is True else list(sorted_by))
+    if bitmap_columns:
+        bitmap_index = _engine_hook(ctx, 'build_bitmap_index', 'bitmap index')(df, list(bitmap_columns))
+    _set_table(ctx, table_key, df)
+    for indexes_key, index in ((_CTX_ZONE_MAPS, zone_map), (_CTX_SORT_ORDERS, sort_order),
+                               (_CTX_BITMAP_INDEXES, bitmap_index)):
+        if index is not None:
+            ctx[indexes_key][table_key] = (df, index)
+    _refresh_dependent_views(ctx, table_key, None)
+
+
+def ctx_append_table(ctx: dict, table_key: str, rows):
+    """
+    append rows to a registered table, the materialized views on the table are maintained from the appended rows
+    :param ctx: the context object
+    :param table_key: the table key
+    :param rows: the rows to append
+    :return: None
+    """
+    if table_key not in ctx[_CTX_TABLES]:
+        raise DFSelectContextError('table {} not found'.format(table_key))
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    if not hasattr(exec_engine, 'append'):
+        raise DFSelectContextError('append is not supported by executor engine {}'.format(exec_engine.__name__))
+    df, appended_rows = exec_engine.append(ctx[_CTX_TABLES][table_key], rows)
+    # the indexes of the table are maintained from the appended rows
+    indexes = [(indexes_key, _table_index(ctx, indexes_key, table_key), append_hook)
+               for indexes_key, append_hook in _TABLE_INDEX_APPEND_HOOKS.items()]
+    _set_table(ctx, table_key, df)
+    for indexes_key, index, append_hook in indexes:
+        if index is not None:
+            ctx[indexes_key][table_key] = (df, getattr(exec_engine, append_hook)(index, df))
+    _refresh_dependent_views(ctx, table_key, appended_rows)
+
+
+def ctx_create_view(ctx: dict, view_key: str, query: str):
+    """
+    create a materialized view, the query result is registered as a table and maintained when the tables it
+    references are changed
+    :param ctx: the context object
+    :param view_key: the view key to register the result as table
+    :param query: the select query of the view
+    :return: the materialized result
+    """
+    from .view import materialize_view
+    if view_key in ctx[_CTX_TABLES] and view_key not in ctx[_CTX_VIEWS]:
+        raise DFSelectContextError('table {} already exists'.format(view_key))
+    view, result = materialize_view(ctx, query)
+    if view_key in view['tables']:
+        raise DFSelectContextError('view {} can not reference itself'.format(view_key))
+    ctx[_CTX_VIEWS][view_key] = view
+    _set_table(ctx, view_key, result)
+    _refresh_dependent_views(ctx, view_key, None)
+    return result
+
+
+def ctx_refresh_view(ctx: dict, view_key: str):
+    """
+    recompute a materialized view from its query
+    :param ctx: the context object
+    :param view_key: the view key
+    :return: the materialized result
+    """
+    if view_key not in ctx[_CTX_VIEWS]:
+        raise DFSelectContextError('view {} not found'.format(view_key))
+    return ctx_create_view(ctx, view_key, ctx[_CTX_VIEWS][view_key]['query'])
+
+
+def ctx_drop_view(ctx: dict, view_key: str):
+    """
+    drop a materialized view and its registered table
+    :param ctx: the context object
+    :param view_key: the view key
+    :return: None
+    """
+    if ctx[_CTX_VIEWS].pop(view_key, None) is not None:
+        del ctx[_CTX_TABLES][view_key]
+        _bump_table_version(ctx, view_key)
+
+
+def ctx_with_tables(ctx: dict, tables: dict):
+    """
+    derive a context which overrides some tables, the registered tables of the origin context are untouched
+    :param ctx: the context object
+    :param tables: the table dict to override
+    :return: the derived context object
+    """
+    derived_ctx = dict(ctx)
+    derived_ctx[_CTX_TABLES] = {**ctx[_CTX_TABLES], **tables}
+    return derived_ctx
+
+
+def ctx_tables(ctx: dict):
+    """
+    get the registered tables
+    :param ctx: the context object
+    :return: the dict of the table data objects, by the table key
+    """
+    return dict(ctx[_CTX_TABLES])
+
+
+def ctx_table_version(ctx: dict, table_key: str):
+    """
+    get the version token of a registered or loaded table, the token changes whenever the table is replaced
+    :param ctx: the context object
+    :param table_key: the table key
+    :return: the version token, None if the table is not registered or kept in context
+    """
+    if table_key not in ctx[_CTX_TABLES] and table_key not in ctx.get(_CTX_LOADED_TABLES, {}):
+        return None
+    return ctx.get(_CTX_TABLE_VERSIONS, {}).get(table_key)
+
+
+def ctx_table_stats(ctx: dict, table_key: str, columns: list = None, compute: bool = True):
+    """
+    get the statistics of a registered or loaded table (row count, and null fraction, distinct count, min/max of
+    each column), computed by the executor engine on first request and kept in context until the table changes
+    :param ctx: the context object
+    :param table_key: the table key
+    :param columns: the columns to get the stats of, all the columns if not provided
+    :param compute: whether to compute the stats not kept in context
+    :return: the table stats, None if the table is not registered or kept in context, or the engine does not
+    provide `table_stats(df, columns)`
+    """
+    if table_key in ctx[_CTX_TABLES]:
+        df = ctx[_CTX_TABLES][table_key]
+    elif table_key in ctx.get(_CTX_LOADED_TABLES, {}):
+        df = ctx[_CTX_LOADED_TABLES][table_key]
+    else:
+        return None
+    table_stats = ctx.setdefault(_CTX_TABLE_STATS, dict())
+    # the stats are kept with the table they are computed from, the derived context may override the table
+    cached = table_stats.get(table_key)
+    stats = cached[1] if cached is not None and cached[0] is df else None
+    missing = [c for c in columns if stats is None or c not in stats.columns] if columns is not None else \
+        None if stats is not None and stats.complete else list(df.columns)
+    if not missing:
+        return stats
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    if not compute or not hasattr(exec_engine, 'table_stats'):
+        return stats
+    computed = exec_engine.table_stats(df, missing if columns is not None else None)
+    if computed is None:
+        return stats
+    if stats is not None:
+        computed = computed._replace(columns={**stats.columns, **computed.columns},
+                                     complete=stats.complete or computed.complete)
+    table_stats[table_key] = (df, computed)
+    return computed
+
+
+def ctx_table_zone_map(ctx: dict, table_key: str):
+    """
+    get the zone map of a registered table
+    :param ctx: the context object
+    :param table_key: the table key
+    :return: the zone map built by the executor engine, None if the table is registered without zone map
+    """
+    return _table_index(ctx, _CTX_ZONE_MAPS, table_key)
+
+
+def ctx_find_zone_map(ctx: dict, df):
+    """
+    find the zone map of the registered table data object, e.g. the table loaded by the operator
+    :param ctx: the context object
+    :param df: the table data object
+    :return: the zone map, None if the table data object is not registered with zone map
+    """
+    return _find_index(ctx, _CTX_ZONE_MAPS, df)
+
+
+def ctx_table_sort_order(ctx: dict, table_key: str):
+    """
+    get the sort order of a registered table
+    :param ctx: the context object
+    :param table_key: the table key
+    :return: the sort order tracked by the executor engine, None if the table is registered without sort order
+    """
+    return _table_index(ctx, _CTX_SORT_ORDERS, table_key)
+
+
+def ctx_find_sort_order(ctx: dict, df):
+    """
+    find the sort order of the registered table data object, e.g. the table loaded by the operator
+    :param ctx: the context object
+    :param df: the table data object
+    :return: the sort order, None if the table data object is not registered with sort order
+    """
+    return _find_index(ctx, _CTX_SORT_ORDERS, df)
+
+
+def ctx_table_bitmap_index(ctx: dict, table_key: str):
+    """
+    get the bitmap index of a registered table
+    :param ctx: the context object
+    :param table_key: the table key
+    :return: the bitmap index built by the executor engine, None if the table is registered without bitmap index
+    """
+    return _table_index(ctx, _CTX_BITMAP_INDEXES, table_key)
+
+
+def ctx_find_bitmap_index(ctx: dict, df):
+    """
+    find the bitmap index of the registered table data object, e.g. the table loaded by the operator
+    :param ctx: the context object
+    :param df: the table data object
+    :return: the bitmap index, None if the table data object is not registered with bitmap index
+    """
+    return _find_index(ctx, _CTX_BITMAP_INDEXES, df)
+
+
+def ctx_publish_tables(ctx: dict, catalog: str, table_keys: list = None):
+    """
+    publish the registered tables into the shared catalog, e.g. in the master process of the workers, so that the
+    other processes attach them by `ctx_attach_catalog` instead of holding their own copies
+    :param ctx: the context object
+    :param catalog: the catalog name
+    :param table_keys: the keys of the tables to publish, all the registered tables if not provided
+    :return: None
+    """
+    publish_table = _engine_hook(ctx, 'publish_table', 'shared catalog')
+    for table_key in ctx[_CTX_TABLES] if table_keys is None else table_keys:
+        if table_key not in ctx[_CTX_TABLES]:
+            raise DFSelectContextError('table {} not found'.format(table_key))
+        publish_table(catalog, table_key, ctx[_CTX_TABLES][table_key])
+
+
+def ctx_unpublish_tables(ctx: dict, catalog: str, table_keys: list):
+    """
+    remove the tables from the shared catalog, the processes attached to them keep their data
+    :param ctx: the context object
+    :param catalog: the catalog name
+    :param table_keys: the keys of the tables to remove
+    :return: None
+    """
+    unpublish_table = _engine_hook(ctx, 'unpublish_table', 'shared catalog')
+    for table_key in table_keys:
+        unpublish_table(catalog, table_key)
+
+
+def ctx_attach_catalog(ctx: dict, catalog: str):
+    """
+    load the tables not registered from the shared catalog, the table is attached without copying its data
+    :param ctx: the context object
+    :param catalog: the catalog name
+    :return: None
+    """
+    ctx_config_add_table_loader(ctx, _engine_hook(ctx, 'catalog_loader', 'shared catalog')(catalog))
+
+
+def ctx_save_tables(ctx: dict, directory: str, table_keys: list = None):
+    """
+    write the registered tables into the column stores of the directory, one store for each table named by the table
+    key, so that the other processes open them by `ctx_attach_store` without reading the whole tables
+    :param ctx: the context object
+    :param directory: the directory of the stores
+    :param table_keys: the keys of the tables to write, all the registered tables if not provided
+    :return: None
+    """
+    write_table_store = _engine_hook(ctx, 'write_table_store', 'table store')
+    for table_key in ctx[_CTX_TABLES] if table_keys is None else table_keys:
+        if table_key not in ctx[_CTX_TABLES]:
+            raise DFSelectContextError('table {} not found'.format(table_key))
+        path = os.path.join(directory, table_key)
+        if os.path.basename(path) != table_key or table_key in ('.', '..'):
+            raise DFSelectContextError('table {} can not be written into the store'.format(table_key))
+        write_table_store(path, ctx[_CTX_TABLES][table_key])
+
+
+def ctx_attach_store(ctx: dict, directory: str, decode_strings: bool = False):
+    """
+    load the tables not registered from the column stores of the directory, the columns are mapped from the files
+    :param ctx: the context object
+    :param directory: the directory of the stores
+    :param decode_strings: whether to decode the dictionary-encoded string columns into their original dtype, the
+    string columns are loaded as categoricals without reading them if not set
+    :return: None
+    """
+    ctx_config_add_table_loader(ctx, _engine_hook(ctx, 'store_loader', 'table store')(directory, decode_strings))
+
+
+def ctx_cache_loaded_table(ctx: dict, table_key: str, df):
+    """
+    keep the table loaded by the table loaders in context, if the loader cache is enabled
+    :param ctx: the context object
+    :param table_key: the table key
+    :param df: the loaded table data object
+    :return: None
+    """
+    if not ctx_get_config(ctx, _CONF_LOADER_CACHE, False):
+        return
+    ctx[_CTX_LOADED_TABLES][table_key] = df
+    _bump_table_version(ctx, table_key)
+
+
+def ctx_invalidate_loaded_table(ctx: dict, table_key: str = None):
+    """
+    drop the table kept by the loader cache, so that it is reloaded by the table loaders in next query
+    :param ctx: the context object
+    :param table_key: the table key, drop all the loaded tables if not provided
+    :return: None
+    """
+    table_keys = [table_key] if table_key else list(ctx[_CTX_LOADED_TABLES].keys())
+    for key in table_keys:
+        if ctx[_CTX_LOADED_TABLES].pop(key, None) is not None:
+            _bump_table_version(ctx, key)
+
+
+def _bump_table_version(ctx: dict, table_key: str):
+    ctx[_CTX_TABLE_VERSIONS][table_key] = next(_table_version_seq)
+    # the stats of the changed table are computed again on next request, the indexes of the table are dropped
+    ctx.get(_CTX_TABLE_STATS, {}).pop(table_key, None)
+    for indexes_key in _TABLE_INDEX_APPEND_HOOKS:
+        ctx.get(indexes_key, {}).pop(table_key, None)
+
+
+def _engine_hook(ctx: dict, hook: str, feature: str):
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    if not hasattr(exec_engine, hook):
+        raise DFSelectContextError('{} is not supported by executor engine {}'.format(feature, exec_engine.__name__))
+    return getattr(exec_engine, hook)
+
+
+def _table_index(ctx: dict, indexes_key: str, table_key: str):
+    # the index built for the table data object registered currently
+    entry = ctx.get(indexes_key, {}).get(table_key)
+    if entry is None or ctx[_CTX_TABLES].get(table_key) is not entry[0]:
+        return None
+    return entry[1]
+
+
+def _find_index(ctx: dict, indexes_key: str, df):
+    for table, index in ctx.get(indexes_key, {}).values():
+        if table is df:
+            return index
+    return None
+
+
+def _set_table(ctx: dict, table_key: str, df):
     ctx[_CTX_TABLES][table_key] = df
+    _bump_table_version(ctx, table_key)
+
+
+def _refresh_dependent_views(ctx: dict, table_key: str, appended_rows):
+    """
+    maintain the materialized views which reference the changed table
+    :param ctx: the context object
+    :param table_key: the changed table key
+    :param appended_rows: the rows appended to the table, None if the table is replaced
+    :return: None
+    """
+    if not ctx.get(_CTX_VIEWS):
+        return
+    from .view import maintain_view
+    for view_key, view in list(ctx[_CTX_VIEWS].items()):
+        if table_key not in view['tables']:
+            continue
+        result, appended_result = maintain_view(ctx, view, ctx[_CTX_TABLES][view_key], table_key, appended_rows)
+        _set_table(ctx, view_key, result)
+        _refresh_dependent_views(ctx, view_key, appended_result)
 
 
 def ctx_set_config(ctx: dict, config_key: str, config_value):
@@ -140,9 +572,10 @@ def ctx_config_set_exec_engine(ctx: dict, exec_engine):
     """
     set the executor engine to use into context
     :param ctx: the context object
-    :param exec_engine: the executor engine module
+    :param exec_engine: the executor engine module, or the name of the registered engine
     :return: None
     """
+    exec_engine = resolve_engine(exec_engine)
     ctx_set_config(ctx, _CONF_EXEC_ENGINE, exec_engine)
     if hasattr(exec_engine, 'initialize'):
         exec_engine.initialize(ctx)
@@ -152,7 +585,65 @@ def ctx_config_get_exec_engine(ctx: dict):
     """
     get the executor engine from the context
     :param ctx: the context object
-    :return: the used executor engine
+    :return: the used executor engine, the engine configured by name is resolved by the engine registry
+    """
+    exec_engine = ctx[_CTX_CONFIG].get(_CONF_EXEC_ENGINE)
+    if exec_engine is None:
+        return get_engine()
+    return resolve_engine(exec_engine)
+
+
+def ctx_config_get_result_cache(ctx: dict):
+    """
+    get the query result cache from the context
+    :param ctx: the context object
+    :return: the result cache, None if the result cache is not enabled
+    """
+    if not ctx_get_config(ctx, _CONF_RESULT_CACHE, False):
+        return None
+    return ctx[_CTX_RESULT_CACHE]
+
+
+def ctx_config_get_result_cache_size(ctx: dict):
+    """
+    get the memory bound of the query result cache from the context
+    :param ctx: the context object
+    :return: the memory bound in bytes
+    """
+    return ctx_get_config(ctx, _CONF_RESULT_CACHE_SIZE, DEFAULT_RESULT_CACHE_SIZE)
+
+
+def ctx_config_get_copy_on_write(ctx: dict):
+    """
+    get whether to run the operators with copy-on-write from the context
+    :param ctx: the context object
+    :return: the config value, True by default
+    """
+    return ctx_get_config(ctx, _CONF_COPY_ON_WRITE, True)
+
+
+def ctx_config_get_memory_budget(ctx: dict):
+    """
+    get the memory budget of the operators from the context
+    :param ctx: the context object
+    :return: the memory budget in bytes, None if unlimited
+    """
+    return ctx_get_config(ctx, _CONF_MEMORY_BUDGET)
+
+
+def ctx_config_get_spill_dir(ctx: dict):
+    """
+    get the directory to place the spilled files from the context
+    :param ctx: the context object
+    :return: the directory, None for the system temp directory
+    """
+    return ctx_get_config(ctx, _CONF_SPILL_DIR)
+
+
+def ctx_config_get_compact_dtypes(ctx: dict):
+    """
+    get whether to compact the dtypes of the tables loaded by the table loaders from the context
+    :param ctx: the context object
+    :return: the config value, False by default
     """
-    from .exec import pandas as pandas_engine
-    return ctx_get_config(ctx, _CONF_EXEC_ENGINE, pandas_engine)
+    return ctx_get_config(ctx, _CONF_COMPACT_DTYPES, False)
@@ -0,0 +1,109 @@
+import importlib
+
+from .errors import DFSelectContextError
+from .log import log
+
+# the entry point group of the third-party executor engines, e.g. in setup.py of the engine package:
+#   entry_points={'dfselect.engines': ['myengine = myengine.dfselect_engine']}
+ENGINE_ENTRY_POINT_GROUP = 'dfselect.engines'
+
+# the name of the default executor engine
+DEFAULT_ENGINE = 'pandas'
+
+# the prefix of the operator functions of the engine module
+_EXEC_FUNC_PREFIX = 'exec_'
+
+# the registered engines by name, of the module path to import on first use, or the imported module
+_engines = {
+    'pandas': 'dfselect.exec.pandas',
+    'odps': 'dfselect.exec.odps',
+}
+# the entry points of the third-party engines by name, discovered once when an engine is not registered
+_entry_points = None
+# the operator dispatch tables of the engines, by the engine module
+_dispatch_tables = dict()
+
+
+def register_engine(name: str, engine, replace: bool = False):
+    """
+    register an executor engine by name, the engine module is imported on first use
+    :param name: the engine name
+    :param engine: the engine module, or the module path to import
+    :param replace: whether to replace the registered engine of the same name
+    :return: None
+    """
+    if name in _engines and not replace:
+        raise DFSelectContextError('engine {} already registered'.format(name))
+    _engines[name] = engine
+
+
+def engine_names():
+    """
+    list the names of the registered engines, including the engines of the entry points
+    :return: the sorted engine names
+    """
+    return sorted(set(_engines.keys()).union(_load_entry_points().keys()))
+
+
+def get_engine(name: str = DEFAULT_ENGINE):
+    """
+    get the executor engine module by name, the module is imported once on first use
+    :param name: the engine name
+    :return: the engine module
+    """
+    engine = _engines.get(name)
+    if engine is None:
+        entry_point = _load_entry_points().get(name)
+        if entry_point is None:
+            raise DFSelectContextError('engine {} not registered'.format(name))
+        engine = _engines[name] = entry_point.load()
+    elif isinstance(engine, str):
+        engine = _engines[name] = importlib.import_module(engine)
+    return engine
+
+
+def resolve_engine(engine):
+    """
+    resolve the executor engine of the config value
+    :param engine: the engine module, or the registered engine name
+    :return: the engine module
+    """
+    return get_engine(engine) if isinstance(engine, str) else engine
+
+
+def dispatch_table(engine):
+    """
+    get the operator functions of the engine, resolved once for each engine module
+    :param engine: the engine module
+    :return: the dict of the operator functions, by the operator code
+    """
+    table = _dispatch_tables.get(engine)
+    if table is None:
+        # the operator function is named by the operator code in upper case, e.g. exec_FILTER
+        table = {attr[len(_EXEC_FUNC_PREFIX):]: getattr(engine, attr) for attr in dir(engine)
+                 if attr.startswith(_EXEC_FUNC_PREFIX) and attr[len(_EXEC_FUNC_PREFIX):].isupper()
+                 and callable(getattr(engine, attr))}
+        _dispatch_tables[engine] = table
+    return table
+
+
+def _load_entry_points():
+    """
+    discover the engines of the entry points once, importing the metadata of the installed packages only when an
+    engine is not registered
+    """
+    global _entry_points
+    if _entry_points is None:
+        from importlib.metadata import entry_points
+        try:
+            eps = entry_points(group=ENGINE_ENTRY_POINT_GROUP)
+        except TypeError:
+            # python < 3.10
+            eps = entry_points().get(ENGINE_ENTRY_POINT_GROUP, [])
+        _entry_points = dict()
+        for ep in eps:
+            if ep.name in _engines:
+                log.warning(f'engine {ep.name} of entry point {ep.value} conflicts with the registered one, ignore it')
+                continue
+            _entry_points[ep.name] = ep
+    return _entry_points
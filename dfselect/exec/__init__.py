@@ -1,11 +1,19 @@
+from contextlib import nullcontext
+
 from ..errors import DFSelectExecError
-from ..context import ctx_config_get_exec_engine
+from ..context import ctx_config_get_exec_engine, ctx_table_stats
+from ..engine import dispatch_table
+from ..parse.ast import walk
+from ..plan import BoundColumn, bind_operators, split_conjuncts
+from ..stats import order_conjuncts
+
+# the operators to produce the table, the expressions of the other operators are bound to the produced table
+_SOURCE_OP_CODES = ('LOAD', 'JOIN')
 
 
 def _exec_func(op_code: str, ctx: dict):
-    op_func_name = "exec_" + op_code.upper()
-    exec_engine = ctx_config_get_exec_engine(ctx)
-    method = getattr(exec_engine, op_func_name, None)
+    # the operator functions of the engine are resolved once by the engine registry
+    method = dispatch_table(ctx_config_get_exec_engine(ctx)).get(op_code.upper())
     if not method:
         raise DFSelectExecError(f'operator {op_code} not defined')
     return method
@@ -18,7 +26,107 @@ def exec_operator(df, op_code: str, ctx: dict, *args):
 
 
 def exec_operators(select_cmds: list or tuple, ctx: dict):
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    # the engine may provide the context (e.g. the engine options) to run the operators in
+    exec_context = exec_engine.exec_context(ctx) if hasattr(exec_engine, 'exec_context') else nullcontext()
+    with exec_context:
+        df, bound_cmds = _exec_sources(select_cmds, ctx)
+        for operator in bound_cmds:
+            df = exec_operator(df, operator[0], ctx, *operator[1])
+    return df
+
+
+def exec_partial_aggregate(select_cmds: list or tuple, ctx: dict, exact: bool = True):
+    """
+    execute the operators before the aggregation, and compute the mergeable partial states of the aggregation
+    :param select_cmds: the operators of an aggregate query
+    :param ctx: the context object
+    :param exact: whether the aggregation must be exact
+    :return: the partial aggregate, None if the engine or the query does not support partial aggregation
+    """
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    group_items, proj_columns = [], []
+    for op_code, op_args in select_cmds:
+        if op_code == 'GROUP':
+            group_items = op_args[0]
+        elif op_code == 'PROJECT':
+            proj_columns = op_args
+    if not hasattr(exec_engine, 'partial_aggregate') or not proj_columns:
+        return None
+
+    exec_context = exec_engine.exec_context(ctx) if hasattr(exec_engine, 'exec_context') else nullcontext()
+    with exec_context:
+        df, bound_cmds = _exec_sources(select_cmds, ctx)
+        for op_code, op_args in bound_cmds:
+            if op_code == 'GROUP':
+                group_items = op_args[0]
+            elif op_code == 'PROJECT':
+                proj_columns = op_args
+            else:
+                df = exec_operator(df, op_code, ctx, *op_args)
+        return exec_engine.partial_aggregate(df, ctx, group_items, proj_columns, exact=exact)
+
+
+def _exec_sources(select_cmds: list or tuple, ctx: dict):
+    """
+    execute the operators to produce the table (LOAD/JOIN), and bind the expressions of the other operators to the
+    columns of the produced table once, if the engine provides `table_schema(df)`. the common expressions of the
+    operators are computed once, if the engine provides `exec_EXTEND(df, ctx, *columns)` as well
+    :param select_cmds: the operators of the query
+    :param ctx: the context object
+    :return: the produced table, and the (bound) operators to execute on it
+    """
+    exec_engine = ctx_config_get_exec_engine(ctx)
     df = None
-    for operator in select_cmds:
+    for idx, operator in enumerate(select_cmds):
+        if operator[0] not in _SOURCE_OP_CODES:
+            other_cmds = select_cmds[idx:]
+            if hasattr(exec_engine, 'table_schema'):
+                # the common expressions are shared by the hidden columns, if the engine can extend the columns
+                other_cmds = bind_operators(other_cmds, exec_engine.table_schema(df),
+                                            share_exprs=hasattr(exec_engine, 'exec_EXTEND'))
+                other_cmds = _order_filter_conjuncts(other_cmds, select_cmds[:idx], ctx)
+            return df, other_cmds
         df = exec_operator(df, operator[0], ctx, *operator[1])
-    return df
+    return df, []
+
+
+def _order_filter_conjuncts(bound_cmds: list, source_cmds: list, ctx: dict):
+    """
+    reorder the conjuncts of the bound filter by the selectivity estimated from the stats of the source tables, the
+    stats are computed (once for each table column) only for the columns compared by the filter of several
+    conjuncts
+    :param bound_cmds: the bound operators
+    :param source_cmds: the LOAD/JOIN operators
+    :param ctx: the context object
+    :return: the operators with the filter reordered
+    """
+    ordered_cmds = []
+    for op_code, op_args in bound_cmds:
+        if op_code == 'FILTER' and len(split_conjuncts(op_args[0])) > 1:
+            columns = {node.name for node in walk(op_args[0]) if isinstance(node, BoundColumn)}
+            column_stats = _source_column_stats(source_cmds, columns, ctx)
+            if column_stats:
+                op_args = [order_conjuncts(op_args[0], column_stats)]
+        ordered_cmds.append((op_code, op_args))
+    return ordered_cmds
+
+
+def _source_column_stats(source_cmds: list, columns: set, ctx: dict):
+    """
+    collect the stats of the columns of the source tables by the column names of the joined table, the overlapped
+    column of the join table is prefixed by its alias
+    """
+    column_stats = dict()
+    for op_code, op_args in source_cmds:
+        table_source, table_alias = op_args[0]
+        prefix = f'{table_alias}.'
+        table_columns = [c[len(prefix):] if op_code == 'JOIN' and c.startswith(prefix) else c for c in columns]
+        stats = ctx_table_stats(ctx, table_source, table_columns)
+        if stats is None:
+            continue
+        for name, column in stats.columns.items():
+            if op_code == 'JOIN':
+                column_stats.setdefault(prefix + name, column)
+            column_stats.setdefault(name, column)
+    return column_stats
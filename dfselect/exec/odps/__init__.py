@@ -1,17 +1,24 @@
 # import pandas as pd
 # from pandas.core.groupby import DataFrameGroupBy
+import uuid
+
 from odps.df.expr.expressions import CollectionExpr
 from odps.df.expr.groupby import GroupBy, BaseGroupBy
-from sqlparse.sql import Identifier
 
-from dfselect.context import ctx_load_table, ctx_config_get_table_loaders, ctx_config_add_table_loader, ctx_get_config
+from dfselect.context import ctx_load_table, ctx_config_get_table_loaders, ctx_config_add_table_loader, ctx_get_config, \
+    ctx_cache_loaded_table
 from dfselect.errors import DFSelectExecError, DFSelectContextError
-from dfselect.log import log
-from dfselect.util import check_col_name, is_col_literal, reparse_token, squeeze_blank
-from .expr import eval_expr
+from dfselect.parse.ast import Star
+from dfselect.plan import BoundColumn, expr_key
+from .expr import eval_expr, is_agg_call
 
 _o = None
 
+# the prefix of the temporary tables the results written into the sinks are persisted into, read page by page
+_SINK_TABLE_PREFIX = 'tmp_dfselect_sink_'
+# the lifecycle in days of the temporary tables, in case they are not dropped (e.g. the process is killed)
+_SINK_TABLE_LIFECYCLE = 1
+
 
 def exec_JOIN(df, ctx: dict, join_table, join_mode, join_exprs):
     """
@@ -41,64 +48,71 @@ def exec_JOIN(df, ctx: dict, join_table, join_mode, join_exprs):
 
 def exec_PROJECT(df, ctx: dict, *columns):
     if isinstance(df, CollectionExpr):
-        df = _extend_columns(df, *columns)
-        col_names = list(map(lambda t: t[1], columns))
-        proj_col_names = [check_col_name(c, [sc.name for sc in df.columns]) for c in col_names]
-        return df[proj_col_names]
+        # the projection of aggregate columns (without group-by) is the summary of the collection
+        return df[[_get_column(df, c) for c in columns]]
     elif isinstance(df, GroupBy):
         gf = df
         agg_columns = _check_and_get_agg_columns([gc.name for gc in gf._by], *columns)
-        group_columns = _get_columns_in_group(gf)
-        conds = []
-        for agg_column in agg_columns:
-            squeezed_column = squeeze_blank(agg_column[0])
-            if squeezed_column == 'count(*)':
-                conds.append('gf.size()' + ('' if 'count(*)' in agg_column[1] else '.rename("' + agg_column[1] + '")'))
-            else:
-                col_item = reparse_token(agg_column[0])
-                conds.append('(gf.' + eval_expr(col_item, group_columns, 'r') + ')' + ('' if 'count(*)' in agg_column[1] else '.rename("' + agg_column[1] + '")'))
-
-        group_by_expr = '[' + ','.join(conds) + ']'
-        log.debug('generated group-by expr:')
-        log.debug(f'> {group_by_expr}')
-        return gf.agg(eval(group_by_expr))
+        source = gf.args[0]
+        # the count(*) of the groups is the size of the groups
+        computed = {expr_key(c[0]): gf.size() for c in agg_columns if _is_count_star(c[0])}
+        return gf.agg([_get_column(source, c, computed) for c in agg_columns])
     return None
 
 
 def exec_FILTER(df, ctx: dict, filter_expr):
-    import re
-    where_expr = re.sub('==*', '==', filter_expr)
-    return df.query(where_expr)
+    return df.filter(eval_expr(df, filter_expr))
+
+
+def exec_EXTEND(df, ctx: dict, *columns):
+    """
+    extend the computed columns to the collection, e.g. the hidden columns of the common expressions
+    :param df: the collection expression
+    :param ctx: the context object
+    :param columns: the columns of form (column_expr, column_name)
+    :return: the extended collection
+    """
+    return df[[df] + [_get_column(df, c) for c in columns]]
 
 
 def exec_ORDER(df, ctx: dict, *order_items):
-    df = _extend_columns(df, *[(o[0], o[0]) for o in order_items])
     sort_by = []
     sort_asc = []
     for order_item in order_items:
-        sort_by.append(order_item[0])
+        sort_by.append(eval_expr(df, order_item[0]))
         sort_asc.append(order_item[1])
     return df.sort_values(by=sort_by, ascending=sort_asc)
 
 
 def exec_LIMIT(df, ctx: dict, from_idx, limit):
-    return df[:from_idx + limit]
+    return df[from_idx:from_idx + limit] if from_idx else df[:limit]
 
 
-def exec_GROUP(df, ctx: dict, group_items, proj_columns):
-    # process projection at first to support group on expression (udf or operation)
-    df = _extend_columns(df, *group_items)
-    # if proj_columns:
-    #     gkeys = [t[0] for t in group_items]
-    #     agg_columns = _check_and_get_agg_columns(gkeys, *proj_columns)
+def exec_DISTINCT(df, ctx: dict, limit: list = None):
+    df = df.distinct()
+    return exec_LIMIT(df, ctx, *limit) if limit else df
+
 
-    group_keys = [check_col_name(g[0], [sc.name for sc in df.columns]) for g in group_items]
+def exec_GROUP(df, ctx: dict, group_items, proj_columns):
+    if not group_items:
+        # the aggregation over the whole table is projected from the collection
+        return df
+    # the group-by expression (udf or operation) is grouped by its alias
+    group_keys = [g[0].name if isinstance(g[0], BoundColumn) else _get_column(df, g) for g in group_items]
     gf = df.groupby(group_keys)
     return gf
 
 
-def exec_LOAD(df, ctx: dict, table: tuple):
-    return _load_table(ctx, table)
+def exec_LOAD(df, ctx: dict, table: tuple, table_sample: tuple = None):
+    df = _load_table(ctx, table)
+    if table_sample:
+        # the collection is sampled by odps before any other operator
+        sample_size, sample_unit, seed = table_sample
+        if sample_unit == 'PERCENT':
+            df = df.sample(frac=sample_size / 100, random_state=seed)
+        else:
+            df = df.sample(n=sample_size, random_state=seed)
+    return df
 
 
 def initialize(ctx: dict):
@@ -113,77 +127,104 @@ def initialize(ctx: dict):
     ctx_config_add_table_loader(ctx, _tbl_loader_odps)
 
 
+def table_schema(df):
+    """
+    the columns of the collection to bind the expressions of the operators to
+    :param df: the collection expression
+    :return: the columns of form (column_name, dtype)
+    """
+    return [(c.name, c.dtype) for c in df.columns]
+
+
 def output(result):
     return result.to_pandas()
 
 
+def output_batches(result, batch_rows: int):
+    """
+    produce the result batch by batch for the result sink, the result collection is persisted into a temporary table
+    once, whose records are read page by page by the table tunnel, instead of being downloaded into a DataFrame as a
+    whole. the temporary table is dropped once all the batches are produced
+    :param result: the query result
+    :param batch_rows: the max rows of the batches
+    :return: the iterator of the DataFrame batches
+    """
+    import pandas as pd
+    if not isinstance(result, CollectionExpr) or _o is None:
+        # the summary of the aggregation over the whole table is of a single row
+        yield output(result)
+        return
+    table_name = f'{_SINK_TABLE_PREFIX}{uuid.uuid4().hex}'
+    result.persist(table_name, lifecycle=_SINK_TABLE_LIFECYCLE, odps=_o)
+    table = _o.get_table(table_name)
+    try:
+        columns = [c.name for c in table.schema.columns]
+        with table.open_reader() as reader:
+            produced = False
+            for start in range(0, reader.count, batch_rows):
+                produced = True
+                records = reader.read(start=start, count=min(batch_rows, reader.count - start))
+                yield pd.DataFrame([record.values for record in records], columns=columns)
+            if not produced:
+                yield pd.DataFrame(columns=columns)
+    finally:
+        table.drop()
+
+
 def _load_table(ctx: dict, table: tuple):
     table_source, table_alias = table
     df = None
     try:
-        df = ctx_load_table(ctx, table_source, table_alias)
+        df = ctx_load_table(ctx, table_source, table_alias, alias_replace=False)
     except DFSelectContextError as e:
         extra_table_loaders = ctx_config_get_table_loaders(ctx)
         if extra_table_loaders:
             for extra_table_loader in extra_table_loaders:
                 df = extra_table_loader(table_source)
+                if df is not None:
+                    break
         if df is None:
             raise e
+        ctx_cache_loaded_table(ctx, table_source, df)
 
     return df
 
 
-def _load_udf(func_code: str):
-    from . import udf as udf_repo
-    udf_name = "udf_" + func_code.upper()
-    udf = getattr(udf_repo, udf_name, None)
-    if not udf:
-        raise DFSelectExecError(f'udf [{func_code}] not defined')
-    return udf
+def _get_column(df, column, computed: dict = None):
+    """
+    get the sequence of the projected column from the collection
+    :param df: the collection expression
+    :param column: the column of form (column_expr, column_alias)
+    :param computed: the expressions computed already, by the expression key
+    :return: the sequence expression named by the column alias
+    """
+    from odps.df import Scalar
+    sequence = eval_expr(df, column[0], computed)
+    if not hasattr(sequence, 'rename'):
+        # the constant column
+        sequence = Scalar(sequence)
+    return sequence.rename(column[1])
 
 
-def _extend_columns(df, *columns):
-    if isinstance(df, CollectionExpr):
-        assign_map = dict()
-        for column in columns:
-            col = column[0]
-            if not col or is_col_literal(col):
-                const_val = col
-                column_series = df.apply(lambda r: const_val, axis=1)
-                assign_map[column[1]] = column_series
-            else:
-                col_item = reparse_token(col)
-                if isinstance(col_item, Identifier):
-                    # column_series = df.apply(lambda r: r[check_col_name(col, df.columns)], axis=1, names=col).rename(col)
-                    # column_series = df.apply(lambda r: str(r[col]), axis=1, names=[col_item.value],
-                    #                            types=["string"], reduce=True).rename(col_item.value)
-                    orig_column = check_col_name(col, [sc.name for sc in df.columns])
-                    df[column[1]] = df[orig_column]
-                else:
-                    column_series = df.apply(lambda r: eval(eval_expr(col_item, df.columns, 'r')), axis=1)
-                    assign_map[column[1]] = column_series
-        if assign_map:
-            for (col_key, assign_series) in assign_map.items():
-                df[col_key] = assign_series
-            # df = df.assign(**assign_map)
-    return df
+def _is_count_star(expr):
+    return is_agg_call(expr) and expr.name == 'count' and len(expr.args) == 1 and isinstance(expr.args[0], Star)
 
 
-def _check_and_get_agg_columns(keys, *columns):
-    check_keys = [squeeze_blank(k) for k in keys]
-    unmap_keys = [squeeze_blank(k) for k in keys]
+def _check_and_get_agg_columns(group_keys, *columns):
+    """
+    split the aggregated columns from the projected columns, all the group keys should be projected
+    :param group_keys: the group columns
+    :param columns: the projected columns, the projected group-by item is bound to the group column
+    :return: the aggregated columns
+    """
+    unmap_keys = list(group_keys)
     agg_columns = []
     for column in columns:
-        squeezed_column = squeeze_blank(column[0])
-        if squeezed_column in [squeeze_blank(k) for k in check_keys]:
-            unmap_keys.remove(squeezed_column)
+        if isinstance(column[0], BoundColumn) and column[0].name in group_keys:
+            if column[0].name in unmap_keys:
+                unmap_keys.remove(column[0].name)
         else:
             agg_columns.append(column)
     if len(unmap_keys) > 0:
         raise DFSelectExecError("group-by keys {} not used in select clause".format(unmap_keys))
     return agg_columns
-
-def _get_columns_in_group(gf: GroupBy):
-    source_columns = [sc.name for sc in gf.args[0].columns]
-    by_columns = [bc.name for bc in gf.args[1]]
-    return [gc for gc in source_columns if gc not in by_columns]
\ No newline at end of file
@@ -1,99 +1,149 @@
-from sqlparse.sql import Operation, Function, Identifier, Parenthesis, IdentifierList, Comparison
-from sqlparse.tokens import Wildcard
+import operator
+import re
 
 from dfselect.errors import DFSelectExecError
-from dfselect.util import check_col_name, is_skip_token
+from dfselect.parse.ast import Literal, Star, Call, UnaryOp, BinaryOp, InList, IsNull, Between, Case
+from dfselect.plan import BoundColumn, expr_key
 
-_agg_func_dict = dict(
+# the aggregate functions computed by the reduction of the sequence
+AGG_FUNCS = dict(
     avg='mean',
     mean='mean',
     count='count',
     sum='sum',
+    min='min',
+    max='max',
     std='std',
     median='median',
     quantile='quantile',
 )
 
+_BINARY_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'and': operator.and_,
+    'or': operator.or_,
+}
 
-def eval_oper(oper: Operation, columns, row_key):
-    oper_str = ''
-    for token in oper.tokens:
-        if isinstance(token, Function):
-            oper_str += eval_func(token, columns, row_key)
-        elif isinstance(token, Identifier):
-            oper_str += f'{row_key}["{check_col_name(token.value, columns)}"]'
-        elif isinstance(token, (Operation, Comparison)):
-            oper_str += eval_oper(token, columns, row_key)
-        else:
-            oper_str += str(token)
-    return oper_str
 
+def is_agg_call(expr):
+    """
+    check whether the expression is the call of an aggregate function
+    """
+    return isinstance(expr, Call) and expr.over is None and expr.name in AGG_FUNCS
 
-def eval_func_args(args: IdentifierList, columns, row_key):
-    func_arg_str = ''
-    for arg in args.tokens:
-        if isinstance(arg, Function):
-            func_arg_str += eval_func(arg, columns, row_key)
-        elif isinstance(arg, Identifier):
-            func_arg_str += f'{row_key}["{check_col_name(arg.value, columns)}"]'
-        elif isinstance(arg, (Operation, Comparison)):
-            func_arg_str += eval_oper(arg, columns, row_key)
-        else:
-            func_arg_str += str(arg)
-    return func_arg_str
 
+def eval_expr(df, expr, computed: dict = None):
+    """
+    evaluate the bound expression over the collection into the sequence expression
+    :param df: the collection expression
+    :param expr: the bound expression
+    :param computed: the expressions computed already (e.g. the group size), by the expression key
+    :return: the sequence expression, or the scalar value of the constant expression
+    """
+    if isinstance(expr, BoundColumn):
+        return df[expr.name]
+    if isinstance(expr, Literal):
+        return expr.value
+    if computed and isinstance(expr, Call):
+        key = expr_key(expr)
+        if key in computed:
+            return computed[key]
+    if isinstance(expr, BinaryOp):
+        left = eval_expr(df, expr.left, computed)
+        if expr.op == 'like':
+            return _like(left, expr.right.value)
+        right = eval_expr(df, expr.right, computed)
+        if expr.op == '||':
+            return left.astype('string') + right
+        return _BINARY_OPS[expr.op](left, right)
+    if isinstance(expr, UnaryOp):
+        operand = eval_expr(df, expr.operand, computed)
+        if expr.op == 'not':
+            return ~operand
+        return -operand if expr.op == '-' else operand
+    if isinstance(expr, InList):
+        operand = eval_expr(df, expr.operand, computed)
+        items = [eval_expr(df, item, computed) for item in expr.items]
+        return operand.notin(items) if expr.negated else operand.isin(items)
+    if isinstance(expr, IsNull):
+        operand = eval_expr(df, expr.operand, computed)
+        return operand.notnull() if expr.negated else operand.isnull()
+    if isinstance(expr, Between):
+        operand = eval_expr(df, expr.operand, computed)
+        between = operand.between(eval_expr(df, expr.low, computed), eval_expr(df, expr.high, computed))
+        return ~between if expr.negated else between
+    if isinstance(expr, Case) or (isinstance(expr, Call) and expr.name == 'if' and len(expr.args) == 3):
+        # the branches are nested into the ifelse of the conditions from the last one
+        conditions, results, default = (expr.conditions, expr.results, expr.default) if isinstance(expr, Case) \
+            else ((expr.args[0],), (expr.args[1],), expr.args[2])
+        value = eval_expr(df, default, computed)
+        for condition, result in reversed(list(zip(conditions, results))):
+            value = eval_expr(df, condition, computed).ifelse(eval_expr(df, result, computed), value)
+        return value
+    if isinstance(expr, Call):
+        if is_agg_call(expr):
+            if expr.name == 'count' and len(expr.args) == 1 and isinstance(expr.args[0], Star):
+                return df.count()
+            if len(expr.args) != 1 or isinstance(expr.args[0], Star):
+                raise DFSelectExecError(f'only single-param agg-function is supported: {expr.text}')
+            return getattr(eval_expr(df, expr.args[0], computed), AGG_FUNCS[expr.name])()
+        udf = load_udf(expr.name)
+        # the udf is called with the argument values of each row
+        return df.apply(lambda r: udf(*[_eval_row(r, arg) for arg in expr.args]), axis=1, reduce=True)
+    raise DFSelectExecError(f'unsupported expression: {expr.text}')
 
-def eval_func(fn: Function, columns, row_key):
-    func_str = ''
-    func_key = str(fn.tokens[0])
-    if func_key.lower() not in _agg_func_dict.keys():
-        func_str = f'_load_udf("{func_key}")'
-        for token in fn.tokens[1:]:
-            if isinstance(token, Parenthesis):
-                for token_in_paren in token.tokens:
-                    if isinstance(token_in_paren, IdentifierList):
-                        func_str += eval_func_args(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Function):
-                        func_str += eval_func(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Identifier):
-                        func_str += f'{row_key}["{check_col_name(token_in_paren.value, columns)}"]'
-                    elif isinstance(token_in_paren, (Operation, Comparison)):
-                        func_str += eval_oper(token_in_paren, columns, row_key)
-                    else:
-                        func_str += str(token_in_paren)
 
-            else:
-                func_str += str(token)
-    else:
-        agg_func_name = _agg_func_dict[func_key.lower()]
-        func_str += ''
-        has_wildcard = False
-        for token in fn.tokens[1:]:
-            if isinstance(token, Parenthesis):
-                agg_func_args = [t for t in token.tokens if not is_skip_token(t)]
-                for token_in_paren in agg_func_args:
-                    if isinstance(token_in_paren, IdentifierList):
-                        # func_str += eval_func_args(token_in_paren, columns, row_key)
-                        raise DFSelectExecError(f'only single-param agg-function is supported')
-                    if isinstance(token_in_paren, Function):
-                        func_str += eval_func(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Identifier):
-                        func_str += f'{row_key}["{check_col_name(token_in_paren.value, columns)}"]'
-                    elif isinstance(token_in_paren, (Operation, Comparison)):
-                        func_str += eval_oper(token_in_paren, columns, row_key)
-                    elif token_in_paren.ttype is Wildcard:
-                        has_wildcard = True
-                        func_str += str(token_in_paren)
-                    else:
-                        func_str += str(token_in_paren)
-            else:
-                func_str += str(token)
-        func_str = f'({func_str}).{agg_func_name}()' if not has_wildcard else f'{agg_func_name}()'
-    return func_str
+def load_udf(func_code: str):
+    from . import udf as udf_repo
+    udf_name = "udf_" + func_code.upper()
+    udf = getattr(udf_repo, udf_name, None)
+    if not udf:
+        raise DFSelectExecError(f'udf [{func_code}] not defined')
+    return udf
 
 
-def eval_expr(expr, columns, row_key):
-    if isinstance(expr, Operation):
-        return eval_oper(expr, columns, row_key)
-    elif isinstance(expr, Function):
-        return eval_func(expr, columns, row_key)
+def _like(sequence, pattern: str):
+    inner = pattern.strip('%')
+    if '%' in inner or '_' in inner:
+        regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern)
+        return sequence.contains(f'^{regex}$', regex=True)
+    if pattern.startswith('%') and pattern.endswith('%') and len(pattern) > 1:
+        return sequence.contains(inner, regex=False)
+    if pattern.startswith('%'):
+        return sequence.endswith(inner)
+    if pattern.endswith('%'):
+        return sequence.startswith(inner)
+    return sequence == pattern
+
+
+def _eval_row(r, expr):
+    """
+    evaluate the bound expression of the udf arguments over a row
+    """
+    if isinstance(expr, BoundColumn):
+        return r[expr.name]
+    if isinstance(expr, Literal):
+        return expr.value
+    if isinstance(expr, BinaryOp) and expr.op in _BINARY_OPS:
+        left, right = _eval_row(r, expr.left), _eval_row(r, expr.right)
+        if expr.op in ('and', 'or'):
+            return (left and right) if expr.op == 'and' else (left or right)
+        return _BINARY_OPS[expr.op](left, right)
+    if isinstance(expr, UnaryOp):
+        operand = _eval_row(r, expr.operand)
+        return not operand if expr.op == 'not' else -operand if expr.op == '-' else operand
+    if isinstance(expr, IsNull):
+        return (_eval_row(r, expr.operand) is None) != expr.negated
+    if isinstance(expr, Call) and not is_agg_call(expr):
+        return load_udf(expr.name)(*[_eval_row(r, arg) for arg in expr.args])
+    raise DFSelectExecError(f'unsupported expression in udf arguments: {expr.text}')
@@ -1,12 +1,35 @@
+from contextlib import nullcontext
+
 import pandas as pd
 from pandas.core.groupby import DataFrameGroupBy
-from sqlparse.sql import Identifier
 
-from .expr import eval_expr
-from dfselect.context import ctx_load_table, ctx_config_get_table_loaders
+from .agg import PartialAggregate, split_agg_columns, arg_column_name, is_exact_agg, aggregate_grouped
+from .chunked import ChunkedFrame
+from .expr import eval_expr, eval_column
+from .sample import sample_table
+from .window import compute_windows
+from .spill import sizeof_frame, external_sort, grace_hash_join, broadcast_hash_join
+from .stats import compute_table_stats
+from .zonemap import compute_zone_map, extend_zone_map, prune_blocks
+from .sortorder import compute_sort_order, extend_sort_order, slice_sorted, is_sorted
+from .bitmap import compute_bitmap_index, extend_bitmap_index, filter_by_bitmaps
+from .shared import publish_table, unpublish_table, catalog_loader
+from .store import write_table_store, open_table_store, store_loader
+from .compact import compact_frame
+from dfselect.context import ctx_load_table, ctx_config_get_table_loaders, ctx_cache_loaded_table, \
+    ctx_config_get_copy_on_write, ctx_config_get_memory_budget, ctx_config_get_spill_dir, ctx_table_stats, \
+    ctx_find_zone_map, ctx_find_sort_order, ctx_find_bitmap_index, ctx_config_get_compact_dtypes
 from dfselect.errors import DFSelectExecError, DFSelectContextError
-from dfselect.log import log
-from dfselect.util import check_col_name, is_col_literal, reparse_token, squeeze_blank
+from dfselect.plan import BoundColumn, split_conjuncts
+from dfselect.util import is_copy_on_write
+
+# the constant group key to aggregate the whole table as a single group
+_WHOLE_TABLE_KEY = '__whole_table'
+# the fraction of the rows kept by the conjuncts of the filter, below which the table is filtered before the next
+# conjuncts are evaluated
+_FILTER_SHRINK_RATIO = 0.5
+# the min rows of the first batch deduplicated by distinct with limit, the next batches are twice as large
+_DISTINCT_MIN_BATCH_ROWS = 4096
 
 
 def exec_JOIN(df, ctx: dict, join_table, join_mode, join_exprs):
@@ -29,133 +52,508 @@ def exec_JOIN(df, ctx: dict, join_table, join_mode, join_exprs):
         left_on.append(left[1])
         right_on.append(right[1])
 
-    merged_df = df.merge(join_df, how=join_mode.lower(), left_on=left_on, right_on=right_on,
-                         suffixes=['', '@' + join_table_alias]).rename(
-        mapper=lambda x: '.'.join(reversed(x.split('@', 2))) if '@' in x else x, axis=1)
+    # prefix the overlapped columns of the join table with its alias before merging, renaming the (smaller) join
+    # table instead of the merged table, the key pairs of the same name are merged into one column by pandas
+    merged_keys = {l for l, r in zip(left_on, right_on) if l == r}
+    join_columns = {c: f'{join_table_alias}.{c}' for c in join_df.columns if c in df.columns and c not in merged_keys}
+    if join_columns:
+        join_df = join_df.rename(columns=join_columns)
+        right_on = [join_columns.get(c, c) for c in right_on]
+
+    if _over_memory_budget(ctx, df, join_df):
+        how, memory_budget = join_mode.lower(), ctx_config_get_memory_budget(ctx)
+        build_side = _join_build_side(ctx, df, join_df, join_table[0], how, memory_budget)
+        if build_side:
+            return broadcast_hash_join(df, join_df, how, left_on, right_on, memory_budget, build_side)
+        return grace_hash_join(df, join_df, how, left_on, right_on, memory_budget, ctx_config_get_spill_dir(ctx))
+    merged_df = _materialize(df).merge(join_df, how=join_mode.lower(), left_on=left_on, right_on=right_on)
     return merged_df
 
 
 def exec_PROJECT(df, ctx: dict, *columns):
-    if isinstance(df, pd.DataFrame):
-        df = _extend_columns(df, *columns)
-        col_names = list(map(lambda t: t[1], columns))
-        proj_col_names = [check_col_name(c, df.columns) for c in col_names]
-        return df[proj_col_names]
+    if isinstance(df, ChunkedFrame):
+        return df.map(lambda chunk: exec_PROJECT(chunk, ctx, *columns))
+    elif isinstance(df, PartialAggregate):
+        return df.finalize()
+    elif isinstance(df, pd.DataFrame):
+        # the projected columns refer to the columns of the table without copy
+        return pd.concat([_get_column(df, c[0]) for c in columns], axis=1, keys=[c[1] for c in columns])
     elif isinstance(df, DataFrameGroupBy):
         gf = df
-        agg_columns = _check_and_get_agg_columns(gf.keys, *columns)
-        conds = []
-        for agg_column in agg_columns:
-            squeezed_column = squeeze_blank(agg_column[0])
-            if squeezed_column == 'count(*)':
-                conds.append('"' + agg_column[1] + '":pd.Series(r.index).count()')
-            else:
-                col_item = reparse_token(agg_column[0])
-                conds.append('"' + agg_column[1] + '":' + eval_expr(col_item, gf._selected_obj.columns, 'r'))
-
-        group_by_expr = 'pd.Series({' + ','.join(conds) + '})'
-        log.debug('generated group-by expr:')
-        log.debug(f'> {group_by_expr}')
-        log.debug(f'dataframe before group-by: \n{gf._selected_obj}')
-        # log.debug(gf._selected_obj)
-        return gf.apply(lambda r: eval(group_by_expr)).reset_index()
+        group_keys = [k for k in gf.keys if k != _WHOLE_TABLE_KEY]
+        agg_columns = _check_and_get_agg_columns(group_keys, *columns)
+        return aggregate_grouped(gf, agg_columns).reset_index(drop=not group_keys)
     return None
 
 
 def exec_FILTER(df, ctx: dict, filter_expr):
-    import re
-    where_expr = re.sub('==*', '==', filter_expr)
-    return df.query(where_expr)
+    if isinstance(df, ChunkedFrame):
+        return df.map(lambda chunk: _filter(chunk, filter_expr))
+    # the range conjuncts of the sorted columns of the registered table are sliced by binary search
+    sort_order = ctx_find_sort_order(ctx, df)
+    if sort_order is not None and sort_order.row_count == len(df):
+        df, filter_expr = slice_sorted(df, sort_order, filter_expr)
+        if filter_expr is None:
+            return df
+    # the equality conjuncts of the indexed columns are evaluated by the bitmaps of the registered table
+    bitmap_index = ctx_find_bitmap_index(ctx, df)
+    if bitmap_index is not None and bitmap_index.row_count == len(df):
+        df, filter_expr = filter_by_bitmaps(df, bitmap_index, filter_expr)
+        if filter_expr is None:
+            return df
+    # the blocks of the registered table which can not match are skipped by its zone map
+    zone_map = ctx_find_zone_map(ctx, df)
+    if zone_map is not None and zone_map.row_count == len(df):
+        df = prune_blocks(df, zone_map, filter_expr)
+    return _filter(df, filter_expr)
+
+
+def exec_EXTEND(df, ctx: dict, *columns):
+    """
+    extend the computed columns to the table, e.g. the hidden columns of the common expressions
+    :param df: the table data object
+    :param ctx: the context object
+    :param columns: the columns of form (column_expr, column_name)
+    :return: the extended table
+    """
+    if isinstance(df, ChunkedFrame):
+        return df.map(lambda chunk: _extend_columns(chunk, *columns))
+    return _extend_columns(df, *columns)
+
+
+def exec_WINDOW(df, ctx: dict, *window_columns):
+    """
+    compute the window columns, and extend them to the table by their aliases
+    :param df: the table data object
+    :param ctx: the context object
+    :param window_columns: the window columns of form (func_name, func_args, partition_by, order_by, column_alias)
+    :return: the extended table
+    """
+    df = _materialize(df)
+    windows = compute_windows(df, window_columns, _get_column)
+    return df.assign(**windows)
 
 
 def exec_ORDER(df, ctx: dict, *order_items):
-    df = _extend_columns(df, *[(o[0], o[0]) for o in order_items])
-    sort_by = []
-    sort_asc = []
-    for order_item in order_items:
-        sort_by.append(order_item[0])
-        sort_asc.append(order_item[1])
-    return df.sort_values(by=sort_by, ascending=sort_asc)
+    sort_asc = [o[1] for o in order_items]
+    if _is_ordered(df, ctx, *order_items):
+        return df
+    if _over_memory_budget(ctx, df):
+        return external_sort(df, lambda chunk: _get_sort_keys(chunk, *order_items), sort_asc,
+                             ctx_config_get_memory_budget(ctx), ctx_config_get_spill_dir(ctx))
+    # sort the order keys only, then take the rows of the table in order once
+    df = _materialize(df)
+    sort_keys = _get_sort_keys(df, *order_items).reset_index(drop=True)
+    order = sort_keys.sort_values(by=list(sort_keys.columns), ascending=sort_asc).index
+    return df.take(order)
 
 
 def exec_LIMIT(df, ctx: dict, from_idx, limit):
+    if isinstance(df, ChunkedFrame):
+        # the chunks after the limit are never produced
+        return df.head(from_idx + limit).iloc[from_idx:]
     return df.iloc[from_idx:from_idx + limit]
 
 
+def exec_DISTINCT(df, ctx: dict, limit: list = None):
+    """
+    remove the duplicated rows of the (projected) table by hashing the rows, the null values are equal. the first
+    row of each distinct row is kept, so the table ordered before keeps its order
+    :param df: the table data object
+    :param ctx: the context object
+    :param limit: the limit of the distinct rows of form (offset, count), the rows are deduplicated batch by batch
+    (chunk by chunk for the chunked table) until enough distinct rows are found, the other rows are never hashed or
+    produced
+    :return: the distinct table
+    """
+    if limit is None:
+        if isinstance(df, ChunkedFrame):
+            # the duplicated rows are removed from each chunk before collecting the chunks
+            df = df.map(lambda chunk: chunk.drop_duplicates())
+        return _materialize(df).drop_duplicates()
+
+    from_idx, count = limit
+    distinct_rows = from_idx + count
+    distinct = None
+    for batch in _distinct_batches(df, distinct_rows):
+        batch = batch.drop_duplicates()
+        distinct = batch if distinct is None else pd.concat([distinct, batch]).drop_duplicates()
+        if len(distinct) >= distinct_rows:
+            break
+    if distinct is None:
+        distinct = df.template if isinstance(df, ChunkedFrame) else df
+    return distinct.iloc[from_idx:distinct_rows]
+
+
 def exec_GROUP(df, ctx: dict, group_items, proj_columns):
-    # process projection at first to support group on expression (udf or operation)
-    df = _extend_columns(df, *group_items)
     if proj_columns:
-        gkeys = [t[0] for t in group_items]
-        agg_columns = _check_and_get_agg_columns(gkeys, *proj_columns)
-        # df = _extend_columns(df, ctx, ('if(b>t2.b,1,-1)', 'if(b>t2.b,1,-1)'))
+        # aggregate by the mergeable partial states if possible, the chunked table is aggregated chunk by chunk and
+        # may be estimated by sketches, the table in memory is aggregated exactly
+        aggregate = partial_aggregate(df, ctx, group_items, proj_columns, exact=not isinstance(df, ChunkedFrame))
+        if aggregate is not None:
+            return aggregate
 
-    group_keys = [check_col_name(g[0], df.columns) for g in group_items]
+    df = _materialize(df)
+    # process projection at first to support group on expression (udf or operation)
+    df = _extend_group_columns(df, group_items)
+    group_keys = [_group_key(g) for g in group_items]
+    if proj_columns:
+        _check_and_get_agg_columns(group_keys, *proj_columns)
+    if not group_keys:
+        df = df.assign(**{_WHOLE_TABLE_KEY: 0})
+        group_keys = [_WHOLE_TABLE_KEY]
     gf = df.groupby(group_keys)
     return gf
 
 
-def exec_LOAD(df, ctx: dict, table: tuple):
-    return _load_table(ctx, table)
+def exec_LOAD(df, ctx: dict, table: tuple, table_sample: tuple = None):
+    return _load_table(ctx, table, table_sample)
 
 
 def register_table_loaders(ctx: dict):
     pass
 
 
-def _load_table(ctx: dict, table: tuple):
+def exec_context(ctx: dict):
+    """
+    the context to run the operators in, enable the copy-on-write of pandas so that the intermediate tables share
+    the buffers of the loaded tables and never copy the columns they do not modify
+    :param ctx: the context object
+    :return: the context manager
+    """
+    if not ctx_config_get_copy_on_write(ctx) or is_copy_on_write():
+        return nullcontext()
+    return pd.option_context('mode.copy_on_write', True)
+
+
+def table_schema(df):
+    """
+    the columns of the table to bind the expressions of the operators to
+    :param df: the table data object
+    :return: the columns of form (column_name, dtype)
+    """
+    return list(zip(df.columns, df.template.dtypes if isinstance(df, ChunkedFrame) else df.dtypes))
+
+
+def table_stats(df, columns: list = None):
+    """
+    compute the statistics of the table, see `ctx_table_stats`
+    :param df: the table data object
+    :param columns: the columns to compute the stats of, all the columns if not provided
+    :return: the table stats, None for the chunked table, which is never scanned ahead of the query
+    """
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return compute_table_stats(df, columns)
+
+
+def build_zone_map(df, block_rows: int):
+    """
+    build the zone map of the table, see `ctx_add_table`
+    :param df: the table data object
+    :param block_rows: the rows of each block
+    :return: the zone map
+    """
+    return compute_zone_map(df, block_rows)
+
+
+def append_zone_map(zone_map, df):
+    """
+    maintain the zone map of the table appended with rows, see `ctx_append_table`
+    :param zone_map: the zone map of the table before appending
+    :param df: the appended table
+    :return: the zone map of the appended table
+    """
+    return extend_zone_map(zone_map, df)
+
+
+def output(result):
+    result = _materialize(result)
+    # the result may share the buffers of the loaded tables, detach it if copy-on-write is not enabled out of the
+    # operators, so that modifying the result never writes through the loaded tables
+    if isinstance(result, pd.DataFrame) and not is_copy_on_write():
+        return result.copy()
+    return result
+
+
+def output_batches(result, batch_rows: int):
+    """
+    produce the result batch by batch for the result sink, the chunks of the chunked table are produced one by one
+    and never collected. the batches refer to the result without copy, at least one (maybe empty) batch is produced
+    :param result: the query result
+    :param batch_rows: the max rows of the batches
+    :return: the iterator of the DataFrame batches
+    """
+    chunks = result if isinstance(result, ChunkedFrame) else [result]
+    produced = False
+    for chunk in chunks:
+        for start in range(0, len(chunk), batch_rows):
+            produced = True
+            yield chunk.iloc[start:start + batch_rows]
+    if not produced:
+        yield result.template if isinstance(result, ChunkedFrame) else result
+
+
+def build_sort_order(df, columns: list = None):
+    """
+    track the sorted columns of the table, see `ctx_add_table`
+    :param df: the table data object
+    :param columns: the names of the columns declared sorted, detected if not provided
+    :return: the sort order
+    """
+    return compute_sort_order(df, columns)
+
+
+def append_sort_order(sort_order, df):
+    """
+    maintain the sort order of the table appended with rows, see `ctx_append_table`
+    :param sort_order: the sort order of the table before appending
+    :param df: the appended table
+    :return: the sort order of the appended table
+    """
+    return extend_sort_order(sort_order, df)
+
+
+def build_bitmap_index(df, columns: list):
+    """
+    build the bitmap index of the columns of the table, see `ctx_add_table`
+    :param df: the table data object
+    :param columns: the names of the columns to index
+    :return: the bitmap index
+    """
+    return compute_bitmap_index(df, columns)
+
+
+def append_bitmap_index(bitmap_index, df):
+    """
+    maintain the bitmap index of the table appended with rows, see `ctx_append_table`
+    :param bitmap_index: the bitmap index of the table before appending
+    :param df: the appended table
+    :return: the bitmap index of the appended table
+    """
+    return extend_bitmap_index(bitmap_index, df)
+
+
+def append(df, rows):
+    """
+    append the rows to the table
+    :param df: the table data object
+    :param rows: the rows to append, a DataFrame or any data accepted by the DataFrame constructor
+    :return: the appended table, and the appended rows as they are placed in the appended table
+    """
+    if not isinstance(rows, pd.DataFrame):
+        rows = pd.DataFrame(rows)
+    appended_df = pd.concat([df, rows], ignore_index=isinstance(df.index, pd.RangeIndex))
+    return appended_df, appended_df.iloc[len(df):]
+
+
+def partial_aggregate(df, ctx: dict, group_items, proj_columns, exact: bool = True):
+    """
+    compute the mergeable partial states of the aggregation projected from the (grouped) table
+    :param df: the table data object before grouping, the chunked table is aggregated chunk by chunk
+    :param ctx: the context object
+    :param group_items: the group-by items, empty for aggregation over the whole table
+    :param proj_columns: the projected columns
+    :param exact: whether the aggregation must be exact, the approximate aggregation (e.g. median by sketches) is
+    not allowed if set
+    :return: the partial aggregate, None if any projected column can not be computed from partial states
+    """
+    agg_columns = _check_and_get_agg_columns([_group_key(g) for g in group_items], *proj_columns)
+    agg_specs = split_agg_columns(agg_columns)
+    if not agg_specs or (exact and not all(is_exact_agg(spec) for spec in agg_specs)):
+        return None
+    if not isinstance(df, ChunkedFrame):
+        return _partial_aggregate_chunk(df, group_items, agg_specs, agg_columns)
+
+    aggregate = None
+    for chunk in df:
+        chunk_aggregate = _partial_aggregate_chunk(chunk, group_items, agg_specs, agg_columns)
+        aggregate = chunk_aggregate if aggregate is None else aggregate.merge(chunk_aggregate)
+    return aggregate if aggregate is not None else \
+        _partial_aggregate_chunk(df.template, group_items, agg_specs, agg_columns)
+
+
+def _load_table(ctx: dict, table: tuple, table_sample: tuple = None):
+    """
+    load the table from context or by the table loaders
+    :param ctx: the context object
+    :param table: the table of form (table_source, table_alias)
+    :param table_sample: the table sample of form (sample_size, sample_unit, seed), the table is sampled once loaded,
+    or by the table loader if it provides `load_sample(table_source, table_sample)` (e.g. block sampling)
+    :return: the table data object, the dtypes of the table in memory loaded by the table loaders are compacted once
+    loaded if configured, see `compact_frame`
+    """
     table_source, table_alias = table
     df = None
+    sampled = False
     try:
-        df = ctx_load_table(ctx, table_source, table_alias)
+        df = ctx_load_table(ctx, table_source, table_alias, alias_replace=False)
     except DFSelectContextError as e:
         extra_table_loaders = ctx_config_get_table_loaders(ctx)
         if extra_table_loaders:
             for extra_table_loader in extra_table_loaders:
-                df = extra_table_loader(table_source)
+                if table_sample and hasattr(extra_table_loader, 'load_sample'):
+                    df = extra_table_loader.load_sample(table_source, table_sample)
+                    sampled = df is not None
+                else:
+                    df = extra_table_loader(table_source)
+                if df is not None:
+                    break
         if df is None:
             raise e
+        if ctx_config_get_compact_dtypes(ctx) and isinstance(df, pd.DataFrame):
+            df = compact_frame(df)
+        # the sampled table is never kept as the whole table, neither is the iterator of chunks, which can be read
+        # once only, the loader is called again by the next query
+        if not sampled and not _is_chunk_iterator(df):
+            ctx_cache_loaded_table(ctx, table_source, df)
 
+    # the iterator of chunks (e.g. read_csv with chunksize) is loaded as the chunked table
+    if _is_chunk_iterator(df):
+        df = ChunkedFrame.from_iterator(df)
+    if table_sample and not sampled:
+        df = sample_table(df, *table_sample)
     return df
 
 
-def _load_udf(func_code: str):
-    from . import udf as udf_repo
-    udf_name = "udf_" + func_code.upper()
-    udf = getattr(udf_repo, udf_name, None)
-    if not udf:
-        raise DFSelectExecError(f'udf [{func_code}] not defined')
-    return udf
+def _is_chunk_iterator(df):
+    return not isinstance(df, pd.DataFrame) and hasattr(df, '__next__')
+
+
+def _distinct_batches(df, distinct_rows: int):
+    """
+    split the table into the batches to deduplicate, the chunks of the chunked table, or the slices of the table in
+    memory which grow twice as large from a few times the distinct rows
+    """
+    if isinstance(df, ChunkedFrame):
+        yield from df
+        return
+    start, batch_rows = 0, max(_DISTINCT_MIN_BATCH_ROWS, distinct_rows * 4)
+    while start < len(df):
+        yield df.iloc[start:start + batch_rows]
+        start, batch_rows = start + batch_rows, batch_rows * 2
+
+
+def _partial_aggregate_chunk(df: pd.DataFrame, group_items, agg_specs, agg_columns):
+    df = _extend_group_columns(df, group_items)
+    group_keys = [_group_key(g) for g in group_items]
+    df = _extend_columns(df, *[(spec[1], arg_column_name(idx)) for idx, spec in enumerate(agg_specs) if spec[1]])
+    return PartialAggregate.from_frame(df, group_keys, agg_specs, agg_columns)
+
+
+def _materialize(df):
+    """
+    collect the chunked table into a DataFrame
+    """
+    return df.to_frame() if isinstance(df, ChunkedFrame) else df
+
+
+def _over_memory_budget(ctx: dict, *dfs):
+    """
+    check whether the tables exceed the memory budget, the chunked table is over budget always
+    """
+    memory_budget = ctx_config_get_memory_budget(ctx)
+    if not memory_budget:
+        return False
+    sizes = [sizeof_frame(df) for df in dfs]
+    return None in sizes or sum(sizes) > memory_budget
+
+
+def _join_build_side(ctx: dict, df, join_df: pd.DataFrame, join_source: str, how: str, memory_budget: int):
+    """
+    select the side of the join kept in memory, the side fitting in half of the memory budget whose rows are never
+    kept unmatched, the one of fewer rows if both. the row count of the join table is taken from its stats if they
+    are computed already (e.g. for the filter), the tables in memory are never scanned for it
+    :return: left, right, or None if neither side fits and the tables are joined by grace hash join
+    """
+    candidates = []
+    if how in ('inner', 'left') and sizeof_frame(join_df) <= memory_budget // 2:
+        stats = ctx_table_stats(ctx, join_source, compute=False)
+        candidates.append((stats.row_count if stats is not None else len(join_df), 'right'))
+    if how in ('inner', 'right') and isinstance(df, pd.DataFrame) and sizeof_frame(df) <= memory_budget // 2:
+        candidates.append((len(df), 'left'))
+    return min(candidates)[1] if candidates else None
+
+
+def _get_column(df, expr):
+    """
+    get the column series of an expression from the table
+    :param df: the table data object
+    :param expr: the bound expression
+    :return: the column series, the series of bound column refers to the column of the table without copy
+    """
+    return eval_column(df, expr)
+
+
+def _get_sort_keys(df, *order_items):
+    return pd.concat([_get_column(df, o[0]) for o in order_items], axis=1, keys=range(len(order_items)))
+
+
+def _is_ordered(df, ctx: dict, *order_items):
+    """
+    check whether the table is in the order of the single order key already, by the sort order of the registered
+    table, or by checking the key column (one pass over the values instead of sorting them)
+    """
+    if isinstance(df, ChunkedFrame) or len(order_items) != 1 or not isinstance(order_items[0][0], BoundColumn):
+        return False
+    column, ascending = order_items[0]
+    sort_order = ctx_find_sort_order(ctx, df)
+    if ascending and sort_order is not None and sort_order.row_count == len(df) and \
+            column.position in sort_order.positions:
+        return True
+    return is_sorted(df.iloc[:, column.position], ascending)
+
+
+def _filter(df: pd.DataFrame, filter_expr):
+    # the conjuncts are evaluated in order (the most selective first if the table stats are known), the rows
+    # filtered out by a selective conjunct are not evaluated by the next conjuncts
+    mask = None
+    for conjunct in split_conjuncts(filter_expr):
+        matched = eval_expr(df, conjunct)
+        if not isinstance(matched, pd.Series):
+            # the constant condition keeps all the rows or none
+            if not matched:
+                return df.iloc[:0]
+            continue
+        if matched.dtype != bool:
+            # the null condition filters the row out
+            matched = matched.fillna(False).astype(bool)
+        mask = matched if mask is None else mask & matched
+        if mask.sum() < len(mask) * _FILTER_SHRINK_RATIO:
+            df, mask = df[mask], None
+    return df if mask is None else df[mask]
+
+
+def _group_key(group_item):
+    """
+    the group column of the group-by item, the group-by expression is extended to the table by its alias
+    """
+    return group_item[0].name if isinstance(group_item[0], BoundColumn) else group_item[1]
+
+
+def _extend_group_columns(df, group_items):
+    return _extend_columns(df, *[g for g in group_items if not isinstance(g[0], BoundColumn)])
 
 
 def _extend_columns(df, *columns):
-    if isinstance(df, pd.DataFrame):
-        assign_map = dict()
-        for column in columns:
-            col = column[0]
-            if not col or is_col_literal(col):
-                const_val = col
-                column_series = df.apply(lambda r: const_val, axis=1)
-            else:
-                col_item = reparse_token(col)
-                if isinstance(col_item, Identifier):
-                    column_series = df.apply(lambda r: r[check_col_name(col, df.columns)], axis=1)
-                else:
-                    column_series = df.apply(lambda r: eval(eval_expr(col_item, df.columns, 'r')), axis=1)
-            assign_map[column[1]] = column_series
-        if assign_map:
-            df = df.assign(**assign_map)
+    if isinstance(df, pd.DataFrame) and columns:
+        df = df.assign(**{column[1]: _get_column(df, column[0]) for column in columns})
     return df
 
 
-def _check_and_get_agg_columns(keys, *columns):
-    check_keys = [squeeze_blank(k) for k in keys]
-    unmap_keys = [squeeze_blank(k) for k in keys]
+def _check_and_get_agg_columns(group_keys, *columns):
+    """
+    split the aggregated columns from the projected columns, all the group keys should be projected
+    :param group_keys: the group columns
+    :param columns: the projected columns, the projected group-by item is bound to the group column
+    :return: the aggregated columns
+    """
+    unmap_keys = list(group_keys)
     agg_columns = []
     for column in columns:
-        squeezed_column = squeeze_blank(column[0])
-        if squeezed_column in [squeeze_blank(k) for k in check_keys]:
-            unmap_keys.remove(squeezed_column)
+        if isinstance(column[0], BoundColumn) and column[0].name in group_keys:
+            if column[0].name in unmap_keys:
+                unmap_keys.remove(column[0].name)
         else:
             agg_columns.append(column)
     if len(unmap_keys) > 0:
@@ -0,0 +1,271 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy
+
+from .expr import AGG_FUNCS, eval_column, outer_columns, agg_calls, load_udf, widen_int
+from dfselect.errors import DFSelectExecError
+from dfselect.parse.ast import Literal, Star, Call
+from dfselect.plan import expr_key
+from dfselect.sketch import QuantileSketch, DistinctSketch
+
+# the aggregate functions which can be computed from mergeable partial states
+_PARTIAL_AGG_FUNCS = ('sum', 'count', 'avg', 'mean', 'min', 'max', 'std', 'median', 'quantile',
+                      'approx_count_distinct', 'approx_quantile')
+# the aggregate functions whose partial states are the aggregated values themselves, merged by the same function
+_SELF_MERGED_AGG_FUNCS = ('min', 'max')
+# the aggregate functions whose partial states are quantile sketches
+_QUANTILE_AGG_FUNCS = ('median', 'quantile', 'approx_quantile')
+# the aggregate functions whose results are approximate, by query or by the merged sketches
+_APPROX_AGG_FUNCS = ('approx_count_distinct', 'approx_quantile')
+
+# the state column of the row count of each group
+_ROWS_STATE = '__rows'
+
+
+def split_agg_columns(agg_columns):
+    """
+    split the aggregated columns into the distinct aggregate function calls, the projected expressions are computed
+    from the values of the calls once the partial states are finalized, e.g. `sum(v) * 2` or `count(*) + 1`
+    :param agg_columns: the aggregated columns of form (column_expr, column_alias)
+    :return: the aggregate specs of the calls of form (func_name, arg_expr, call_key, func_params), see
+    `split_agg_call`, None if any call is not supported by partial states, or any column is referred out of the calls
+    """
+    agg_specs = dict()
+    for expr, _ in agg_columns:
+        if outer_columns(expr):
+            return None
+        for call in agg_calls(expr):
+            call_key = expr_key(call)
+            if call_key not in agg_specs:
+                agg_spec = split_agg_call(call)
+                if agg_spec is None:
+                    return None
+                agg_specs[call_key] = agg_spec
+    return list(agg_specs.values())
+
+
+def split_agg_call(call: Call):
+    """
+    split the aggregate function call into the function and its argument
+    :param call: the aggregate function call
+    :return: the tuple of (func_name, arg_expr, call_key, func_params), the arg_expr is None for count(*), the
+    func_params are the literal parameters after the argument (e.g. the quantile of approx_quantile), None if the
+    call is not of the aggregate function supported by partial states
+    """
+    if call.over is not None or call.name not in _PARTIAL_AGG_FUNCS or not call.args:
+        return None
+    func_name = call.name
+    func_params = ()
+    if len(call.args) > 1:
+        if func_name != 'approx_quantile':
+            return None
+        if len(call.args) != 2:
+            raise DFSelectExecError(f'approx_quantile accepts a column and a quantile: {call.text}')
+        quantile = call.args[1]
+        if not isinstance(quantile, Literal) or isinstance(quantile.value, (str, bool)) or quantile.value is None:
+            raise DFSelectExecError(f'invalid quantile of approx_quantile: {quantile.text}')
+        if not 0 <= quantile.value <= 1:
+            raise DFSelectExecError(f'quantile of approx_quantile should be in [0, 1]: {quantile.text}')
+        func_params = (float(quantile.value),)
+    arg_expr = call.args[0]
+    if isinstance(arg_expr, Star):
+        return (func_name, None, expr_key(call), func_params) if func_name == 'count' else None
+    return func_name, arg_expr, expr_key(call), func_params
+
+
+def is_exact_agg(agg_spec: tuple):
+    """
+    check whether the aggregate spec is computed from the merged partial states as exact as the query asks, the
+    approximate functions (e.g. approx_count_distinct) are always computed by sketches as asked
+    """
+    return agg_spec[0] in _APPROX_AGG_FUNCS or agg_spec[0] not in _QUANTILE_AGG_FUNCS
+
+
+def arg_column_name(idx: int):
+    """
+    the name of the extended column to hold the argument of the idx-th aggregate function
+    """
+    return f'__arg_{idx}'
+
+
+def aggregate_grouped(gf: DataFrameGroupBy, agg_columns):
+    """
+    aggregate the columns of the grouped table, the argument of each aggregate function call is evaluated over the
+    whole table once and aggregated by the groupby function, then the projected expressions are evaluated over the
+    aggregated values
+    :param gf: the grouped table
+    :param agg_columns: the aggregated columns of form (column_expr, column_alias)
+    :return: the aggregated table indexed by the group keys
+    """
+    df = gf.obj
+    calls = dict()
+    for expr, _ in agg_columns:
+        columns = outer_columns(expr)
+        if columns:
+            raise DFSelectExecError(f'column {columns[0].text} should be grouped or aggregated')
+        for call in agg_calls(expr):
+            calls.setdefault(expr_key(call), call)
+
+    # the sum of the narrow integers is computed in 64 bits, which would overflow their width
+    arg_columns = {arg_column_name(idx): widen_int(eval_column(df, call.args[0])) if call.name == 'sum'
+                   else eval_column(df, call.args[0])
+                   for idx, call in enumerate(calls.values()) if call.args and not isinstance(call.args[0], Star)}
+    grouped = df.assign(**arg_columns).groupby(gf.keys) if arg_columns else gf
+    sizes = grouped.size()
+    computed = dict()
+    for idx, (key, call) in enumerate(calls.items()):
+        if arg_column_name(idx) not in arg_columns:
+            if call.name != 'count':
+                raise DFSelectExecError(f'{call.name}(*) is not supported')
+            computed[key] = sizes
+            continue
+        params = [arg.value for arg in call.args[1:] if isinstance(arg, Literal)]
+        if len(params) != len(call.args) - 1:
+            raise DFSelectExecError(f'the params of aggregate function should be literal: {call.text}')
+        arg_values = grouped[arg_column_name(idx)]
+        if call.name in AGG_FUNCS:
+            computed[key] = getattr(arg_values, AGG_FUNCS[call.name])(*params)
+        else:
+            udf = load_udf(call.name)
+            computed[key] = arg_values.agg(lambda values: udf(values, *params))
+
+    index_frame = pd.DataFrame(index=sizes.index)
+    return pd.DataFrame({column_alias: eval_column(index_frame, expr, computed) for expr, column_alias in agg_columns},
+                        index=sizes.index)
+
+
+def _merge_sketches(sketches):
+    sketches = list(sketches)
+    return reduce(lambda merged, sketch: merged.merge(sketch), sketches, type(sketches[0])())
+
+
+class PartialAggregate(object):
+    """
+    the mergeable partial states of a grouped (or ungrouped) aggregation
+
+    the states are kept in a table with the group keys and the state columns of each aggregate argument: the sum,
+    the non-null count, the sum of squares (for std), the min/max, the quantile sketch (for median/quantile) and the
+    distinct count sketch, and the row count of each group. the partial aggregates computed from the chunks or partitions of
+    a table, even in separated processes, are merged into the partial aggregate of the whole table
+    """
+
+    def __init__(self, group_keys: list, agg_specs: list, agg_columns: list, states: pd.DataFrame):
+        self.group_keys = list(group_keys)
+        self.agg_specs = list(agg_specs)
+        self.agg_columns = list(agg_columns)
+        self.states = states
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, group_keys: list, agg_specs: list, agg_columns: list):
+        """
+        compute the partial states from a table
+        :param df: the table with the group keys and the argument columns extended by `arg_column_name`
+        :param group_keys: the group key columns
+        :param agg_specs: the aggregate specs split by `split_agg_columns`
+        :param agg_columns: the aggregated columns of form (column_expr, column_alias)
+        :return: the partial aggregate
+        """
+        named_aggs = dict()
+        # the extended columns of the squared arguments (for std), and of the integer arguments of the sums widened
+        # to 64 bits, which would overflow their width
+        extended_columns = dict()
+        for idx, (func_name, arg_expr, _, _) in enumerate(agg_specs):
+            if arg_expr is None:
+                continue
+            arg_column = arg_column_name(idx)
+            if func_name in _QUANTILE_AGG_FUNCS:
+                named_aggs[f'__sketch_{idx}'] = (arg_column, lambda s: QuantileSketch.from_values(s.to_numpy()))
+                continue
+            if func_name == 'approx_count_distinct':
+                named_aggs[f'__sketch_{idx}'] = (arg_column, lambda s: DistinctSketch.from_values(s))
+                continue
+            if func_name in _SELF_MERGED_AGG_FUNCS:
+                named_aggs[f'__{func_name}_{idx}'] = (arg_column, func_name)
+                continue
+            if func_name != 'count':
+                named_aggs[f'__sum_{idx}'] = (arg_column, 'sum')
+                arg_values = df[arg_column]
+                widened = widen_int(arg_values)
+                if widened is not arg_values:
+                    extended_columns[arg_column] = widened
+            if func_name == 'std':
+                extended_columns[f'__sq_arg_{idx}'] = df[arg_column].astype('float64') ** 2
+                named_aggs[f'__sq_{idx}'] = (f'__sq_arg_{idx}', 'sum')
+            named_aggs[f'__cnt_{idx}'] = (arg_column, 'count')
+        if extended_columns:
+            df = df.assign(**extended_columns)
+
+        if group_keys:
+            gf = df.groupby(group_keys)
+            rows = gf.size().rename(_ROWS_STATE)
+            states = gf.agg(**named_aggs).join(rows) if named_aggs else rows.to_frame()
+            states = states.reset_index()
+        else:
+            states = pd.DataFrame({
+                **{k: [f(df[c]) if callable(f) else getattr(df[c], f)()] for k, (c, f) in named_aggs.items()},
+                _ROWS_STATE: [len(df)]})
+        return cls(group_keys, agg_specs, agg_columns, states)
+
+    def merge(self, *others):
+        """
+        merge the partial states of the same aggregation, computed from other parts of the table
+        :param others: the other partial aggregates
+        :return: the merged partial aggregate
+        """
+        states = pd.concat([self.states, *[o.states for o in others]], ignore_index=True)
+        merge_aggs = {c: _state_merge_func(c) for c in states.columns if c not in self.group_keys}
+        if self.group_keys:
+            states = states.groupby(self.group_keys).agg(merge_aggs).reset_index()
+        else:
+            states = pd.DataFrame({c: [f(states[c]) if callable(f) else getattr(states[c], f)()]
+                                   for c, f in merge_aggs.items()})
+        return PartialAggregate(self.group_keys, self.agg_specs, self.agg_columns, states)
+
+    def finalize(self):
+        """
+        compute the aggregate result from the partial states, the aggregated columns are evaluated over the values of
+        the aggregate function calls
+        :return: the result table with the group keys and the aggregated columns
+        """
+        computed = dict()
+        for idx, (func_name, arg_expr, call_key, func_params) in enumerate(self.agg_specs):
+            if arg_expr is None:
+                values = self.states[_ROWS_STATE]
+            elif func_name in _QUANTILE_AGG_FUNCS:
+                q = func_params[0] if func_params else 0.5
+                values = self.states[f'__sketch_{idx}'].map(lambda s: s.quantile(q)).astype('float64')
+            elif func_name == 'approx_count_distinct':
+                values = self.states[f'__sketch_{idx}'].map(lambda s: s.count()).astype('int64')
+            elif func_name in _SELF_MERGED_AGG_FUNCS:
+                values = self.states[f'__{func_name}_{idx}']
+            elif func_name == 'count':
+                values = self.states[f'__cnt_{idx}']
+            elif func_name == 'sum':
+                values = self.states[f'__sum_{idx}']
+            elif func_name == 'std':
+                counts = self.states[f'__cnt_{idx}'].where(self.states[f'__cnt_{idx}'] > 1)
+                sums = self.states[f'__sum_{idx}']
+                variances = (self.states[f'__sq_{idx}'] - sums * sums / counts) / (counts - 1)
+                values = np.sqrt(variances.clip(lower=0))
+            else:
+                counts = self.states[f'__cnt_{idx}']
+                values = self.states[f'__sum_{idx}'] / counts.where(counts > 0)
+            computed[call_key] = values
+
+        result = {k: self.states[k] for k in self.group_keys}
+        index_frame = pd.DataFrame(index=self.states.index)
+        for expr, column_alias in self.agg_columns:
+            result[column_alias] = eval_column(index_frame, expr, computed)
+        return pd.DataFrame(result, index=self.states.index)
+
+
+def _state_merge_func(state_column: str):
+    # the sketches are merged, the min/max by themselves, and the sums and counts are summed
+    if state_column.startswith('__sketch_'):
+        return _merge_sketches
+    for func_name in _SELF_MERGED_AGG_FUNCS:
+        if state_column.startswith(f'__{func_name}_'):
+            return func_name
+    return 'sum'
@@ -0,0 +1,162 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dfselect.errors import DFSelectContextError
+from dfselect.parse.ast import Literal, UnaryOp, BinaryOp, InList, IsNull
+from dfselect.plan import BoundColumn, split_conjuncts, join_conjuncts
+
+# the max count of the distinct values of the column in bitmap index, each value takes a bit per row
+BITMAP_MAX_VALUES = 256
+
+
+class ColumnBitmaps(NamedTuple):
+    # the bitmap of the rows of each distinct value, packed 8 rows a byte in little bit order
+    values: dict
+    # the bitmap of the rows of non-null values
+    valid: np.ndarray
+
+
+class BitmapIndex(NamedTuple):
+    # the rows of the table the bitmaps are built for
+    row_count: int
+    # the bitmaps of the indexed columns, by the column position
+    columns: dict
+
+
+def compute_bitmap_index(df: pd.DataFrame, columns: list):
+    """
+    build the bitmap index of the low-cardinality columns of the table, a bitmap of the rows for each distinct value
+    :param df: the table data object
+    :param columns: the names of the columns to index
+    :return: the bitmap index
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise DFSelectContextError('bitmap index can only be built for the table in memory')
+    column_bitmaps = dict()
+    for name in columns:
+        positions = np.flatnonzero(df.columns == name)
+        if not len(positions):
+            raise DFSelectContextError(f'bitmap index column {name} not found')
+        for position in positions.tolist():
+            column_bitmaps[position] = _column_bitmaps(df.iloc[:, position], name)
+    return BitmapIndex(len(df), column_bitmaps)
+
+
+def extend_bitmap_index(bitmap_index: BitmapIndex, df: pd.DataFrame):
+    """
+    maintain the bitmap index of the table appended with rows, the bitmaps are computed again from the last byte
+    :param bitmap_index: the bitmap index of the table before appending
+    :param df: the appended table
+    :return: the bitmap index of the appended table
+    """
+    kept_bytes = bitmap_index.row_count // 8
+    column_bitmaps = dict()
+    for position, bitmaps in bitmap_index.columns.items():
+        if position >= df.shape[1]:
+            continue
+        appended = _column_bitmaps(df.iloc[kept_bytes * 8:, position], df.columns[position])
+        empty = np.zeros_like(appended.valid)
+        values = {value: np.concatenate([bits[:kept_bytes], appended.values.get(value, empty)])
+                  for value, bits in bitmaps.values.items()}
+        for value, bits in appended.values.items():
+            if value not in values:
+                values[value] = np.concatenate([np.zeros(kept_bytes, np.uint8), bits])
+        column_bitmaps[position] = ColumnBitmaps(values, np.concatenate([bitmaps.valid[:kept_bytes], appended.valid]))
+    return BitmapIndex(len(df), column_bitmaps)
+
+
+def filter_by_bitmaps(df: pd.DataFrame, bitmap_index: BitmapIndex, filter_expr):
+    """
+    evaluate the conjuncts of the filter on the indexed columns by the bitwise and/or of the bitmaps
+    :param df: the table the bitmap index is built for
+    :param bitmap_index: the bitmap index
+    :param filter_expr: the bound filter expression
+    :return: the rows matching the conjuncts, and the conjuncts of the filter remained to evaluate (None if no one
+    remains)
+    """
+    matched, remained = None, []
+    conjuncts = split_conjuncts(filter_expr)
+    for conjunct in conjuncts:
+        bits = _eval_bitmap(conjunct, bitmap_index)
+        if bits is None:
+            remained.append(conjunct)
+            continue
+        matched = bits if matched is None else matched & bits
+    if matched is None:
+        return df, filter_expr
+    rows = np.flatnonzero(np.unpackbits(matched, count=len(df), bitorder='little'))
+    return df.take(rows), join_conjuncts(remained) if remained else None
+
+
+def _column_bitmaps(values: pd.Series, name):
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if len(uniques) > BITMAP_MAX_VALUES:
+        raise DFSelectContextError(f'bitmap index column {name} has more than {BITMAP_MAX_VALUES} distinct values')
+    bitmaps = {_to_key(value): np.packbits(codes == code, bitorder='little') for code, value in enumerate(uniques)}
+    return ColumnBitmaps(bitmaps, np.packbits(codes >= 0, bitorder='little'))
+
+
+def _to_key(value):
+    # the numpy scalar is kept as the python value, to look up by the literals of the query
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _eval_bitmap(expr, bitmap_index: BitmapIndex):
+    """
+    compute the bitmap of the rows matching the predicate, None if the predicate is not on the indexed columns. as
+    the comparison of the engine, the null value matches the negated predicates, e.g. != and not in, but not the others
+    """
+    if isinstance(expr, BinaryOp) and expr.op in ('and', 'or'):
+        left = _eval_bitmap(expr.left, bitmap_index)
+        right = _eval_bitmap(expr.right, bitmap_index) if left is not None else None
+        if right is None:
+            return None
+        return left & right if expr.op == 'and' else left | right
+    if isinstance(expr, UnaryOp) and expr.op == 'not':
+        operand = _eval_bitmap(expr.operand, bitmap_index)
+        return None if operand is None else ~operand
+    if isinstance(expr, BinaryOp) and expr.op in ('=', '!='):
+        column, value = (expr.right, expr.left) if isinstance(expr.left, Literal) else (expr.left, expr.right)
+        bitmaps = _column_index(column, bitmap_index)
+        if bitmaps is None or not _is_value(value):
+            return None
+        bits = _value_bits(bitmaps, value.value)
+        return ~bits if expr.op == '!=' else bits
+    if isinstance(expr, InList):
+        bitmaps = _column_index(expr.operand, bitmap_index)
+        if bitmaps is None or not all(_is_value(item) for item in expr.items):
+            return None
+        bits = np.zeros_like(bitmaps.valid)
+        for item in expr.items:
+            bits |= _value_bits(bitmaps, item.value)
+        return ~bits if expr.negated else bits
+    if isinstance(expr, IsNull):
+        bitmaps = _column_index(expr.operand, bitmap_index)
+        if bitmaps is None:
+            return None
+        return bitmaps.valid.copy() if expr.negated else ~bitmaps.valid
+    return None
+
+
+def _column_index(column, bitmap_index: BitmapIndex):
+    if not isinstance(column, BoundColumn):
+        return None
+    return bitmap_index.columns.get(column.position)
+
+
+def _is_value(expr):
+    # the comparison to null is left to the engine
+    return isinstance(expr, Literal) and expr.value is not None
+
+
+def _value_bits(bitmaps: ColumnBitmaps, value):
+    bits = bitmaps.values.get(value)
+    if bits is None and isinstance(value, str):
+        # the datetime column is compared to the text of the timestamp
+        try:
+            bits = bitmaps.values.get(pd.Timestamp(value))
+        except ValueError:
+            pass
+    return bits if bits is not None else np.zeros_like(bitmaps.valid)
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from dfselect.errors import DFSelectExecError
+
+
+class ChunkedFrame(object):
+    """
+    the table produced lazily as a sequence of DataFrame chunks, e.g. the table spilled to disk
+
+    the chunks are produced again on every iteration, a zero-row template keeps the columns and dtypes of the table
+    in case no chunk is produced
+    """
+
+    def __init__(self, chunks_factory, template: pd.DataFrame):
+        """
+        :param chunks_factory: the function to produce the iterator of the DataFrame chunks
+        :param template: the zero-row DataFrame with the columns of the table
+        """
+        self._chunks_factory = chunks_factory
+        self.template = template
+
+    @classmethod
+    def from_iterator(cls, chunks):
+        """
+        wrap the iterator of DataFrame chunks (e.g. read_csv with chunksize) into a table, the chunks are produced
+        once only, so the table can be iterated once only
+        :param chunks: the iterator of DataFrame chunks
+        :return: the table
+        """
+        chunks = iter(chunks)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            raise DFSelectExecError('no chunk produced by the chunked table')
+        consumed = []
+
+        def _chunks_once():
+            if consumed:
+                raise DFSelectExecError('the chunked table can be iterated once only')
+            consumed.append(True)
+            yield first_chunk
+            yield from chunks
+
+        return cls(_chunks_once, first_chunk.iloc[:0])
+
+    def __iter__(self):
+        for chunk in self._chunks_factory():
+            if len(chunk) > 0:
+                yield chunk
+
+    @property
+    def columns(self):
+        return self.template.columns
+
+    def map(self, func):
+        """
+        transform the table chunk by chunk lazily
+        :param func: the function to transform a DataFrame chunk
+        :return: the transformed table
+        """
+        return ChunkedFrame(lambda: (func(chunk) for chunk in self), func(self.template))
+
+    def head(self, n: int):
+        """
+        collect the first n rows, the remained chunks are never produced
+        :param n: the row count
+        :return: the collected DataFrame
+        """
+        chunks = []
+        for chunk in self:
+            if n <= 0:
+                break
+            chunks.append(chunk.iloc[:n])
+            n -= len(chunks[-1])
+        return pd.concat(chunks) if chunks else self.template
+
+    def to_frame(self):
+        """
+        collect all the chunks into a DataFrame
+        """
+        chunks = list(self)
+        return pd.concat(chunks) if chunks else self.template
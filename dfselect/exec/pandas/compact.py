@@ -0,0 +1,101 @@
+import mmap
+
+import numpy as np
+import pandas as pd
+
+# the max ratio of the distinct values to the rows of the string column converted to categorical
+CATEGORY_MAX_RATIO = 0.5
+
+# the signed integer dtypes to downcast to, from the smallest
+_INT_DTYPES = (np.int8, np.int16, np.int32)
+
+
+def compact_frame(df: pd.DataFrame):
+    """
+    compact the dtypes of the columns of the table: the integer columns are downcast to the smallest signed width
+    holding their values, the float columns of integral values with nulls are converted to the nullable integers, the
+    object columns of integers or bools to the nullable dtypes, and the low-cardinality string columns to
+    categoricals. the float columns are kept, as the float32 would round the computed values. the read-only columns
+    (e.g. mapped from the store or the shared memory) are kept as they are, never copied into memory
+    :param df: the table data object
+    :return: the compacted table, the columns not compacted refer to the table without copy
+    """
+    columns = dict()
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        compacted = _compact_column(values)
+        if compacted is not values:
+            columns[position] = compacted
+    if not columns:
+        return df
+    compacted_df = pd.DataFrame({position: columns.get(position, df.iloc[:, position])
+                                 for position in range(df.shape[1])}, index=df.index, copy=False)
+    compacted_df.columns = df.columns
+    return compacted_df
+
+
+def _compact_column(values: pd.Series):
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype):
+        if _is_mapped(values.to_numpy()):
+            return values
+        if dtype.kind == 'i':
+            return _downcast_int(values)
+        if dtype.kind == 'f':
+            return _float_to_nullable_int(values)
+        if dtype.kind != 'O':
+            return values
+    elif not pd.api.types.is_string_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return values
+
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred == 'integer':
+        return _downcast_int(values.astype('Int64'))
+    if inferred == 'boolean':
+        return values.astype('boolean')
+    if inferred == 'string' and len(values):
+        distinct_count = values.nunique(dropna=True)
+        if distinct_count <= len(values) * CATEGORY_MAX_RATIO:
+            return values.astype('category')
+    return values
+
+
+def _is_mapped(array: np.ndarray):
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap, memoryview)):
+            return True
+        base = getattr(base, 'base', None)
+    return False
+
+
+def _downcast_int(values: pd.Series):
+    """
+    downcast the (nullable) integer column to the smallest signed width holding its values
+    """
+    low, high = values.min(), values.max()
+    if pd.isna(low):
+        return values
+    nullable = not isinstance(values.dtype, np.dtype)
+    for dtype in _INT_DTYPES:
+        if dtype().itemsize >= values.dtype.itemsize:
+            break
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(pd.api.types.pandas_dtype(f'Int{info.bits}') if nullable else dtype)
+    return values
+
+
+def _float_to_nullable_int(values: pd.Series):
+    """
+    convert the float column of the integral values with nulls (e.g. the integer column of missing values read from
+    csv) to the smallest nullable integers
+    """
+    array = values.to_numpy()
+    nulls = np.isnan(array)
+    if not nulls.any() or nulls.all():
+        return values
+    valid = array[~nulls]
+    if not np.array_equal(valid, np.trunc(valid)) or np.abs(valid).max() > np.iinfo(np.int32).max:
+        return values
+    return _downcast_int(values.astype('Int64'))
@@ -1,94 +1,347 @@
-from sqlparse.sql import Operation, Function, Identifier, Parenthesis, IdentifierList, Comparison
+import operator
+import re
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
 
 from dfselect.errors import DFSelectExecError
-from dfselect.util import check_col_name, is_skip_token
+from dfselect.parse.ast import Literal, Star, Call, UnaryOp, BinaryOp, InList, IsNull, Between, Case, children
+from dfselect.plan import BoundColumn, expr_key
 
-_agg_func_dict = dict(
+# the aggregate functions computed by the function of the grouped column
+AGG_FUNCS = dict(
     avg='mean',
     mean='mean',
     count='count',
     sum='sum',
+    min='min',
+    max='max',
     std='std',
     median='median',
     quantile='quantile',
 )
+# the aggregate functions computed by the udf of the column values of each group
+AGG_UDF_NAMES = ('approx_count_distinct', 'approx_quantile')
+
+# the max count of the in-list items matched by the equalities instead of the hash set
+_EQ_CHAIN_MAX_ITEMS = 8
+# the arithmetic operators whose results may overflow the integer dtype of the operands
+_WIDEN_OPS = ('+', '-', '*')
+# the order comparisons, which the unordered categorical column is compared by its categories
+_ORDER_OPS = ('<', '<=', '>', '>=')
+
+_BINARY_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
 
 
-def eval_oper(oper: Operation, columns, row_key):
-    oper_str = ''
-    for token in oper.tokens:
-        if isinstance(token, Function):
-            oper_str += eval_func(token, columns, row_key)
-        elif isinstance(token, Identifier):
-            oper_str += f'{row_key}["{check_col_name(token.value, columns)}"]'
-        elif isinstance(token, (Operation, Comparison)):
-            oper_str += eval_oper(token, columns, row_key)
+def is_agg_call(expr):
+    """
+    check whether the expression is the call of an aggregate function
+    """
+    return isinstance(expr, Call) and expr.over is None and (expr.name in AGG_FUNCS or expr.name in AGG_UDF_NAMES)
+
+
+def eval_expr(df: pd.DataFrame, expr, computed: dict = None):
+    """
+    evaluate the bound expression over the table, vectorized by the columns
+    :param df: the table data object
+    :param expr: the bound expression
+    :param computed: the values computed already (e.g. the aggregated values), by the expression key
+    :return: the series of values, or the scalar value of the constant expression
+    """
+    if isinstance(expr, BoundColumn):
+        return df.iloc[:, expr.position]
+    if isinstance(expr, Literal):
+        return expr.value
+    if computed and isinstance(expr, Call):
+        key = expr_key(expr)
+        if key in computed:
+            return computed[key]
+    if isinstance(expr, BinaryOp):
+        left = eval_expr(df, expr.left, computed)
+        if expr.op == 'like':
+            return _like(left, expr.right.value, expr.left)
+        right = eval_expr(df, expr.right, computed)
+        if expr.op == 'and':
+            return left & right if _is_series(left, right) else left and right
+        if expr.op == 'or':
+            return left | right if _is_series(left, right) else left or right
+        if expr.op == '||':
+            return _as_str(left) + _as_str(right)
+        if expr.op in _WIDEN_OPS:
+            left, right = widen_int(left), widen_int(right)
+        elif expr.op in _ORDER_OPS and (_is_categorical(left) or _is_categorical(right)):
+            return _compare_categorical(_BINARY_OPS[expr.op], left, right)
+        return _BINARY_OPS[expr.op](left, right)
+    if isinstance(expr, UnaryOp):
+        operand = eval_expr(df, expr.operand, computed)
+        if expr.op == 'not':
+            return ~operand if _is_series(operand) else not operand
+        return -widen_int(operand) if expr.op == '-' else operand
+    if isinstance(expr, InList):
+        operand = eval_expr(df, expr.operand, computed)
+        items = [eval_expr(df, item, computed) for item in expr.items]
+        if _is_series(*items):
+            raise DFSelectExecError(f'the items of in-list should be constant: {expr.text}')
+        matched = _isin(operand, items) if _is_series(operand) else operand in items
+        return _negate(matched) if expr.negated else matched
+    if isinstance(expr, IsNull):
+        is_null = pd.isna(eval_expr(df, expr.operand, computed))
+        return _negate(is_null) if expr.negated else is_null
+    if isinstance(expr, Between):
+        operand = eval_expr(df, expr.operand, computed)
+        low, high = eval_expr(df, expr.low, computed), eval_expr(df, expr.high, computed)
+        if _is_categorical(operand):
+            between = _compare_categorical(operator.ge, operand, low) & _compare_categorical(operator.le, operand, high)
+        elif _is_series(operand, low, high):
+            between = (operand >= low) & (operand <= high)
         else:
-            oper_str += str(token)
-    return oper_str
-
-
-def eval_func_args(args: IdentifierList, columns, row_key):
-    func_arg_str = ''
-    for arg in args.tokens:
-        if isinstance(arg, Function):
-            func_arg_str += eval_func(arg, columns, row_key)
-        elif isinstance(arg, Identifier):
-            func_arg_str += f'{row_key}["{check_col_name(arg.value, columns)}"]'
-        elif isinstance(arg, (Operation, Comparison)):
-            func_arg_str += eval_oper(arg, columns, row_key)
+            between = low <= operand <= high
+        return _negate(between) if expr.negated else between
+    if isinstance(expr, Case) or _is_if_call(expr):
+        return _eval_case(df, expr, computed)
+    if isinstance(expr, Call):
+        if is_agg_call(expr):
+            raise DFSelectExecError(f'aggregate function is not allowed here: {expr.text}')
+        return _call_udf(df, expr, computed)
+    if isinstance(expr, Star):
+        raise DFSelectExecError('* is not allowed here')
+    raise DFSelectExecError(f'unbound expression: {expr}')
+
+
+def eval_column(df: pd.DataFrame, expr, computed: dict = None):
+    """
+    evaluate the bound expression over the table into a column
+    :param df: the table data object
+    :param expr: the bound expression
+    :param computed: the values computed already, by the expression key
+    :return: the column series, the series of a bound column refers to the column of the table without copy
+    """
+    values = eval_expr(df, expr, computed)
+    if not isinstance(values, pd.Series):
+        values = _broadcast(values, df.index)
+    return values
+
+
+def _broadcast(value, index: pd.Index):
+    """
+    broadcast the constant to a column of the index, the numeric constant is a zero-stride view of the value without
+    repeating it for each row
+    """
+    if isinstance(value, (bool, int, float)):
+        return pd.Series(np.broadcast_to(np.asarray(value), len(index)), index=index, copy=False)
+    return pd.Series(value, index=index, dtype=object if value is None else None)
+
+
+def outer_columns(expr):
+    """
+    collect the columns referred by the expression out of the aggregate function calls
+    """
+    if is_agg_call(expr):
+        return []
+    if isinstance(expr, BoundColumn):
+        return [expr]
+    return [column for child in children(expr) for column in outer_columns(child)]
+
+
+def agg_calls(expr):
+    """
+    collect the aggregate function calls of the expression
+    """
+    if is_agg_call(expr):
+        return [expr]
+    return [call for child in children(expr) for call in agg_calls(child)]
+
+
+def widen_int(values):
+    """
+    widen the integer column narrower than 64 bits (e.g. downcast by the compact dtypes) to 64 bits, before the
+    arithmetic or the sum which may overflow its width
+    :param values: the column series or the scalar value
+    :return: the widened column, or the values as they are
+    """
+    if not isinstance(values, pd.Series):
+        return values
+    dtype = getattr(values.dtype, 'numpy_dtype', values.dtype)
+    if not isinstance(dtype, np.dtype) or dtype.kind not in 'iu' or dtype.itemsize >= 8:
+        return values
+    return values.astype(np.int64 if isinstance(values.dtype, np.dtype) else 'Int64')
+
+
+def _is_categorical(values):
+    return isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype) and \
+        not values.cat.ordered
+
+
+def _compare_categorical(op, left, right):
+    """
+    compare the unordered categorical column by comparing its categories once, the null value never matches
+    """
+    if not _is_categorical(left):
+        return _compare_categorical(lambda a, b: op(b, a), right, left)
+    if isinstance(right, pd.Series):
+        # the column compared to another column is compared by the values
+        return op(left.astype(left.cat.categories.dtype), right.astype(right.cat.categories.dtype)
+                  if _is_categorical(right) else right)
+    if right is None:
+        return pd.Series(False, index=left.index)
+    matched = np.append(np.asarray(op(left.cat.categories, right), dtype=bool), False)
+    return pd.Series(matched[left.cat.codes.to_numpy()], index=left.index, copy=False)
+
+
+def _is_series(*values):
+    return any(isinstance(v, pd.Series) for v in values)
+
+
+def _isin(values: pd.Series, items: list):
+    if len(items) <= _EQ_CHAIN_MAX_ITEMS and pd.api.types.is_numeric_dtype(values.dtype):
+        # the few numbers are matched by the equalities, the isin of numpy may allocate a table over the value range
+        matched = values == items[0]
+        for item in items[1:]:
+            matched |= values == item
+        return matched
+    return values.isin(items)
+
+
+def _negate(values):
+    return ~values if isinstance(values, pd.Series) else not values
+
+
+def _as_str(values):
+    return values.astype(str) if isinstance(values, pd.Series) else str(values)
+
+
+def _like(values, pattern: str, operand):
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern)
+    if not isinstance(values, pd.Series):
+        return values is not None and re.fullmatch(regex, str(values), flags=re.DOTALL) is not None
+    inner = pattern.strip('%')
+    if isinstance(operand, BoundColumn) and operand.dtype is not None and \
+            not pd.api.types.is_string_dtype(operand.dtype):
+        # the pattern matches the text of the non-string column
+        values = values.astype(str).where(values.notna())
+    if '%' in inner or '_' in inner:
+        return values.str.fullmatch(regex, flags=re.DOTALL, na=False)
+    if pattern.startswith('%') and pattern.endswith('%') and len(pattern) > 1:
+        return values.str.contains(inner, regex=False, na=False)
+    if pattern.startswith('%'):
+        return values.str.endswith(inner, na=False)
+    if pattern.endswith('%'):
+        return values.str.startswith(inner, na=False)
+    return values == pattern
+
+
+def _is_if_call(expr):
+    return isinstance(expr, Call) and expr.name == 'if' and expr.over is None and len(expr.args) == 3
+
+
+def _case_branches(expr, computed: dict = None):
+    """
+    flatten the CASE (or IF) and the CASE/IF nested in its ELSE into one list of the branches
+    :return: the conditions, the results, and the default
+    """
+    conditions, results = [], []
+    while not (computed and expr_key(expr) in computed):
+        if isinstance(expr, Case):
+            conditions += expr.conditions
+            results += expr.results
+            expr = expr.default
+        elif _is_if_call(expr):
+            conditions.append(expr.args[0])
+            results.append(expr.args[1])
+            expr = expr.args[2]
         else:
-            func_arg_str += str(arg)
-    return func_arg_str
-
-
-def eval_func(fn: Function, columns, row_key):
-    func_str = ''
-    func_key = str(fn.tokens[0])
-    if func_key.lower() not in _agg_func_dict.keys():
-        func_str = f'_load_udf("{func_key}")'
-        for token in fn.tokens[1:]:
-            if isinstance(token, Parenthesis):
-                for token_in_paren in token.tokens:
-                    if isinstance(token_in_paren, IdentifierList):
-                        func_str += eval_func_args(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Function):
-                        func_str += eval_func(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Identifier):
-                        func_str += f'{row_key}["{check_col_name(token_in_paren.value, columns)}"]'
-                    elif isinstance(token_in_paren, (Operation, Comparison)):
-                        func_str += eval_oper(token_in_paren, columns, row_key)
-                    else:
-                        func_str += str(token_in_paren)
-
-            else:
-                func_str += str(token)
-    else:
-        agg_func_name = _agg_func_dict[func_key.lower()]
-        func_str += '('
-        for token in fn.tokens[1:]:
-            if isinstance(token, Parenthesis):
-                agg_func_args = [t for t in token.tokens if not is_skip_token(t)]
-                for token_in_paren in agg_func_args:
-                    if isinstance(token_in_paren, IdentifierList):
-                        # func_str += eval_func_args(token_in_paren, columns, row_key)
-                        raise DFSelectExecError(f'only single-param agg-function is supported')
-                    if isinstance(token_in_paren, Function):
-                        func_str += eval_func(token_in_paren, columns, row_key)
-                    elif isinstance(token_in_paren, Identifier):
-                        func_str += f'{row_key}["{check_col_name(token_in_paren.value, columns)}"]'
-                    elif isinstance(token_in_paren, (Operation, Comparison)):
-                        func_str += eval_oper(token_in_paren, columns, row_key)
-                    else:
-                        func_str += str(token_in_paren)
-            else:
-                func_str += str(token)
-        func_str += f').{agg_func_name}()'
-    return func_str
-
-
-def eval_expr(expr, columns, row_key):
-    if isinstance(expr, Operation):
-        return eval_oper(expr, columns, row_key)
-    elif isinstance(expr, Function):
-        return eval_func(expr, columns, row_key)
+            break
+    return conditions, results, expr
+
+
+def _eval_case(df: pd.DataFrame, expr, computed: dict = None):
+    """
+    evaluate the CASE (or the nested IFs) by a single np.select over the masks of the conditions, the result of the
+    first matched condition is selected, the null condition never matches
+    """
+    conditions, results, default = _case_branches(expr, computed)
+    masks, choices = [], []
+    for condition, result in zip(conditions, results):
+        matched = eval_expr(df, condition, computed)
+        if not isinstance(matched, pd.Series):
+            if matched is not None and matched:
+                # the constant true condition matches all the rows left, the branches after it are never selected
+                default = result
+                break
+            continue
+        masks.append(matched.fillna(False).astype(bool).to_numpy() if matched.dtype != bool else matched.to_numpy())
+        choices.append(eval_expr(df, result, computed))
+    default = eval_expr(df, default, computed)
+    if not masks:
+        return default
+    values = [v.to_numpy() if isinstance(v, pd.Series) else v for v in choices + [default]]
+    if values[-1] is None and all(_is_number(v) for v in values[:-1]):
+        values[-1] = np.nan
+    if len({_is_text(v) for v in values if v is not None}) > 1:
+        # numpy promotes the numbers selected with the strings to the strings, select them as the objects instead
+        values = [_as_object(v) for v in values]
+    try:
+        selected = np.select(masks, values[:-1], values[-1])
+    except TypeError:
+        # the results of no common dtype, e.g. the numbers and the strings
+        selected = np.select(masks, [_as_object(v) for v in values[:-1]], _as_object(values[-1]))
+    selected = pd.Series(selected, index=df.index, copy=False)
+    return selected.infer_objects() if selected.dtype == object else selected
+
+
+def _is_number(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'iuf'
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def _is_text(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype.kind in 'US'
+    return isinstance(value, str)
+
+
+def _as_object(value):
+    return value.astype(object) if isinstance(value, np.ndarray) else value
+
+
+def load_udf(func_code: str):
+    from . import udf as udf_repo
+    udf_name = "udf_" + func_code.upper()
+    udf = getattr(udf_repo, udf_name, None)
+    if not udf:
+        raise DFSelectExecError(f'udf [{func_code}] not defined')
+    return udf
+
+
+def _call_udf(df: pd.DataFrame, expr: Call, computed: dict = None):
+    """
+    call the udf with the argument values of each row, the arguments are evaluated by the columns
+    """
+    udf = load_udf(expr.name)
+    args = [eval_expr(df, arg, computed) for arg in expr.args]
+    series_args = [arg for arg in args if isinstance(arg, pd.Series)]
+    if not series_args:
+        return udf(*args)
+    rows = zip(*[_udf_values(arg) if isinstance(arg, pd.Series) else repeat(arg) for arg in args])
+    return pd.Series([udf(*row) for row in rows], index=series_args[0].index)
+
+
+def _udf_values(values: pd.Series):
+    # the null of the nullable numbers (e.g. compacted from the floats) is passed to the udf as nan, as of the floats
+    if not isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iufb':
+        return values.to_numpy(dtype=object, na_value=np.nan)
+    return values.to_numpy(dtype=object)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from .chunked import ChunkedFrame
+
+# the column of the random keys to pick the sampled rows of the chunked table
+_SAMPLE_KEY = '__sample_key'
+
+
+def sample_table(df, sample_size, sample_unit: str, seed: int = None):
+    """
+    sample the rows of the table, the rows are kept in the order of the table
+    :param df: the table data object, DataFrame or ChunkedFrame
+    :param sample_size: the percent of rows to sample for PERCENT, or the count of rows to sample for ROWS
+    :param sample_unit: PERCENT (each row is sampled independently) or ROWS (the rows are sampled without replacement)
+    :param seed: the random seed to get the repeatable sample
+    :return: the sampled table, the chunked table is sampled chunk by chunk and never collected
+    """
+    if sample_unit == 'PERCENT':
+        if isinstance(df, ChunkedFrame):
+            return ChunkedFrame(lambda: _sample_chunks(df, sample_size, seed), df.template)
+        return df[np.random.default_rng(seed).random(len(df)) < sample_size / 100]
+
+    rng = np.random.default_rng(seed)
+    if isinstance(df, pd.DataFrame):
+        if sample_size >= len(df):
+            return df
+        return df.take(np.sort(rng.choice(len(df), sample_size, replace=False)))
+
+    # keep the rows of the smallest random keys over the chunks, the memory is bound to the sampled rows
+    sampled = df.template.assign(**{_SAMPLE_KEY: pd.Series(dtype='float64')})
+    for chunk in df:
+        sampled = pd.concat([sampled, chunk.assign(**{_SAMPLE_KEY: rng.random(len(chunk))})])
+        if len(sampled) > sample_size:
+            keys = sampled[_SAMPLE_KEY].to_numpy()
+            sampled = sampled.take(np.sort(np.argpartition(keys, sample_size)[:sample_size]))
+    return sampled.drop(columns=[_SAMPLE_KEY])
+
+
+def _sample_chunks(df: ChunkedFrame, sample_size, seed: int = None):
+    rng = np.random.default_rng(seed)
+    for chunk in df:
+        yield chunk[rng.random(len(chunk)) < sample_size / 100]
@@ -0,0 +1,193 @@
+import atexit
+import os
+import pickle
+import re
+import struct
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from dfselect.errors import DFSelectContextError
+from dfselect.log import log
+
+# the alignment of the column buffers in the shared memory segment
+_ALIGNMENT = 64
+# the segment starts with the length of the pickled layout of the table
+_LENGTH_FORMAT = '<Q'
+_LENGTH_SIZE = struct.calcsize(_LENGTH_FORMAT)
+# the dtype kinds of the columns shared as numpy arrays, the other columns are pickled into the segment
+_SHARED_KINDS = 'biufmM'
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# the segments published by this process, by the segment name
+_published = dict()
+# the tables attached by this process, by the segment name, of form (token, table)
+_attached = dict()
+# the segments attached by this process, which are never closed: numpy does not hold the mapped buffer of the
+# columns, closing the segment would unmap the columns in use
+_attached_segments = []
+_lock = threading.Lock()
+
+
+def publish_table(catalog: str, table_key: str, df: pd.DataFrame):
+    """
+    publish the table into a shared memory segment of the catalog, so that the other processes attach it without
+    copying or unpickling its numeric, bool and datetime columns (the other columns are unpickled on attach). the
+    table published again replaces the old segment, the processes attached to the old one keep their data. the
+    segments are removed when the publishing process exits
+    :param catalog: the catalog name
+    :param table_key: the table key
+    :param df: the table data object
+    :return: the segment name
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise DFSelectContextError(f'table {table_key} can not be published, only the table in memory can be shared')
+    name = _segment_name(catalog, table_key)
+
+    columns, buffers, offset = [], [], 0
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in _SHARED_KINDS:
+            data = np.ascontiguousarray(values.to_numpy())
+            kind = 'array'
+        else:
+            data = np.frombuffer(pickle.dumps(values.array, protocol=pickle.HIGHEST_PROTOCOL), np.uint8)
+            kind = 'pickle'
+        offset = _align(offset)
+        columns.append((df.columns[position], kind, data.dtype.str, offset, data.nbytes))
+        buffers.append((offset, data))
+        offset += data.nbytes
+    index = None if _is_default_index(df.index) else df.index
+    # the token tells the attached processes that the table is published again under the same name
+    layout = pickle.dumps(dict(token=os.urandom(16), rows=len(df), columns=columns, index=index),
+                          protocol=pickle.HIGHEST_PROTOCOL)
+    data_start = _align(_LENGTH_SIZE + len(layout))
+
+    with _lock:
+        if not _published:
+            atexit.register(_unlink_published)
+        _unlink(name)
+        segment = shared_memory.SharedMemory(name=name, create=True, size=data_start + offset)
+        _published[name] = segment
+    for buffer_offset, data in buffers:
+        start = data_start + buffer_offset
+        segment.buf[start:start + data.nbytes] = data.view(np.uint8).reshape(-1)
+    segment.buf[_LENGTH_SIZE:_LENGTH_SIZE + len(layout)] = layout
+    # the length of the layout is written at last, the segment of zero length is not published completely
+    segment.buf[:_LENGTH_SIZE] = struct.pack(_LENGTH_FORMAT, len(layout))
+    log.info(f'table {table_key} published into shared memory {name} of {data_start + offset} bytes')
+    return name
+
+
+def unpublish_table(catalog: str, table_key: str):
+    """
+    remove the table from the catalog, the processes attached to it keep their data
+    :param catalog: the catalog name
+    :param table_key: the table key
+    :return: whether the table was published
+    """
+    with _lock:
+        return _unlink(_segment_name(catalog, table_key))
+
+
+def attach_table(catalog: str, table_key: str):
+    """
+    attach the table published into the catalog, the numeric, bool and datetime columns are read-only views of the
+    shared memory, the attached table is reused until the table is published again. the segments stay mapped in this
+    process, also the ones of the tables published again
+    :param catalog: the catalog name
+    :param table_key: the table key
+    :return: the table data object, None if the table is not published
+    """
+    name = _segment_name(catalog, table_key)
+    try:
+        segment = _open_segment(name)
+    except FileNotFoundError:
+        return None
+    layout_size = struct.unpack(_LENGTH_FORMAT, bytes(segment.buf[:_LENGTH_SIZE]))[0]
+    if not layout_size:
+        segment.close()
+        return None
+    layout = pickle.loads(segment.buf[_LENGTH_SIZE:_LENGTH_SIZE + layout_size])
+    with _lock:
+        attached = _attached.get(name)
+        if attached is not None and attached[0] == layout['token']:
+            segment.close()
+            return attached[1]
+
+    data_start = _align(_LENGTH_SIZE + layout_size)
+    columns = dict()
+    for position, (column, kind, dtype, offset, nbytes) in enumerate(layout['columns']):
+        start = data_start + offset
+        if kind == 'array':
+            values = np.ndarray(layout['rows'], dtype=np.dtype(dtype), buffer=segment.buf, offset=start)
+            values.flags.writeable = False
+        else:
+            values = pickle.loads(segment.buf[start:start + nbytes])
+        columns[position] = values
+    df = pd.DataFrame(columns, index=layout['index'], copy=False)
+    df.columns = pd.Index([c[0] for c in layout['columns']], tupleize_cols=False)
+    with _lock:
+        _attached[name] = (layout['token'], df)
+        _attached_segments.append(segment)
+    return df
+
+
+def catalog_loader(catalog: str):
+    """
+    the table loader of the tables published into the catalog
+    :param catalog: the catalog name
+    :return: the table loader
+    """
+    def _load(table_source: str):
+        return attach_table(catalog, table_source) if _NAME_PATTERN.match(table_source) else None
+    return _load
+
+
+def _segment_name(catalog: str, table_key: str):
+    if not _NAME_PATTERN.match(catalog) or not _NAME_PATTERN.match(table_key):
+        raise DFSelectContextError(f'invalid catalog {catalog} or table {table_key} to share, the names should '
+                                   f'consist of letters, digits, "_", "." and "-"')
+    return f'dfselect.{catalog}.{table_key}'
+
+
+def _open_segment(name: str):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 tracks the attached segment and unlinks it when this process exits, the segment published by
+        # this process is tracked already
+        segment = shared_memory.SharedMemory(name=name)
+        if name not in _published:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _unlink(name: str):
+    segment = _published.pop(name, None)
+    if segment is None:
+        try:
+            # the segment published by another process
+            segment = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return False
+    segment.close()
+    segment.unlink()
+    return True
+
+
+def _unlink_published():
+    with _lock:
+        for name in list(_published):
+            _unlink(name)
+
+
+def _align(offset: int):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _is_default_index(index: pd.Index):
+    return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
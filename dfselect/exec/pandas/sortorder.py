@@ -0,0 +1,156 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dfselect.errors import DFSelectContextError
+from dfselect.parse.ast import Literal, BinaryOp, Between
+from dfselect.plan import BoundColumn, split_conjuncts, join_conjuncts
+
+# the comparison of the column to the value, flipped for the value on the left side
+_FLIPPED_OPS = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '='}
+
+
+class SortOrder(NamedTuple):
+    # the rows of the table the sort order is tracked for
+    row_count: int
+    # the positions of the columns sorted in ascending order without null
+    positions: frozenset
+
+
+def compute_sort_order(df: pd.DataFrame, columns: list = None):
+    """
+    track the columns of the table sorted in ascending order
+    :param df: the table data object
+    :param columns: the names of the columns declared sorted, which are not checked, the columns are detected by
+    checking the values of the numeric, datetime and string columns if not provided
+    :return: the sort order
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise DFSelectContextError('sort order can only be tracked for the table in memory')
+    if columns is None:
+        positions = [p for p in range(df.shape[1]) if _is_sortable(df.iloc[:, p].dtype) and
+                     is_sorted(df.iloc[:, p])]
+    else:
+        positions = []
+        for name in columns:
+            matched = np.flatnonzero(df.columns == name)
+            if not len(matched):
+                raise DFSelectContextError(f'sorted column {name} not found')
+            positions.extend(matched.tolist())
+    return SortOrder(len(df), frozenset(positions))
+
+
+def extend_sort_order(sort_order: SortOrder, df: pd.DataFrame):
+    """
+    maintain the sort order of the table appended with rows, the column is not sorted any more if the appended values
+    are out of order
+    :param sort_order: the sort order of the table before appending
+    :param df: the appended table
+    :return: the sort order of the appended table
+    """
+    # the appended values are checked from the last row before appending
+    start = max(sort_order.row_count - 1, 0)
+    positions = [p for p in sort_order.positions if p < df.shape[1] and is_sorted(df.iloc[start:, p])]
+    return SortOrder(len(df), frozenset(positions))
+
+
+def slice_sorted(df: pd.DataFrame, sort_order: SortOrder, filter_expr):
+    """
+    find the rows matching the range conjuncts of the filter on the sorted columns by binary search
+    :param df: the table the sort order is tracked for
+    :param sort_order: the sort order
+    :param filter_expr: the bound filter expression
+    :return: the slice of the table, and the conjuncts of the filter remained to evaluate (None if no one remains)
+    """
+    start, stop = 0, len(df)
+    conjuncts, remained = split_conjuncts(filter_expr), []
+    for conjunct in conjuncts:
+        bounds = _sorted_bounds(df, sort_order, conjunct)
+        if bounds is None:
+            remained.append(conjunct)
+            continue
+        start, stop = max(start, bounds[0]), min(stop, bounds[1])
+    if len(remained) == len(conjuncts):
+        return df, filter_expr
+    return df.iloc[start:max(start, stop)], join_conjuncts(remained) if remained else None
+
+
+def is_sorted(values: pd.Series, ascending: bool = True):
+    """
+    check whether the values are in order without null
+    """
+    # the column of nulls is not monotonic
+    return values.is_monotonic_increasing if ascending else values.is_monotonic_decreasing
+
+
+def _is_sortable(dtype):
+    if isinstance(dtype, np.dtype):
+        return dtype.kind in 'iufM'
+    return pd.api.types.is_string_dtype(dtype)
+
+
+def _sorted_bounds(df: pd.DataFrame, sort_order: SortOrder, expr):
+    """
+    the row range [start, stop) of the sorted column matching the predicate, None if the predicate is not a range of
+    the sorted column
+    """
+    if isinstance(expr, Between) and not expr.negated:
+        values, low = _sorted_values(df, sort_order, expr.operand, expr.low)
+        _, high = _sorted_values(df, sort_order, expr.operand, expr.high)
+        if values is None or high is None:
+            return None
+        return _search(values, low, 'left'), _search(values, high, 'right')
+    if not isinstance(expr, BinaryOp) or expr.op not in _FLIPPED_OPS:
+        return None
+    op, column, value = expr.op, expr.left, expr.right
+    if isinstance(column, Literal):
+        op, column, value = _FLIPPED_OPS[op], value, column
+    values, value = _sorted_values(df, sort_order, column, value)
+    if values is None:
+        return None
+    if op == '=':
+        return _search(values, value, 'left'), _search(values, value, 'right')
+    if op in ('<', '<='):
+        return 0, _search(values, value, 'left' if op == '<' else 'right')
+    return _search(values, value, 'right' if op == '>' else 'left'), len(values)
+
+
+def _search(values: pd.Series, value, side: str):
+    if isinstance(value, float) and values.dtype.kind in 'iu':
+        if not value.is_integer():
+            # no integer equals the fraction, searched by its ceiling so that the integers are not cast to float
+            return values.searchsorted(math.ceil(value), 'left')
+        value = int(value)
+    return values.searchsorted(value, side)
+
+
+def _sorted_values(df: pd.DataFrame, sort_order: SortOrder, column, value):
+    """
+    the values of the sorted column compared to the literal value, and the value as the type of the column, None if
+    the column is not sorted or the value is not comparable to it
+    """
+    if not isinstance(column, BoundColumn) or not isinstance(value, Literal) or \
+            column.position not in sort_order.positions:
+        return None, None
+    values = df.iloc[:, column.position]
+    dtype = values.dtype
+    value = value.value
+    if isinstance(dtype, np.dtype) and dtype.kind == 'M':
+        # the datetime column is compared to the text of the timestamp
+        if not isinstance(value, str):
+            return None, None
+        try:
+            value = pd.Timestamp(value).tz_localize(None)
+        except ValueError:
+            return None, None
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'iuf':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None, None
+        if dtype.kind in 'iu' and not np.iinfo(dtype).min <= value <= np.iinfo(dtype).max:
+            # the value out of the range of the integers, or nan
+            return None, None
+    elif not pd.api.types.is_string_dtype(dtype) or not isinstance(value, str):
+        return None, None
+    return values, value
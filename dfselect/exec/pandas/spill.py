@@ -0,0 +1,233 @@
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .chunked import ChunkedFrame
+from dfselect.log import log
+
+# the column to mark the run of the rows during merging the sorted runs
+_RUN_COLUMN = '__run'
+
+
+def sizeof_frame(df):
+    """
+    estimate the memory size of a table, without inspecting the objects in the columns
+    :param df: the table data object
+    :return: the size in bytes, None if unknown (for the chunked table)
+    """
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(index=True, deep=False).sum())
+    return None
+
+
+def _rows_in_budget(df, memory_budget: int):
+    if isinstance(df, pd.DataFrame) and len(df):
+        row_size = max(1, sizeof_frame(df) // len(df))
+    else:
+        # the row size of the chunked table is unknown, assume 8 bytes per column
+        row_size = max(1, 8 * len(df.columns))
+    return max(1, memory_budget // row_size)
+
+
+def _iter_chunks(df, rows: int):
+    if isinstance(df, ChunkedFrame):
+        for chunk in df:
+            for start in range(0, len(chunk), rows):
+                yield chunk.iloc[start:start + rows]
+    else:
+        for start in range(0, len(df), rows):
+            yield df.iloc[start:start + rows]
+
+
+class _SpillDir(object):
+    """
+    the temporary directory of the spilled files, removed once the table reading the files is collected
+    """
+
+    def __init__(self, spill_dir: str = None):
+        self.path = tempfile.mkdtemp(prefix='dfselect-spill-', dir=spill_dir)
+
+    def bind(self, owner):
+        weakref.finalize(owner, shutil.rmtree, self.path, True)
+        return owner
+
+    def write(self, name: str, chunk: pd.DataFrame):
+        # append the chunk to the file, a file holds a sequence of pickled chunks
+        with open(os.path.join(self.path, name), 'ab') as f:
+            pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def read(self, name: str):
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+def external_sort(df, sort_key_func, ascending: list, memory_budget: int, spill_dir: str = None):
+    """
+    sort the table by external merge sort: sort the runs fit in the memory budget and spill them to disk, then merge
+    the sorted runs lazily
+    :param df: the table data object, DataFrame or ChunkedFrame
+    :param sort_key_func: the function to compute the sort key columns of a DataFrame chunk
+    :param ascending: the sort directions of the sort keys
+    :param memory_budget: the memory budget in bytes
+    :param spill_dir: the directory to place the spilled files
+    :return: the sorted ChunkedFrame
+    """
+    run_rows = max(1, _rows_in_budget(df, memory_budget) // 2)
+    # a block of each run is read during merging, the runs of the chunked table are assumed to be 8 at least
+    expected_runs = -(-len(df) // run_rows) if isinstance(df, pd.DataFrame) else 8
+    block_rows = max(1, run_rows // max(1, expected_runs))
+    spill = _SpillDir(spill_dir)
+    key_columns = None
+    n_runs = 0
+    for chunk in _iter_chunks(df, run_rows):
+        sort_keys = sort_key_func(chunk)
+        key_columns = [f'__key_{i}' for i in range(len(sort_keys.columns))]
+        sort_keys.columns = key_columns
+        order = sort_keys.reset_index(drop=True).sort_values(by=key_columns, ascending=ascending,
+                                                             kind='mergesort').index
+        run = pd.concat([chunk, sort_keys.set_axis(chunk.index)], axis=1).take(order)
+        # the run is spilled in blocks, so that merging reads a block of each run at a time
+        for start in range(0, len(run), block_rows):
+            spill.write(f'run-{n_runs}', run.iloc[start:start + block_rows])
+        n_runs += 1
+    log.debug(f'external sort spilled {n_runs} runs of {run_rows} rows into {spill.path}')
+
+    template = df.template if isinstance(df, ChunkedFrame) else df.iloc[:0]
+    if not n_runs:
+        return ChunkedFrame(lambda: iter(()), template)
+
+    def _merge_runs():
+        readers = [spill.read(f'run-{i}') for i in range(n_runs)]
+        buffers = [next(r, None) for r in readers]
+        exhausted = [b is None for b in buffers]
+        while True:
+            active = [i for i, b in enumerate(buffers) if b is not None and len(b)]
+            if not active:
+                return
+            merged = pd.concat([buffers[i].assign(**{_RUN_COLUMN: i}) for i in active])
+            order = merged[key_columns].reset_index(drop=True).sort_values(
+                by=key_columns, ascending=ascending, kind='mergesort').index.to_numpy()
+            positions = np.empty(len(order), dtype=np.int64)
+            positions[order] = np.arange(len(order))
+
+            # the rows before the last buffered row of any run not exhausted are safe to emit
+            bound = len(order) - 1
+            offset = 0
+            for i in active:
+                offset += len(buffers[i])
+                if not exhausted[i]:
+                    bound = min(bound, positions[offset - 1])
+            merged = merged.take(order)
+            yield merged.iloc[:bound + 1].drop(columns=key_columns + [_RUN_COLUMN])
+
+            remained = merged.iloc[bound + 1:]
+            runs = remained[_RUN_COLUMN].to_numpy()
+            for i in active:
+                buffers[i] = remained[runs == i].drop(columns=[_RUN_COLUMN])
+                if not len(buffers[i]) and not exhausted[i]:
+                    buffers[i] = next(readers[i], None)
+                    exhausted[i] = buffers[i] is None
+
+    return spill.bind(ChunkedFrame(_merge_runs, template))
+
+
+def _partition_ids(keys: pd.DataFrame, n_partitions: int):
+    hashed = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return hashed % np.uint64(n_partitions)
+
+
+def _hash_keys(df: pd.DataFrame, on: list, numeric_keys: list):
+    keys = pd.concat([df[c] for c in on], axis=1, keys=range(len(on)))
+    # the numeric keys of different dtypes are matched by value, hash them in the same dtype
+    for i in numeric_keys:
+        keys[i] = keys[i].astype('float64')
+    return keys
+
+
+def grace_hash_join(left, right: pd.DataFrame, how: str, left_on: list, right_on: list, memory_budget: int,
+                    spill_dir: str = None):
+    """
+    join the tables by grace hash join: partition both tables by the hash of join keys and spill the partitions to
+    disk, then join the partitions one by one lazily
+    :param left: the left table data object, DataFrame or ChunkedFrame
+    :param right: the right table data object
+    :param how: the join mode of pandas merge
+    :param left_on: the join keys of the left table
+    :param right_on: the join keys of the right table
+    :param memory_budget: the memory budget in bytes
+    :param spill_dir: the directory to place the spilled files
+    :return: the joined ChunkedFrame
+    """
+    left_template = left.template if isinstance(left, ChunkedFrame) else left.iloc[:0]
+    right_template = right.iloc[:0]
+    numeric_keys = []
+    for i, (left_key, right_key) in enumerate(zip(left_on, right_on)):
+        left_dtype, right_dtype = left_template[left_key].dtype, right_template[right_key].dtype
+        if left_dtype != right_dtype and pd.api.types.is_numeric_dtype(left_dtype) and \
+                pd.api.types.is_numeric_dtype(right_dtype):
+            numeric_keys.append(i)
+
+    table_size = (sizeof_frame(left) or memory_budget) + sizeof_frame(right)
+    n_partitions = max(2, -(-table_size * 2 // memory_budget))
+    spill = _SpillDir(spill_dir)
+    for side, df, on in (('left', left, left_on), ('right', right, right_on)):
+        for chunk in _iter_chunks(df, _rows_in_budget(df, memory_budget)):
+            partitions = _partition_ids(_hash_keys(chunk, on, numeric_keys), n_partitions)
+            for partition in np.unique(partitions):
+                spill.write(f'{side}-{partition}', chunk[partitions == partition])
+    log.debug(f'grace hash join spilled {n_partitions} partitions into {spill.path}')
+
+    def _read_partition(side: str, partition: int, template: pd.DataFrame):
+        chunks = list(spill.read(f'{side}-{partition}'))
+        return pd.concat(chunks) if chunks else template
+
+    def _join_partitions():
+        for partition in range(n_partitions):
+            left_part = _read_partition('left', partition, left_template)
+            right_part = _read_partition('right', partition, right_template)
+            if (not len(left_part) and how in ('inner', 'left')) or (not len(right_part) and how in ('inner', 'right')):
+                continue
+            yield left_part.merge(right_part, how=how, left_on=left_on, right_on=right_on)
+
+    template = left_template.merge(right_template, how=how, left_on=left_on, right_on=right_on)
+    return spill.bind(ChunkedFrame(_join_partitions, template))
+
+
+def broadcast_hash_join(left, right: pd.DataFrame, how: str, left_on: list, right_on: list, memory_budget: int,
+                        build_side: str = 'right'):
+    """
+    join the tables chunk by chunk against the build side kept in memory, none of the tables is spilled
+    :param left: the left table data object, DataFrame or ChunkedFrame
+    :param right: the right table data object
+    :param how: the join mode of pandas merge, the rows of the build side must not be kept unmatched (i.e. inner or
+    left join for the right build side, inner or right join for the left build side)
+    :param left_on: the join keys of the left table
+    :param right_on: the join keys of the right table
+    :param memory_budget: the memory budget in bytes, to chunk the probe side
+    :param build_side: the side kept in memory, left or right
+    :return: the joined ChunkedFrame
+    """
+    left_template = left.template if isinstance(left, ChunkedFrame) else left.iloc[:0]
+    template = left_template.merge(right.iloc[:0], how=how, left_on=left_on, right_on=right_on)
+
+    def _join_chunks():
+        if build_side == 'right':
+            for chunk in _iter_chunks(left, _rows_in_budget(left, memory_budget)):
+                yield chunk.merge(right, how=how, left_on=left_on, right_on=right_on)
+        else:
+            for chunk in _iter_chunks(right, _rows_in_budget(right, memory_budget)):
+                yield left.merge(chunk, how=how, left_on=left_on, right_on=right_on)
+
+    return ChunkedFrame(_join_chunks, template)
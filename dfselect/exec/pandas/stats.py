@@ -0,0 +1,69 @@
+import math
+
+import pandas as pd
+
+from dfselect.stats import ColumnStats, TableStats
+
+# the max count of the rows sampled to estimate the stats of a column
+_STATS_SAMPLE_ROWS = 2 ** 14
+
+
+def compute_table_stats(df: pd.DataFrame, columns: list = None):
+    """
+    compute the statistics of the table
+    :param df: the table data object
+    :param columns: the columns to compute the stats of, all the columns if not provided
+    :return: the table stats, the column of duplicated name is counted once by its first occurrence
+    """
+    column_stats = dict()
+    for position, name in enumerate(df.columns):
+        if name not in column_stats and (columns is None or name in columns):
+            column_stats[name] = compute_column_stats(df.iloc[:, position])
+    return TableStats(len(df), column_stats, columns is None)
+
+
+def compute_column_stats(values: pd.Series):
+    """
+    estimate the statistics of a column from an evenly spaced sample of the rows, so that the cost is bound however
+    large the table is: the null fraction and the min/max are of the sample, the distinct count is estimated from
+    the frequencies of the sampled values
+    :param values: the column series
+    :return: the column stats
+    """
+    step = max(1, -(-len(values) // _STATS_SAMPLE_ROWS))
+    sample = values.iloc[::step]
+    null_fraction = float(sample.isna().mean()) if len(sample) else 0.0
+    non_null_count = int(round(len(values) * (1 - null_fraction)))
+    frequencies = sample.value_counts(dropna=True)
+    distinct_count = _estimate_distinct_count(frequencies, non_null_count, step)
+
+    min_value = max_value = None
+    if len(frequencies) and _is_comparable(values.dtype):
+        min_value, max_value = _to_python(frequencies.index.min()), _to_python(frequencies.index.max())
+    return ColumnStats(null_fraction, distinct_count, min_value, max_value)
+
+
+def _estimate_distinct_count(frequencies: pd.Series, non_null_count: int, step: int):
+    """
+    estimate the distinct count of the column by GEE (Charikar et al.) from the value frequencies of the sample, the
+    values seen once in the sample stand for sqrt(1 / sample_fraction) values each. the column of values all seen
+    once in the sample is taken as unique
+    """
+    sampled_distinct = len(frequencies)
+    if step == 1 or not sampled_distinct:
+        return sampled_distinct
+    singletons = int((frequencies == 1).sum())
+    if singletons == sampled_distinct:
+        return non_null_count
+    estimate = math.sqrt(step) * singletons + (sampled_distinct - singletons)
+    return int(min(non_null_count, max(sampled_distinct, round(estimate))))
+
+
+def _is_comparable(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) or \
+        pd.api.types.is_datetime64_any_dtype(dtype)
+
+
+def _to_python(value):
+    # the numpy scalar is kept as the python value, to compare with the literals of the query
+    return value.item() if hasattr(value, 'item') and not isinstance(value, pd.Timestamp) else value
@@ -0,0 +1,152 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dfselect.errors import DFSelectContextError
+
+# the format name and version of the metadata of the table store
+STORE_FORMAT = 'dfselect-columnar'
+STORE_VERSION = 1
+_META_FILE = 'meta.json'
+_INDEX_FILE = 'index.pkl'
+# the dtype kinds of the columns stored as the arrays mapped from the files
+_ARRAY_KINDS = 'biufmM'
+
+
+def write_table_store(path: str, df: pd.DataFrame):
+    """
+    write the table into the directory as a column store: a file of numpy array for each numeric, bool and datetime
+    column, the codes array and the json dictionary for each string (or categorical) column, and the metadata. the
+    other columns (e.g. the nullable extension arrays) are pickled. the existed store of the path is replaced
+    :param path: the directory of the store
+    :param df: the table data object
+    :return: None
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise DFSelectContextError('only the table in memory can be written into the store')
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    # the store is written into a temp directory and then moved to the path, never opened half-written
+    tmp_path = tempfile.mkdtemp(prefix='.dfselect-store-', dir=parent)
+    try:
+        columns = [_write_column(tmp_path, position, df.iloc[:, position]) for position in range(df.shape[1])]
+        index = None
+        if not (isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1):
+            index = _INDEX_FILE
+            with open(os.path.join(tmp_path, _INDEX_FILE), 'wb') as f:
+                pickle.dump(df.index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        meta = dict(format=STORE_FORMAT, version=STORE_VERSION, rows=len(df), columns=columns, index=index)
+        with open(os.path.join(tmp_path, _META_FILE), 'w') as f:
+            json.dump(meta, f)
+        if os.path.isdir(path):
+            # the processes which opened the old store keep reading its unlinked files
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def open_table_store(path: str, decode_strings: bool = False):
+    """
+    open the table of the column store, the columns are mapped from the files and only the pages read by the queries
+    are loaded from disk
+    :param path: the directory of the store
+    :param decode_strings: whether to decode the dictionary-encoded string columns into their original dtype, which
+    reads the whole columns. the string columns are opened as categoricals over the mapped codes if not set
+    :return: the table data object
+    """
+    try:
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise DFSelectContextError(f'table store {path} not found')
+    if meta.get('format') != STORE_FORMAT or meta.get('version', 0) > STORE_VERSION:
+        raise DFSelectContextError(f'unsupported table store {path}: {meta.get("format")} {meta.get("version")}')
+
+    columns = dict()
+    for position, column in enumerate(meta['columns']):
+        file = os.path.join(path, column['file'])
+        if column['kind'] == 'array':
+            values = np.load(file, mmap_mode='r')
+        elif column['kind'] == 'dict':
+            with open(os.path.join(path, column['dictionary'])) as f:
+                categories = json.load(f)
+            # the codes are not validated, which would read the whole column
+            values = pd.Categorical.from_codes(np.load(file, mmap_mode='r'), categories, ordered=column['ordered'],
+                                               validate=False)
+            if decode_strings and column['dtype'] != 'category':
+                values = pd.Series(values).astype(column['dtype']).array
+        else:
+            with open(file, 'rb') as f:
+                values = pickle.load(f)
+        columns[position] = values
+    index = None
+    if meta['index']:
+        with open(os.path.join(path, meta['index']), 'rb') as f:
+            index = pickle.load(f)
+    df = pd.DataFrame(columns, index=index, copy=False)
+    df.columns = pd.Index([column['name'] for column in meta['columns']], tupleize_cols=False)
+    return df
+
+
+def store_loader(directory: str, decode_strings: bool = False):
+    """
+    the table loader of the column stores in the directory, the table is opened from the store named by the table
+    :param directory: the directory of the stores
+    :param decode_strings: whether to decode the string columns, see `open_table_store`
+    :return: the table loader
+    """
+    def _load(table_source: str):
+        path = os.path.join(directory, table_source)
+        if os.path.basename(path) != table_source or not os.path.isfile(os.path.join(path, _META_FILE)):
+            return None
+        return open_table_store(path, decode_strings)
+    return _load
+
+
+def _write_column(path: str, position: int, values: pd.Series):
+    file = f'c{position}.npy'
+    name = values.name.item() if isinstance(values.name, np.generic) else values.name
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in _ARRAY_KINDS:
+        np.save(os.path.join(path, file), np.ascontiguousarray(values.to_numpy()), allow_pickle=False)
+        return dict(name=name, kind='array', file=file, dtype=str(dtype))
+
+    categorical = isinstance(dtype, pd.CategoricalDtype)
+    if categorical or pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        # the dictionary encoding of the string column, the null value is of code -1. the dictionary is sorted, so
+        # that the categoricals opened from the store are ordered (e.g. grouped) as the strings
+        if categorical:
+            codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, categories = pd.factorize(values, sort=True, use_na_sentinel=True)
+        if categorical and pd.api.types.infer_dtype(categories, skipna=True) != 'string':
+            return _write_pickled(path, position, name, values)
+        codes = codes.astype(_codes_dtype(len(categories)), copy=False)
+        np.save(os.path.join(path, file), codes, allow_pickle=False)
+        dictionary = f'c{position}.dict.json'
+        with open(os.path.join(path, dictionary), 'w') as f:
+            json.dump([str(c) for c in categories], f)
+        return dict(name=name, kind='dict', file=file, dictionary=dictionary, dtype=str(dtype),
+                    ordered=bool(categorical and dtype.ordered))
+    return _write_pickled(path, position, name, values)
+
+
+def _write_pickled(path: str, position: int, name, values: pd.Series):
+    file = f'c{position}.pkl'
+    with open(os.path.join(path, file), 'wb') as f:
+        pickle.dump(values.array, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return dict(name=name, kind='pickle', file=file, dtype=str(values.dtype))
+
+
+def _codes_dtype(size: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
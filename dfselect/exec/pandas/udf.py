@@ -33,9 +33,30 @@ def udf_IF(cond, true_val, false_val):
     :return: true_val if cond is True or false_val otherwise
     """
     if isinstance(cond, pd.Series):
-        return pd.Series([true_val if t else false_val for t in cond])
+        return pd.Series([true_val if t else false_val for t in cond], index=cond.index)
     return true_val if cond else false_val
 
 
 def udf_F(a, b):
     return a + b
+
+
+def udf_APPROX_COUNT_DISTINCT(values):
+    """
+    the udf function of APPROX_COUNT_DISTINCT(values), estimated by the HyperLogLog sketch
+    :param values: the values to count
+    :return: the estimated count of the distinct non-null values
+    """
+    from dfselect.sketch import DistinctSketch
+    return DistinctSketch.from_values(values).count()
+
+
+def udf_APPROX_QUANTILE(values, q=0.5):
+    """
+    the udf function of APPROX_QUANTILE(values, q), estimated by the KLL sketch
+    :param values: the values to compute the quantile
+    :param q: the quantile in [0, 1]
+    :return: the estimated quantile of the non-null values
+    """
+    from dfselect.sketch import QuantileSketch
+    return QuantileSketch.from_values(values).quantile(q)
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from .expr import widen_int
+from dfselect.errors import DFSelectExecError
+from dfselect.plan import expr_key
+
+# the running aggregate functions of groupby, by the window function
+_RUNNING_AGG_FUNCS = dict(sum='cumsum', min='cummin', max='cummax')
+# the aggregate functions over the whole partition, by the window function
+_PARTITION_AGG_FUNCS = dict(sum='sum', count='count', avg='mean', mean='mean', min='min', max='max')
+
+
+def compute_windows(df: pd.DataFrame, window_columns, get_column):
+    """
+    compute the window columns of the table, the table is sorted once per distinct window spec (the partition-by and
+    order-by items) shared by the window columns, and the window functions are computed by the vectorized groupby
+    functions over the sorted table
+    :param df: the table data object
+    :param window_columns: the window columns of form (func_name, func_args, partition_by, order_by, column_alias)
+    :param get_column: the function to get the column series of an expression from the table
+    :return: the dict of the column alias to the window column values, in the order of the table
+    """
+    windows = dict()
+    for window_column in window_columns:
+        _, _, partition_by, order_by, _ = window_column
+        window_key = (expr_key(partition_by), tuple((expr_key(o[0]), o[1]) for o in order_by))
+        windows.setdefault(window_key, (partition_by, order_by, []))[2].append(window_column)
+
+    results = dict()
+    for partition_by, order_by, spec_columns in windows.values():
+        key_columns = [get_column(df, p) for p in partition_by] + [get_column(df, o[0]) for o in order_by]
+        keys = pd.concat(key_columns, axis=1, keys=range(len(key_columns))).reset_index(drop=True) if key_columns \
+            else pd.DataFrame(index=pd.RangeIndex(len(df)))
+        if order_by or partition_by:
+            order = keys.sort_values(by=list(keys.columns), kind='mergesort',
+                                     ascending=[True] * len(partition_by) + [o[1] for o in order_by]).index.to_numpy()
+        else:
+            order = np.arange(len(df))
+        inverse = np.empty(len(order), dtype=np.int64)
+        inverse[order] = np.arange(len(order))
+        sorted_keys = keys.take(order).reset_index(drop=True)
+
+        # the partition id and the peer id (the rows of the same order-by values in a partition) of the sorted rows
+        partition_keys = sorted_keys.iloc[:, :len(partition_by)]
+        partition_ids = partition_keys.groupby(list(partition_keys.columns), sort=False, dropna=False).ngroup() \
+            if partition_by else pd.Series(0, index=sorted_keys.index)
+        partition_start = partition_ids.ne(partition_ids.shift())
+        order_keys = sorted_keys.iloc[:, len(partition_by):]
+        peer_start = partition_start | _changed(order_keys)
+        peer_ids = peer_start.cumsum()
+        partitions = partition_ids.groupby(partition_ids, sort=False)
+
+        for func_name, func_args, _, _, column_alias in spec_columns:
+            if func_name == 'row_number':
+                values = partitions.cumcount() + 1
+            elif func_name == 'rank':
+                row_numbers = partitions.cumcount() + 1
+                values = row_numbers.where(peer_start).ffill().astype('int64')
+            elif func_name == 'dense_rank':
+                values = peer_start.astype('int64').groupby(partition_ids, sort=False).cumsum()
+            elif func_name in ('lag', 'lead'):
+                offset = int(func_args[1]) if len(func_args) > 1 else 1
+                arg_values = get_column(df, func_args[0]).take(order).reset_index(drop=True)
+                values = arg_values.groupby(partition_ids, sort=False).shift(offset if func_name == 'lag' else -offset)
+                if len(func_args) > 2 and func_args[2] is not None:
+                    # fill the default value for the rows shifted out of the partition only, not for the null values
+                    positions = partitions.cumcount()
+                    out_of_partition = positions < offset if func_name == 'lag' else \
+                        positions >= partitions.transform('size') - offset
+                    values = values.where(~out_of_partition, func_args[2])
+            else:
+                values = _aggregate_window(df, func_name, func_args, order, partition_ids, peer_ids, bool(order_by),
+                                           get_column)
+            results[column_alias] = pd.Series(values.to_numpy()[inverse], index=df.index)
+    return results
+
+
+def _changed(keys: pd.DataFrame):
+    """
+    check whether the key values of each row are changed from the previous row, the nulls are equal to each other
+    """
+    if not len(keys.columns):
+        return pd.Series(False, index=keys.index)
+    previous = keys.shift()
+    same = keys.eq(previous) | (keys.isna() & previous.isna())
+    return ~same.all(axis=1)
+
+
+def _aggregate_window(df, func_name, func_args, order, partition_ids, peer_ids, ordered: bool, get_column):
+    """
+    compute the aggregate function over the window, the window of the ordered spec is the rows from the partition
+    start to the last peer of the current row, otherwise the whole partition
+    """
+    if func_args and isinstance(func_args[0], str) and func_args[0] == '*':
+        if func_name != 'count':
+            raise DFSelectExecError(f'{func_name}(*) is not supported in window function')
+        arg_values = pd.Series(1, index=partition_ids.index)
+        func_name = 'sum'
+    else:
+        if not func_args:
+            raise DFSelectExecError(f'window function {func_name} requires an argument')
+        arg_values = get_column(df, func_args[0]).take(order).reset_index(drop=True)
+        if func_name == 'sum':
+            arg_values = widen_int(arg_values)
+    arg_groups = arg_values.groupby(partition_ids, sort=False)
+
+    if not ordered:
+        # the sum of the partition of null values only is null, the same as the running sum
+        if func_name == 'sum':
+            return arg_groups.transform('sum', min_count=1)
+        return arg_groups.transform(_PARTITION_AGG_FUNCS[func_name])
+    if func_name == 'count':
+        values = arg_values.notna().astype('int64').groupby(partition_ids, sort=False).cumsum()
+    elif func_name in ('avg', 'mean'):
+        counts = arg_values.notna().astype('int64').groupby(partition_ids, sort=False).cumsum()
+        values = arg_groups.cumsum().groupby(partition_ids, sort=False).ffill() / counts.where(counts > 0)
+    else:
+        # the running values skip the null values, keep the running value of the previous row for them
+        values = getattr(arg_groups, _RUNNING_AGG_FUNCS[func_name])().groupby(partition_ids, sort=False).ffill()
+    # the peers of the current row are in the window as well
+    return values.groupby(peer_ids, sort=False).transform('last')
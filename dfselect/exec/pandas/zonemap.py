@@ -0,0 +1,177 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from dfselect.errors import DFSelectContextError
+from dfselect.parse.ast import Literal, BinaryOp, InList, Between
+from dfselect.plan import BoundColumn
+
+# the default rows of each block of the zone map
+DEFAULT_ZONE_MAP_BLOCK_ROWS = 2 ** 16
+
+# the comparison of the column to the value, flipped for the value on the left side
+_FLIPPED_OPS = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '=', '!=': '!='}
+
+
+class ZoneMap(NamedTuple):
+    block_rows: int
+    # the rows of the table the zone map is built for
+    row_count: int
+    # the min, max and has-null arrays of the blocks, by the position of the numeric or datetime column
+    bounds: dict
+
+
+def compute_zone_map(df: pd.DataFrame, block_rows: int = DEFAULT_ZONE_MAP_BLOCK_ROWS):
+    """
+    build the zone map of the table: the min and max of each numeric or datetime column in each block of rows, and
+    whether the block has null values. the null values are ignored by the min/max, the min/max of a block of nulls
+    only are null
+    :param df: the table data object
+    :param block_rows: the rows of each block
+    :return: the zone map
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise DFSelectContextError('zone map can only be built for the table in memory')
+    if block_rows <= 0:
+        raise DFSelectContextError(f'the rows of zone map blocks should be positive, got {block_rows}')
+    bounds = dict()
+    for position in range(df.shape[1]):
+        values = _block_values(df.iloc[:, position])
+        if values is not None:
+            bounds[position] = _block_bounds(values, block_rows)
+    return ZoneMap(block_rows, len(df), bounds)
+
+
+def extend_zone_map(zone_map: ZoneMap, df: pd.DataFrame):
+    """
+    maintain the zone map of the table appended with rows, the last block of the zone map and the appended blocks
+    are computed from the rows of the appended table
+    :param zone_map: the zone map of the table before appending
+    :param df: the appended table
+    :return: the zone map of the appended table
+    """
+    first_block = zone_map.row_count // zone_map.block_rows
+    start = first_block * zone_map.block_rows
+    bounds = dict()
+    for position, block_bounds in zone_map.bounds.items():
+        values = _block_values(df.iloc[start:, position]) if position < df.shape[1] else None
+        if values is None:
+            # the column of the appended table is not comparable any more
+            continue
+        appended_bounds = _block_bounds(values, zone_map.block_rows)
+        bounds[position] = tuple(np.concatenate([kept[:first_block], appended])
+                                 for kept, appended in zip(block_bounds, appended_bounds))
+    return zone_map._replace(row_count=len(df), bounds=bounds)
+
+
+def prune_blocks(df: pd.DataFrame, zone_map: ZoneMap, filter_expr):
+    """
+    skip the blocks of the table which can not match the filter by the zone map
+    :param df: the table the zone map is built for
+    :param zone_map: the zone map
+    :param filter_expr: the bound filter expression
+    :return: the rows of the table in the blocks which may match, the table itself if no block is skipped
+    """
+    candidates = _candidate_blocks(filter_expr, zone_map)
+    if candidates is None or candidates.all():
+        return df
+    starts = np.flatnonzero(candidates) * zone_map.block_rows
+    if not len(starts):
+        return df.iloc[:0]
+    # the contiguous blocks are taken as a slice of the table without copy
+    if (np.diff(starts) == zone_map.block_rows).all():
+        return df.iloc[starts[0]:starts[-1] + zone_map.block_rows]
+    rows = np.arange(zone_map.block_rows)
+    positions = (starts[:, None] + rows[None, :]).ravel()
+    return df.take(positions[positions < len(df)])
+
+
+def _block_values(values: pd.Series):
+    # the numpy array of the numeric or tz-naive datetime column, None for the other columns
+    dtype = values.dtype
+    if not isinstance(dtype, np.dtype) or dtype.kind not in 'iufM':
+        return None
+    return values.to_numpy()
+
+
+def _block_bounds(values: np.ndarray, block_rows: int):
+    if not len(values):
+        return values[:0], values[:0], np.zeros(0, dtype=bool)
+    starts = np.arange(0, len(values), block_rows)
+    nulls = np.isnat(values) if values.dtype.kind == 'M' else \
+        np.isnan(values) if values.dtype.kind == 'f' else np.zeros(len(values), dtype=bool)
+    # fmin/fmax skip the nan (and nat) of the block
+    return np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts), np.logical_or.reduceat(nulls, starts)
+
+
+def _candidate_blocks(expr, zone_map: ZoneMap):
+    """
+    check which blocks may match the predicate
+    :return: the boolean array of the blocks, None if any block may match
+    """
+    if isinstance(expr, BinaryOp) and expr.op in ('and', 'or'):
+        left, right = _candidate_blocks(expr.left, zone_map), _candidate_blocks(expr.right, zone_map)
+        if expr.op == 'and':
+            return right if left is None else left if right is None else left & right
+        return None if left is None or right is None else left | right
+    if isinstance(expr, BinaryOp) and expr.op in _FLIPPED_OPS:
+        op, column, value = expr.op, expr.left, expr.right
+        if isinstance(column, Literal):
+            op, column, value = _FLIPPED_OPS[op], value, column
+        bounds, value = _column_bounds(column, value, zone_map)
+        if bounds is None:
+            return None
+        return _compare_blocks(op, bounds, value)
+    if isinstance(expr, InList) and not expr.negated:
+        candidates = None
+        for item in expr.items:
+            bounds, value = _column_bounds(expr.operand, item, zone_map)
+            if bounds is None:
+                return None
+            matched = _compare_blocks('=', bounds, value)
+            candidates = matched if candidates is None else candidates | matched
+        return candidates
+    if isinstance(expr, Between) and not expr.negated:
+        low_bounds, low = _column_bounds(expr.operand, expr.low, zone_map)
+        high_bounds, high = _column_bounds(expr.operand, expr.high, zone_map)
+        if low_bounds is None or high_bounds is None:
+            return None
+        return _compare_blocks('>=', low_bounds, low) & _compare_blocks('<=', high_bounds, high)
+    return None
+
+
+def _column_bounds(column, value, zone_map: ZoneMap):
+    """
+    the block bounds of the column compared to the literal value, and the value as the type of the bounds, None if
+    the blocks can not be checked
+    """
+    if not isinstance(column, BoundColumn) or not isinstance(value, Literal) or column.position not in zone_map.bounds:
+        return None, None
+    bounds = zone_map.bounds[column.position]
+    value = value.value
+    if bounds[0].dtype.kind == 'M':
+        # the datetime column is compared to the text of the timestamp
+        if not isinstance(value, str):
+            return None, None
+        try:
+            value = np.datetime64(pd.Timestamp(value).tz_localize(None))
+        except ValueError:
+            return None, None
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None, None
+    return bounds, value
+
+
+def _compare_blocks(op: str, bounds, value):
+    mins, maxs, has_nulls = bounds
+    with np.errstate(invalid='ignore'):
+        if op == '=':
+            return (mins <= value) & (maxs >= value)
+        if op == '!=':
+            # the block of the value only never matches, unless it has null values, which are not equal to the
+            # value as compared by the engine
+            return ~((mins == value) & (maxs == value)) | has_nulls
+        if op in ('<', '<='):
+            return mins < value if op == '<' else mins <= value
+        return maxs > value if op == '>' else maxs >= value
@@ -1,468 +1,247 @@
-import sqlparse as sp
-from sqlparse.sql import Statement, Identifier, Where, IdentifierList, Comparison, Operation, Function
-from sqlparse.tokens import Comparison as compOp, Wildcard, DML, Literal, Keyword
-
-from ..util import is_skip_token, move_on_next, collect_tokens_until, parse_identifier, reparse_token, \
-    eval_literal_value
+from .ast import Column, Literal, Star, Call, BinaryOp, walk
+from .lexer import tokenize, EOF, PUNCT
+from .parser import parse_select_ast
+from .rewrite import simplify_expr, is_true
 from ..errors import DFSelectParseError
 from ..log import log
 
+# the window functions computed over the partitions ordered by the window spec
+_WINDOW_FUNC_NAMES = ('row_number', 'rank', 'dense_rank', 'sum', 'count', 'avg', 'mean', 'min', 'max', 'lag', 'lead')
+
+# the aggregate functions, the select of any aggregate column without group-by aggregates the whole table
+AGG_FUNC_NAMES = ('avg', 'mean', 'count', 'sum', 'min', 'max', 'std', 'median', 'quantile',
+                  'approx_count_distinct', 'approx_quantile')
+
 
 def parse_select(select: str):
     """
     parse the single select statement
     :param select: the single select statement
-    :return: the parsed operation list
+    :return: the parsed operation list, the expressions of the operators are the syntax trees, which are bound to
+    the columns of the loaded tables before execution
     """
-    select = ' '.join(select.strip().split())
     log.debug('Parse select:')
     log.debug(f'> {select}')
-    stmts = sp.parse(select)
+    return _parse_select(parse_select_ast(select))
 
-    # only the single select is supported
-    if len(stmts) > 1:
-        raise DFSelectParseError("Only single select query can be processed")
 
-    return _parse_select(stmts[0])
+def query_key(select: str):
+    """
+    the key of the query text by its tokens, the queries of different blanks, comments or trailing semicolons are of
+    the same key, while the string literals are kept as they are
+    :param select: the single select statement
+    :return: the hashable key
+    """
+    tokens = [(token[0], token[1]) for token in tokenize(select) if token[0] != EOF]
+    while tokens and tokens[-1] == (PUNCT, ';'):
+        tokens.pop()
+    return tuple(tokens)
 
 
-def _parse_select(stmt: Statement):
+def referenced_tables(operators):
     """
-    parse the select query to get the result dataframe
-    :param stmt: the query statement
-    :return: the result dataframe
+    collect the source keys of the tables referenced by the parsed operators
+    :param operators: the parsed operation list
+    :return: the table source list in the order of reference
     """
-    assert _contains_sub_select(stmt), 'only the select statement is supported'
-    pos = 0
-
-    proj_columns, pos = _parse_select_clause(stmt, offset=pos)
-    major_table, join_clauses, pos = _parse_from_clause(stmt, offset=pos)
-
-    filter_expr = None
-    order_by = None
-    limit = None
-    group_by = None
-    group_by_seen = False
-
-    if len(stmt.tokens) > pos and isinstance(stmt.tokens[pos], Where):
-        where = stmt.tokens[pos]
-        # process where
-        filter_expr = _parse_where_clause(where)
-        pos += 1
-
-    pos = move_on_next(stmt, offset=pos)
-    while len(stmt.tokens) > pos:
-        keyword = stmt.tokens[pos]
-        assert keyword.is_keyword, 'invalid'
-        tokens_by_keyword, pos = collect_tokens_until(stmt, lambda t: t.is_keyword, pos + 1)
-        if 'ORDER' in keyword.value.upper():
-            order_by = _parse_order_clause(tokens_by_keyword)
-        elif 'LIMIT' in keyword.value.upper():
-            limit = _parse_limit_clause(tokens_by_keyword)
-        elif 'GROUP' in keyword.value.upper():
-            group_by = _parse_group_clause(tokens_by_keyword)
-            group_by_seen = True
-        pos = move_on_next(stmt, offset=pos)
-
-    log.debug('parsed components:')
-    log.debug(f'> FILTER: {filter_expr}')
-    log.debug(f'> ORDER_BY: {order_by}')
-    log.debug(f'> LIMIT: {limit}')
-    log.debug(f'> GROUP_BY: {group_by}')
-
-    assert major_table, 'major table parsed failed'
+    table_sources = []
+    for op_code, op_args in operators:
+        if op_code == 'LOAD':
+            table_sources.append(op_args[0][0])
+        elif op_code == 'JOIN':
+            table_sources.append(op_args[0][0])
+    return table_sources
+
+
+def _parse_select(stmt):
+    """
+    translate the parsed select query into the operators
+    :param stmt: the parsed Select node
+    :return: the operator list
+    """
+    proj_columns = []
+    window_columns = []
+    agg_seen = False
+    for item in stmt.items:
+        if isinstance(item.expr, Star):
+            continue
+        if isinstance(item.expr, Call) and item.expr.over is not None:
+            # the window column is computed by the window operator, and projected by its alias
+            window_column = _parse_window_item(item)
+            window_columns.append(window_column)
+            proj_columns.append((Column(None, window_column[-1], window_column[-1]), window_column[-1]))
+            continue
+        proj_columns.append(_parse_select_item(item))
+        agg_seen = agg_seen or _is_agg_expr(item.expr)
+
+    major_table = (stmt.table.name, stmt.table.alias)
+    table_sample = tuple(stmt.table.sample) if stmt.table.sample else None
+    join_clauses = []
+    joined_tables = {stmt.table.alias}
+    for join in stmt.joins:
+        join_clauses.append(_parse_join_conds(join, joined_tables))
+        joined_tables.add(join.table.alias)
+
+    filter_expr = simplify_expr(_check_filter_expr(stmt.where)) if stmt.where is not None else None
+    if filter_expr is not None and is_true(filter_expr):
+        # the always-true condition keeps all the rows
+        filter_expr = None
+    order_by = [(simplify_expr(expr), asc) for expr, asc in stmt.order_by]
+    limit = list(stmt.limit) if stmt.limit else None
+    group_by = [_parse_group_item(expr) for expr in stmt.group_by] if stmt.group_by is not None else None
+
+    # the aggregation without group-by aggregates the whole table as a single group
+    if group_by is None and agg_seen:
+        group_by = []
+    if window_columns and group_by is not None:
+        raise DFSelectParseError('window function is not supported in aggregation')
+    # the rows of aggregation are distinct already, as all the group keys are projected
+    distinct = stmt.distinct and group_by is None
+
+    debug = log.getLogger().isEnabledFor(log.DEBUG)
+    if debug:
+        log.debug('parsed components:')
+        log.debug(f'> FILTER: {filter_expr}')
+        log.debug(f'> ORDER_BY: {order_by}')
+        log.debug(f'> LIMIT: {limit}')
+        log.debug(f'> GROUP_BY: {group_by}')
+        log.debug(f'> WINDOW: {window_columns}')
+        log.debug(f'> DISTINCT: {distinct}')
 
     operators = [
-        ('LOAD', [major_table])
+        ('LOAD', [major_table, table_sample] if table_sample else [major_table])
     ]
     for join_clause in join_clauses:
         operators.append(('JOIN', join_clause))
-    if filter_expr:
+    if filter_expr is not None:
         operators.append(('FILTER', [filter_expr]))
+    if window_columns:
+        operators.append(('WINDOW', window_columns))
     if order_by:
         operators.append(('ORDER', order_by))
-    if limit:
+    if limit and not distinct:
         operators.append(('LIMIT', limit))
-    if group_by:
+    if group_by is not None:
         operators.append(('GROUP', [group_by, proj_columns]))
     if proj_columns:
         operators.append(('PROJECT', proj_columns))
+    if distinct:
+        # the limit is taken of the distinct rows, the rows are deduplicated until enough distinct rows are found
+        operators.append(('DISTINCT', [limit] if limit else []))
 
-    log.debug('parsed operators:')
-    for op in operators:
-        log.debug(f'> {op[0]} {op[1]}')
+    if debug:
+        log.debug('parsed operators:')
+        for op in operators:
+            log.debug(f'> {op[0]} {op[1]}')
 
     return operators
 
 
-def _parse_group_item(item):
-    if isinstance(item, Identifier):
-        # extract the columns identifiers
-        return parse_identifier(item, allow_alias=False)
-    elif isinstance(item, Operation):
-        # if the item is an expression
-        return item.value, item.value.lower().strip('\'').strip('"')
-    elif isinstance(item, Function):
-        # if the item is a function call
-        return item.value, item.value.lower().strip('\'').strip('"')
-    # we do not support sub-query in select-clause
-    elif _contains_sub_select(item):
-        raise DFSelectParseError("sub-query is not supported in groupby-clause: {seg}".format(seg=str(item)))
-    raise DFSelectParseError("invalid token in groupby-clause: {seg}".format(seg=str(item)))
-
-
-def _parse_group_clause(group_tokens):
-    token = group_tokens[0]
-    passed_group_items = []
-    if isinstance(token, IdentifierList):
-        group_items = [t for t in token.tokens if not is_skip_token(t)]
-        for group_item in group_items:
-            passed_group_items.append(_parse_group_item(group_item))
-    else:
-        passed_group_items.append(_parse_group_item(token))
-    return passed_group_items
-
-
-def _parse_order_item(item):
-    asc = True
-    if item.is_group:
-        tokens = [t for t in list(item.flatten()) if not is_skip_token(t)]
-        if tokens[-1].ttype in Keyword.Order:
-            direction = tokens.pop()
-            if direction.value.lower() == 'desc':
-                asc = False
-            item = reparse_token(''.join([str(t) for t in tokens]))
-    if isinstance(item, Identifier):
-        # extract the columns identifiers
-        return parse_identifier(item, allow_alias=False)[0], asc
-    elif isinstance(item, Operation):
-        # if the item is an expression
-        return item.value, asc
-    elif isinstance(item, Function):
-        # if the item is a function call
-        return item.value, asc
-    # we do not support sub-query in select-clause
-    elif _contains_sub_select(item):
-        raise DFSelectParseError("sub-query is not supported in groupby-clause: {seg}".format(seg=str(item)))
-    raise DFSelectParseError("invalid token in groupby-clause: {seg}".format(seg=str(item)))
-
-
-def _parse_order_clause(order_tokens):
-    token = order_tokens[0]
-    passed_order_items = []
-    if isinstance(token, IdentifierList):
-        group_items = [t for t in token.tokens if not is_skip_token(t)]
-        for group_item in group_items:
-            passed_order_items.append(_parse_order_item(group_item))
-    else:
-        passed_order_items.append(_parse_order_item(token))
-    return passed_order_items
+def _default_alias(expr):
+    return expr.text.lower().strip('\'').strip('"')
 
 
-def _parse_limit_clause(limit_tokens):
-    token = limit_tokens[0]
-    if isinstance(token, IdentifierList):
-        limit_items = [t for t in token.flatten() if not is_skip_token(t)]
-    else:
-        limit_items = [token]
-    if not limit_items:
-        raise DFSelectParseError(f'invalid limit param: {limit_tokens}')
-    if len(limit_items) > 2:
-        raise DFSelectParseError(f'limit params too long: {limit_tokens}')
-    invalid_limit_items = [t for t in limit_items if t.ttype not in Literal]
-    if invalid_limit_items:
-        raise DFSelectParseError(f'limit params contains invalid items: {limit_tokens}')
-    limit_params = [eval_literal_value(t) for t in limit_items]
-    if limit_params[-1] < 0:
-        raise DFSelectParseError(f'limit params use invalid limit size: {limit_tokens}')
-    if len(limit_params) > 1:
-        if limit_params[0] < 0:
-            raise DFSelectParseError(f'limit params use invalid limit offset: {limit_tokens}')
-    else:
-        limit_params = [0, *limit_params]
-    return limit_params
+def _parse_select_item(item):
+    expr = item.expr
+    if isinstance(expr, Literal) and expr.value is None:
+        return expr, item.alias or 'NULL'
+    if isinstance(expr, Column):
+        return expr, item.alias or expr.name
+    # the alias is of the expression text in the query, before the constants folded
+    return simplify_expr(expr), item.alias or _default_alias(expr)
+
+
+def _parse_group_item(expr):
+    if isinstance(expr, Column):
+        return expr, expr.name
+    return simplify_expr(expr), _default_alias(expr)
+
+
+def _parse_window_item(item):
+    """
+    parse the window function call of form 'func(args) OVER ([PARTITION BY exprs] [ORDER BY exprs]) [[AS] alias]'
+    :param item: the select item of window function call
+    :return: the window column of form (func_name, func_args, partition_by, order_by, column_alias)
+    """
+    func = item.expr
+    if func.name not in _WINDOW_FUNC_NAMES:
+        raise DFSelectParseError("window function not supported: {seg}".format(seg=func.text))
+
+    # the first argument is the column expression, the others are literal params (e.g. the offset of lag/lead)
+    func_args = []
+    for idx, arg in enumerate(func.args):
+        if idx == 0:
+            func_args.append('*' if isinstance(arg, Star) else simplify_expr(arg))
+        elif isinstance(arg, Literal):
+            func_args.append(arg.value)
+        else:
+            raise DFSelectParseError("window function params should be literal: {seg}".format(seg=arg.text))
+
+    partition_by = [simplify_expr(expr) for expr in func.over.partition_by]
+    order_by = [(simplify_expr(expr), asc) for expr, asc in func.over.order_by]
+    if func.name in ('rank', 'dense_rank', 'lag', 'lead') and not order_by:
+        raise DFSelectParseError("window function {func} requires order by: {seg}".format(func=func.name,
+                                                                                          seg=func.text))
+    return func.name, func_args, partition_by, order_by, item.alias or _default_alias(func)
 
 
-def _contains_sub_select(item):
+def _is_agg_expr(expr):
     """
-    check whether an parsed item is a query DML statement
-    :param item: the parsed item
-    :param ctx: the context object
-    :return: True or False
+    check whether an expression calls any aggregate function
     """
-    if not item.is_group:
-        return item.ttype is DML and item.value.upper() == 'SELECT'
-    for sub_token in item.tokens:
-        if _contains_sub_select(sub_token):
-            return True
-    return False
+    return any(isinstance(node, Call) and node.over is None and node.name in AGG_FUNC_NAMES for node in walk(expr))
 
 
-def _parse_select_item(item):
-    # skip the '*'
-    if item.ttype is Wildcard:
-        return None
-    if item.ttype in Literal:
-        # if the item is a constant of string or number
-        const_val = int(item.value) if item.ttype in Literal.Number.Integer else float(
-            item.value) if item.ttype in Literal.Number.Float else item.value
-        return const_val, item.value.lower().strip('\'').strip('"')
-    elif item.is_keyword and item.value.upper() == 'NULL':
-        return None, 'NULL'
-    elif isinstance(item, Identifier):
-        # extract the columns identifiers
-        return parse_identifier(item, allow_literal=True)
-    elif isinstance(item, Operation):
-        # if the item is an expression
-        return item.value, item.value.lower().strip('\'').strip('"')
-    elif isinstance(item, Function):
-        # if the item is a function call
-        return item.value, item.value.lower().strip('\'').strip('"')
-    # we do not support sub-query in select-clause
-    elif _contains_sub_select(item):
-        raise DFSelectParseError("sub-query is not supported in select-clause: {seg}".format(seg=str(item)))
-    else:
-        raise DFSelectParseError("invalid token in select-clause: {seg}".format(seg=str(item)))
-
-
-def _parse_select_clause(tokens, offset: int = 0):
+def _parse_join_conds(join, joined: set):
     """
-    eval the select clause to retrieve the selected columns
-    :param tokens: the token list to parse
-    :param offset: the start position to parse
-    :return: the parsed selected columns
+    parse the join clause
+    :param join: the parsed Join node
+    :param joined: the aliases of the tables joined before
+    :return: the join clause of form (join_table, join_mode, join_conds), each join condition is of form
+    (bool_op, [table, column], [table, column])
     """
-    parsed_columns = []
-    select_seen = False
-    idx = 0
-    for idx, item in enumerate(tokens[offset:]):
-        # skip the whitespace or comment or punctuation
-        if is_skip_token(item):
-            continue
-        # after select
-        if select_seen:
-            # process until we come to the next keyword
-            # maybe 'FROM'
-            if item.is_keyword:
-                return parsed_columns, offset + idx
-            elif isinstance(item, IdentifierList):
-                columns = [t for t in item.tokens if not is_skip_token(t)]
-                for (item_idx, column) in enumerate(columns):
-                    select_item = _parse_select_item(column)
-                    parsed_columns.append(select_item)
-            else:
-                select_item = _parse_select_item(item)
-                if select_item:
-                    parsed_columns.append(select_item)
-        # pass the 'SELECT' keyword
-        elif item.is_keyword and item.value.upper() == 'SELECT':
-            select_seen = True
-    # pass all tokens to the end
-    return parsed_columns, offset + idx + 1
-
-
-def _parse_join_conds(join_op, seg, joined: set, offset: int = 0):
-    """
-
-    :param seg:
-    :param joined:
-    :param offset:
-    :return:
-    """
-    # collect join tables until we meet 'ON' keyword
-    join_tables, on_offset = collect_tokens_until(seg,
-                                                  lambda t: t.is_keyword and t.value.upper() == 'ON',
-                                                  offset=offset + 1)
-    # the join target table should be singleton
-    if len(join_tables) != 1 or not isinstance(join_tables[0], Identifier):
-        raise DFSelectParseError("invalid token in join tables: {seg}".format(seg=str(join_tables)))
-    join_table = parse_identifier(join_tables[0])
-
-    join_on_tokens, next_offset = collect_tokens_until(seg,
-                                                       lambda t: not isinstance(t, Comparison)
-                                                                 and not t.value.upper() in ('AND', 'OR'),
-                                                       offset=on_offset + 1)
-    join_bool_op = 'AND'
+    join_table = (join.table.name, join.table.alias)
+    check_tbls = {join.table.alias}.union(joined)
     join_conds = []
-    check_tbls = {join_table[1]}.union(joined)
-    for join_on_token in join_on_tokens:
-        if is_skip_token(join_on_token):
-            continue
-        if isinstance(join_on_token, Comparison):
-            join_expr = join_on_token
-            left, right = _parse_join_expr(join_expr)
-
-            join_prefixes = {left[0], right[0]}
-            if len(join_prefixes) == 1:
-                raise DFSelectParseError(
-                    "join expression on columns from same table: {seg}".format(seg=str(join_expr)))
-            if not check_tbls.issuperset(join_prefixes):
-                raise DFSelectParseError(
-                    "join expression on columns from separated set: {seg}".format(seg=str(join_expr)))
-            join_conds.append((join_bool_op, left, right))
-
-        elif join_on_token.value.upper() in ('AND', 'OR'):
-            join_bool_op = join_on_token.value.upper()
-        else:
-            raise DFSelectParseError("invalid token in join-condition: {seg}".format(seg=str(join_on_tokens)))
-
-    # joined.add(join_table)
-
-    join_op_str = join_op.value.upper()
-    join_mode = 'LEFT' if 'LEFT' in join_op_str else 'RIGHT' if 'RIGHT' in join_op_str else 'OUTER' if 'OUTER' in join_op_str else 'INNER'
-
-    return (join_table, join_mode, join_conds), next_offset
-
-
-def _parse_join_expr(join_expr: Comparison):
-    def _parse_join_column(param: str):
-        toks = param.split('.')
-        if len(toks) < 2:
+    for join_bool_op, join_expr in _split_bool_terms(join.condition, 'AND'):
+        if not isinstance(join_expr, BinaryOp) or join_expr.op in ('and', 'or') or \
+                not isinstance(join_expr.left, Column) or not isinstance(join_expr.right, Column):
             raise DFSelectParseError(
-                'table prefix is required: {seg}'.format(seg=str(join_expr)))
-        if len(toks) > 2:
+                'the operand of join expression can only be column identifier: {seg}'.format(seg=join_expr.text))
+        if join_expr.op != '=':
             raise DFSelectParseError(
-                'invalid column identifier in join expression: {seg}'.format(seg=str(join_expr)))
-        return toks
-
-    if not isinstance(join_expr.left, Identifier) or not isinstance(join_expr.right, Identifier):
-        raise DFSelectParseError(
-            'the operand of join expression can only be column identifier: {seg}'.format(seg=str(join_expr)))
-
-    left, _ = parse_identifier(join_expr.left, allow_alias=False)
-    right, _ = parse_identifier(join_expr.right, allow_alias=False)
-
-    join_op = join_expr.token_matching(lambda t: t.ttype is compOp, 0)
-    if join_op.normalized != '=':
-        raise DFSelectParseError('only equal operator supported in join expression: {seg}'.format(seg=str(join_expr)))
-
-    return _parse_join_column(left), _parse_join_column(right)
+                'only equal operator supported in join expression: {seg}'.format(seg=join_expr.text))
+        left, right = join_expr.left, join_expr.right
+        if not left.table or not right.table:
+            raise DFSelectParseError('table prefix is required: {seg}'.format(seg=join_expr.text))
+        if left.table == right.table:
+            raise DFSelectParseError("join expression on columns from same table: {seg}".format(seg=join_expr.text))
+        if not check_tbls.issuperset({left.table, right.table}):
+            raise DFSelectParseError(
+                "join expression on columns from separated set: {seg}".format(seg=join_expr.text))
+        join_conds.append((join_bool_op, [left.table, left.name], [right.table, right.name]))
+    return join_table, join.mode, join_conds
 
 
-def _parse_from_clause(tokens, offset: int = 0):
+def _split_bool_terms(expr, bool_op: str):
     """
-    eval the from clause to retrieve the selected columns
-    :param tokens: the token list to parse
-    :param offset: the start position to parse
-    :return: the parsed from columns
+    split the boolean expression into the terms of form (bool_op, term), the bool_op joins the term with the previous
     """
-    # the flag to mark from keyword
-    from_seen = False
-    major_table = None
-    joined_tables = set()
-    join_clauses = list()
-    idx = 0
-    for idx, item in enumerate(tokens[offset:]):
-        if from_seen:
-            if is_skip_token(item):
-                continue
-            if isinstance(item, Identifier):
-                major_table = parse_identifier(item)
-                joined_tables.add(major_table[1])
-                continue
-            if isinstance(item, IdentifierList):
-                raise DFSelectParseError(
-                    "comma splitted tables is not supported in from-clause near '{seg}', use join instead".format(
-                        seg=str(item)))
-            if isinstance(item, Where):
-                return major_table, join_clauses, offset + idx
-            if item.is_keyword and item.normalized in ('LIMIT', 'ORDER BY', 'GROUP BY'):
-                return major_table, join_clauses, offset + idx
-            if 'JOIN' not in item.value.upper():
-                continue
-
-            next_offset = offset + idx
-            join_token = item
-            while join_token and join_token.is_keyword and 'JOIN' in join_token.value.upper():
-                join_by_table, delta = _parse_join_conds(join_token, tokens[offset + idx:], joined_tables)
-                joined_tables.add(join_by_table[0])
-                join_clauses.append(join_by_table)
-                next_offset += delta
-                join_token = tokens[next_offset] if len(tokens.tokens) > next_offset else None
-            return major_table, join_clauses, next_offset
-        elif item.is_keyword and item.value.upper() == 'FROM':
-            from_seen = True
-    return major_table, join_clauses, offset + idx + 1
-
-
-def _parse_filter_cond(expr: Comparison, ctx):
-    """
-    eval the filter expression in where-clause
-    :param expr: the filter expression
-    :param ctx: the context
-    :return: the parsed filter
-    """
-    op_seen = False
-    op_param = None
-    op = None
-    op_val = None
-    for item in expr.tokens:
-        if is_skip_token(item):
-            continue
-        if op_seen:
-            if _contains_sub_select(item, ctx):
-                op_val = _parse_select(item, ctx)
-            else:
-                op_val = item
-        else:
-            if isinstance(item, Identifier):
-                op_param = item
-            elif item.ttype is compOp:
-                op = item
-                op_seen = True
-    return op, op_param, op_val, expr
+    if isinstance(expr, BinaryOp) and expr.op in ('and', 'or'):
+        yield from _split_bool_terms(expr.left, bool_op)
+        yield from _split_bool_terms(expr.right, expr.op.upper())
+    else:
+        yield bool_op, expr
 
 
-def _parse_where_clause(where: Where):
+def _check_filter_expr(expr):
     """
-    eval the where clause to get the filter-list
-    :param where: the where token
-    :return: the parsed filter-list
+    check the filter expression, the pattern of like should be a string literal
+    :param expr: the parsed filter expression
+    :return: the checked expression
     """
-    where_seen = False
-    filter_expr_str = ''
-    for item in where.tokens:
-        if is_skip_token(item):
-            if not where_seen:
-                continue
-        if where_seen:
-            filter_expr_str += str(item)
-        else:
-            if item.value.upper() == 'WHERE':
-                where_seen = True
-                continue
-            raise DFSelectParseError("invalid token in where-class: '{seg}'".format(seg=str(item)))
-
-    if filter_expr_str:
-        filter_expr = reparse_token(filter_expr_str)
-        filter_expr_str = _rewrite_filter_expr(filter_expr)
-
-    return filter_expr_str
-
-
-def _rewrite_filter_expr(filter_expr):
-    rewritten_tokens = []
-    for filter_token in filter_expr.tokens:
-        if is_skip_token(filter_token):
-            continue
-        if isinstance(filter_token, Comparison):
-            rewritten_tokens.append(_rewrite_filter_expr(filter_token))
-        else:
-            rewritten_tokens.append(str(filter_token))
-
-    if len(rewritten_tokens) == 3 and rewritten_tokens[1].lower() == 'like':
-        like_val = rewritten_tokens[2].strip()
-        if like_val.startswith('\'') or like_val.startswith('"') or like_val.endswith('\'') or like_val.endswith('"'):
-            if like_val.startswith('\'') or like_val.startswith('"'):
-                like_val = like_val[1:]
-            if like_val.endswith('\'') or like_val.endswith('"'):
-                like_val = like_val[:-1]
-            if like_val.startswith('%') and not like_val.endswith('%'):
-                return f'{rewritten_tokens[0]}.str.endswith("{like_val[1:]}")'
-            elif like_val.endswith('%') and not like_val.startswith('%'):
-                return f'{rewritten_tokens[0]}.str.startswith("{like_val[:-1]}")'
-            elif like_val.startswith('%') and like_val.endswith('%'):
-                return f'{rewritten_tokens[0]}.str.contains("{like_val[1:-1]}")'
-            else:
-                return f'{rewritten_tokens[0]}.str.contains("{like_val}")'
-    return ' '.join(rewritten_tokens)
\ No newline at end of file
+    for node in walk(expr):
+        if isinstance(node, BinaryOp) and node.op == 'like' and \
+                not (isinstance(node.right, Literal) and isinstance(node.right.value, str)):
+            raise DFSelectParseError('the pattern of like should be a string literal: {seg}'.format(seg=node.text))
+    return expr
@@ -0,0 +1,158 @@
+from typing import NamedTuple, Any, Optional, Tuple
+
+# the nodes of the parsed select query, every expression node keeps its text in the query (blank squeezed)
+
+
+class Column(NamedTuple):
+    table: Optional[str]
+    name: str
+    text: str
+
+    @property
+    def full_name(self):
+        return f'{self.table}.{self.name}' if self.table else self.name
+
+
+class Literal(NamedTuple):
+    # the python value of the literal, None for NULL
+    value: Any
+    text: str
+
+
+class Star(NamedTuple):
+    text: str = '*'
+
+
+class WindowSpec(NamedTuple):
+    partition_by: Tuple
+    # the order-by items of form (expr, asc)
+    order_by: Tuple
+
+
+class Call(NamedTuple):
+    # the function name in lower case
+    name: str
+    args: Tuple
+    over: Optional[WindowSpec]
+    text: str
+
+
+class UnaryOp(NamedTuple):
+    # '-', '+' or 'not'
+    op: str
+    operand: Any
+    text: str
+
+
+class BinaryOp(NamedTuple):
+    # the arithmetic operators, the comparison operators ('<>' as '!=', '==' as '='), 'like', 'and', 'or'
+    op: str
+    left: Any
+    right: Any
+    text: str
+
+
+class InList(NamedTuple):
+    operand: Any
+    items: Tuple
+    negated: bool
+    text: str
+
+
+class IsNull(NamedTuple):
+    operand: Any
+    negated: bool
+    text: str
+
+
+class Between(NamedTuple):
+    operand: Any
+    low: Any
+    high: Any
+    negated: bool
+    text: str
+
+
+class Case(NamedTuple):
+    # the conditions of the WHEN branches in order, the simple CASE of an operand is parsed into the equalities
+    conditions: Tuple
+    # the results of the WHEN branches
+    results: Tuple
+    # the result of ELSE, the NULL literal if not given
+    default: Any
+    text: str
+
+
+class TableSample(NamedTuple):
+    size: Any
+    # PERCENT or ROWS
+    unit: str
+    seed: Optional[int]
+
+
+class TableRef(NamedTuple):
+    name: str
+    alias: str
+    sample: Optional[TableSample]
+
+
+class Join(NamedTuple):
+    # INNER, LEFT, RIGHT or OUTER
+    mode: str
+    table: TableRef
+    condition: Any
+
+
+class SelectItem(NamedTuple):
+    expr: Any
+    # the alias given in the query, None if not given
+    alias: Optional[str]
+
+
+class Select(NamedTuple):
+    items: Tuple
+    table: TableRef
+    joins: Tuple
+    where: Any
+    group_by: Optional[Tuple]
+    # the order-by items of form (expr, asc)
+    order_by: Tuple
+    # the limit of form (offset, count)
+    limit: Optional[Tuple]
+    # whether the duplicated rows of the result are removed
+    distinct: bool = False
+
+
+def children(node):
+    """
+    the direct sub-nodes of the expression node
+    :param node: the expression node
+    :return: the list of sub-nodes
+    """
+    if isinstance(node, Call):
+        nodes = list(node.args)
+        if node.over is not None:
+            nodes += list(node.over.partition_by) + [o[0] for o in node.over.order_by]
+        return nodes
+    if isinstance(node, (UnaryOp, IsNull)):
+        return [node.operand]
+    if isinstance(node, BinaryOp):
+        return [node.left, node.right]
+    if isinstance(node, InList):
+        return [node.operand, *node.items]
+    if isinstance(node, Between):
+        return [node.operand, node.low, node.high]
+    if isinstance(node, Case):
+        return [*node.conditions, *node.results, node.default]
+    return []
+
+
+def walk(node):
+    """
+    iterate the expression node and all its sub-nodes in pre-order
+    :param node: the expression node
+    :return: the iterator of nodes
+    """
+    yield node
+    for child in children(node):
+        yield from walk(child)
@@ -0,0 +1,48 @@
+import re
+
+from ..errors import DFSelectParseError
+
+# the token kinds
+NAME = 'NAME'
+QUOTED_NAME = 'QUOTED_NAME'
+NUMBER = 'NUMBER'
+STRING = 'STRING'
+OP = 'OP'
+PUNCT = 'PUNCT'
+EOF = 'EOF'
+
+# the blanks before a token are consumed with the token, the comments are matched as blank tokens. the dot followed
+# by a name is not of the number, e.g. of the table name '@mysql-dev.db-2.table'
+_TOKEN_PATTERN = re.compile(r'''\s*(?:
+    (?P<WS>--[^\n]*|/\*.*?\*/|$)
+    |(?P<NUMBER>(?:\d+\.(?!(?![eE][-+]?\d)[A-Za-z_])\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+    |(?P<NAME>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<STRING>'(?:[^']|'')*'|"(?:[^"]|"")*")
+    |(?P<QUOTED_NAME>`(?:[^`]|``)*`)
+    |(?P<OP><=|>=|<>|!=|==|\|\||[-+*/%<>=])
+    |(?P<PUNCT>[(),.;@])
+    |(?P<ERROR>.))
+''', re.VERBOSE | re.DOTALL)
+
+# the EOF tokens padded to the end of the token list, so that the parser can look ahead without bound check
+_EOF_PADDING = 4
+
+
+def tokenize(sql: str):
+    """
+    split the query into the tokens in a single pass, the blanks and comments are skipped
+    :param sql: the query text
+    :return: the token list, each token is of form (kind, value, upper_value, start, end), ended by the EOF tokens
+    """
+    tokens = []
+    append = tokens.append
+    for match in _TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'WS' or kind is None:
+            continue
+        value = match.group(kind)
+        if kind == 'ERROR':
+            raise DFSelectParseError(f"invalid character '{value}' at position {match.start(kind)}: {sql}")
+        append((kind, value, value.upper() if kind == NAME else value, match.start(kind), match.end()))
+    tokens.extend([(EOF, '', '', len(sql), len(sql))] * _EOF_PADDING)
+    return tokens
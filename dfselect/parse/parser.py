@@ -0,0 +1,472 @@
+from functools import lru_cache
+
+from .ast import Column, Literal, Star, WindowSpec, Call, UnaryOp, BinaryOp, InList, IsNull, Between, Case, \
+    TableSample, TableRef, Join, SelectItem, Select
+from .lexer import tokenize, NAME, QUOTED_NAME, NUMBER, STRING, OP, PUNCT, EOF
+from ..errors import DFSelectParseError
+
+# the keywords can not be used as the implicit alias or the bare column name
+_RESERVED_WORDS = frozenset((
+    'SELECT', 'FROM', 'WHERE', 'GROUP', 'ORDER', 'BY', 'LIMIT', 'OFFSET', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL',
+    'OUTER', 'CROSS', 'ON', 'AS', 'AND', 'OR', 'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'TABLESAMPLE', 'HAVING',
+    'UNION', 'DISTINCT', 'OVER', 'PARTITION', 'ASC', 'DESC', 'CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'TRUE', 'FALSE',
+))
+
+_COMPARISON_OPS = {'=': '=', '==': '=', '!=': '!=', '<>': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+
+@lru_cache(maxsize=256)
+def parse_select_ast(sql: str):
+    """
+    parse the single select statement into the syntax tree by recursive descent, the query is tokenized once, the
+    trees of the recent queries are cached since the nodes are immutable
+    :param sql: the select statement
+    :return: the parsed Select node
+    """
+    return _Parser(sql).parse_select()
+
+
+class _Parser(object):
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.tokens = tokenize(sql)
+        self.pos = 0
+
+    # the token helpers
+
+    def _peek(self, offset: int = 0):
+        return self.tokens[self.pos + offset]
+
+    def _next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _is_keyword(self, *words, offset: int = 0):
+        token = self.tokens[self.pos + offset]
+        return token[0] == NAME and token[2] in words
+
+    def _is_punct(self, punct: str, offset: int = 0):
+        token = self.tokens[self.pos + offset]
+        return token[0] == PUNCT and token[1] == punct
+
+    def _accept_keyword(self, *words):
+        token = self.tokens[self.pos]
+        if token[0] == NAME and token[2] in words:
+            self.pos += 1
+            return token[2]
+        return None
+
+    def _expect_keyword(self, word: str):
+        if not self._is_keyword(word):
+            self._error(f'{word} expected')
+        return self._next()
+
+    def _expect_punct(self, punct: str):
+        if not self._is_punct(punct):
+            self._error(f"'{punct}' expected")
+        return self._next()
+
+    def _is_adjacent(self, offset: int = 0):
+        # whether the token follows the previous token without blank
+        return self.tokens[self.pos + offset][3] == self.tokens[self.pos + offset - 1][4]
+
+    def _text(self, start: int):
+        # the query text from the start token to the last consumed token, blank squeezed
+        return ' '.join(self.sql[self.tokens[start][3]:self.tokens[self.pos - 1][4]].split())
+
+    def _error(self, message: str):
+        token = self._peek()
+        near = f"near '{token[1]}' at position {token[3]}" if token[0] != EOF else 'at the end'
+        raise DFSelectParseError(f'{message} {near}: {self.sql}')
+
+    # the statement
+
+    def parse_select(self):
+        self._expect_keyword('SELECT')
+        distinct = self._accept_keyword('DISTINCT', 'ALL') == 'DISTINCT'
+        items = self._parse_select_items()
+        self._expect_keyword('FROM')
+        table = self._parse_table_ref(allow_sample=True)
+        joins = []
+        while self._is_keyword('JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS'):
+            joins.append(self._parse_join())
+
+        where = None
+        if self._accept_keyword('WHERE'):
+            where = self._parse_expr()
+
+        group_by, order_by, limit = None, (), None
+        clauses = set()
+        while self._is_keyword('GROUP', 'ORDER', 'LIMIT', 'HAVING'):
+            clause = self._next()[2]
+            if clause in clauses:
+                self._error(f'duplicated {clause} clause')
+            clauses.add(clause)
+            if clause == 'HAVING':
+                self._error('having-clause is not supported')
+            elif clause == 'GROUP':
+                self._expect_keyword('BY')
+                group_by = tuple(self._parse_expr_list())
+            elif clause == 'ORDER':
+                self._expect_keyword('BY')
+                order_by = tuple(self._parse_order_items())
+            else:
+                limit = self._parse_limit()
+
+        while self._is_punct(';'):
+            self._next()
+        if self._peek()[0] != EOF:
+            if self._is_keyword('UNION'):
+                self._error('only single select query can be processed')
+            self._error('unexpected token')
+        return Select(tuple(items), table, tuple(joins), where, group_by, order_by, limit, distinct)
+
+    def _parse_select_items(self):
+        items = []
+        while True:
+            token = self._peek()
+            if token[0] == OP and token[1] == '*':
+                self._next()
+                items.append(SelectItem(Star(), None))
+            elif token[0] in (NAME, QUOTED_NAME) and self._is_punct('.', 1) and self._peek(2)[1] == '*':
+                # the 't.*' selects all the columns as '*'
+                self.pos += 3
+                items.append(SelectItem(Star(), None))
+            else:
+                expr = self._parse_expr()
+                items.append(SelectItem(expr, self._parse_alias()))
+            if not self._is_punct(','):
+                return items
+            self._next()
+
+    def _parse_alias(self):
+        if self._accept_keyword('AS'):
+            token = self._next()
+            if token[0] == NAME:
+                return token[1]
+            if token[0] == QUOTED_NAME:
+                return token[1][1:-1].replace('``', '`')
+            if token[0] == STRING:
+                return token[1][1:-1].replace(token[1][0] * 2, token[1][0])
+            self.pos -= 1
+            self._error('alias expected')
+        token = self._peek()
+        if token[0] == NAME and token[2] not in _RESERVED_WORDS:
+            return self._next()[1]
+        if token[0] == QUOTED_NAME:
+            return self._next()[1][1:-1].replace('``', '`')
+        return None
+
+    def _parse_name(self, what: str):
+        token = self._next()
+        if token[0] == NAME and token[2] not in _RESERVED_WORDS:
+            return token[1]
+        if token[0] == QUOTED_NAME:
+            return token[1][1:-1].replace('``', '`')
+        self.pos -= 1
+        if token[0] == PUNCT and token[1] == '(' and self._is_keyword('SELECT', offset=1):
+            self._error('sub-query is not supported')
+        self._error(f'{what} expected')
+
+    def _parse_table_ref(self, allow_sample: bool = False):
+        # the table of the external datasource is prefixed by '@', e.g. '@mysql-dev.hogwarts.institution', which is
+        # passed to the table loaders as it is
+        prefix = self._next()[1] if self._is_punct('@') else ''
+        names = [self._parse_table_name()]
+        while self._is_punct('.'):
+            self._next()
+            names.append(self._parse_table_name())
+        name = prefix + '.'.join(names)
+        alias = self._parse_alias() or names[-1]
+
+        sample = None
+        if self._is_keyword('TABLESAMPLE'):
+            if not allow_sample:
+                self._error('table sample is supported on the major table only')
+            sample = self._parse_table_sample()
+        return TableRef(name, alias, sample)
+
+    def _parse_table_name(self):
+        # the parts of the table name may be joined by dashes without blank, e.g. 'mysql-dev' or 'db-01a'
+        name = self._parse_name('table name')
+        while self._peek()[0] == OP and self._peek()[1] == '-' and self._is_adjacent() and \
+                self._peek(1)[0] in (NAME, NUMBER) and self._is_adjacent(1):
+            self._next()
+            name += '-' + self._next()[1]
+            while self._peek()[0] in (NAME, NUMBER) and self._is_adjacent():
+                name += self._next()[1]
+        return name
+
+    def _parse_table_sample(self):
+        self._expect_keyword('TABLESAMPLE')
+        self._expect_punct('(')
+        size_token = self._next()
+        unit = self._accept_keyword('PERCENT', 'ROWS')
+        if size_token[0] != NUMBER or unit is None:
+            self.pos -= 1
+            self._error("invalid table sample, use 'n PERCENT' or 'n ROWS'")
+        try:
+            size = float(size_token[1]) if unit == 'PERCENT' else int(size_token[1])
+        except ValueError:
+            self._error(f'invalid table sample size {size_token[1]}')
+        if size < 0 or (unit == 'PERCENT' and size > 100):
+            self._error(f'table sample size {size_token[1]} out of range')
+        self._expect_punct(')')
+
+        seed = None
+        if self._accept_keyword('REPEATABLE'):
+            self._expect_punct('(')
+            seed_token = self._next()
+            if seed_token[0] != NUMBER or not seed_token[1].isdigit():
+                self.pos -= 1
+                self._error('invalid repeatable seed of table sample')
+            seed = int(seed_token[1])
+            self._expect_punct(')')
+        return TableSample(size, unit, seed)
+
+    def _parse_join(self):
+        mode = 'INNER'
+        word = self._next()[2]
+        if word == 'CROSS':
+            self.pos -= 1
+            self._error('cross join is not supported')
+        if word in ('LEFT', 'RIGHT', 'FULL', 'OUTER', 'INNER'):
+            mode = {'LEFT': 'LEFT', 'RIGHT': 'RIGHT', 'INNER': 'INNER'}.get(word, 'OUTER')
+            if word != 'OUTER':
+                self._accept_keyword('OUTER')
+            self._expect_keyword('JOIN')
+        table = self._parse_table_ref()
+        self._expect_keyword('ON')
+        return Join(mode, table, self._parse_expr())
+
+    def _parse_limit(self):
+        start = self.pos
+        params = [self._parse_limit_param()]
+        if self._is_punct(','):
+            self._next()
+            params.append(self._parse_limit_param())
+        elif self._accept_keyword('OFFSET'):
+            params.insert(0, self._parse_limit_param())
+        else:
+            params.insert(0, 0)
+        if params[1] < 0:
+            raise DFSelectParseError(f'limit params use invalid limit size: {self._text(start)}')
+        if params[0] < 0:
+            raise DFSelectParseError(f'limit params use invalid limit offset: {self._text(start)}')
+        return tuple(params)
+
+    def _parse_limit_param(self):
+        negative = self._peek()[1] == '-' and self._peek()[0] == OP
+        if negative:
+            self._next()
+        token = self._next()
+        if token[0] != NUMBER or not token[1].isdigit():
+            self.pos -= 1
+            self._error('limit params contains invalid items')
+        return -int(token[1]) if negative else int(token[1])
+
+    def _parse_order_items(self):
+        items = []
+        while True:
+            expr = self._parse_expr()
+            direction = self._accept_keyword('ASC', 'DESC')
+            items.append((expr, direction != 'DESC'))
+            if not self._is_punct(','):
+                return items
+            self._next()
+
+    def _parse_expr_list(self):
+        exprs = [self._parse_expr()]
+        while self._is_punct(','):
+            self._next()
+            exprs.append(self._parse_expr())
+        return exprs
+
+    # the expression, in the order of operator precedence from low to high
+
+    def _parse_expr(self):
+        start = self.pos
+        node = self._parse_and()
+        while self._accept_keyword('OR'):
+            node = BinaryOp('or', node, self._parse_and(), self._text(start))
+        return node
+
+    def _parse_and(self):
+        start = self.pos
+        node = self._parse_not()
+        while self._accept_keyword('AND'):
+            node = BinaryOp('and', node, self._parse_not(), self._text(start))
+        return node
+
+    def _parse_not(self):
+        start = self.pos
+        if self._accept_keyword('NOT'):
+            return UnaryOp('not', self._parse_not(), self._text(start))
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        start = self.pos
+        node = self._parse_additive()
+        token = self._peek()
+        if token[0] == OP and token[1] in _COMPARISON_OPS:
+            self._next()
+            return BinaryOp(_COMPARISON_OPS[token[1]], node, self._parse_additive(), self._text(start))
+        if self._accept_keyword('IS'):
+            negated = self._accept_keyword('NOT') is not None
+            self._expect_keyword('NULL')
+            return IsNull(node, negated, self._text(start))
+
+        negated = self._is_keyword('NOT') and self._is_keyword('LIKE', 'IN', 'BETWEEN', offset=1)
+        if negated:
+            self._next()
+        if self._accept_keyword('LIKE'):
+            like = BinaryOp('like', node, self._parse_additive(), self._text(start))
+            return UnaryOp('not', like, self._text(start)) if negated else like
+        if self._accept_keyword('IN'):
+            self._expect_punct('(')
+            if self._is_keyword('SELECT'):
+                self._error('sub-query is not supported')
+            items = [self._parse_expr()]
+            while self._is_punct(','):
+                self._next()
+                if self._is_punct(')'):
+                    # the trailing comma of the items, e.g. 'c in (7,)'
+                    break
+                items.append(self._parse_expr())
+            self._expect_punct(')')
+            return InList(node, tuple(items), negated, self._text(start))
+        if self._accept_keyword('BETWEEN'):
+            low = self._parse_additive()
+            self._expect_keyword('AND')
+            high = self._parse_additive()
+            return Between(node, low, high, negated, self._text(start))
+        return node
+
+    def _parse_additive(self):
+        start = self.pos
+        node = self._parse_multiplicative()
+        while self._peek()[0] == OP and self._peek()[1] in ('+', '-', '||'):
+            op = self._next()[1]
+            node = BinaryOp(op, node, self._parse_multiplicative(), self._text(start))
+        return node
+
+    def _parse_multiplicative(self):
+        start = self.pos
+        node = self._parse_unary()
+        while self._peek()[0] == OP and self._peek()[1] in ('*', '/', '%'):
+            op = self._next()[1]
+            node = BinaryOp(op, node, self._parse_unary(), self._text(start))
+        return node
+
+    def _parse_unary(self):
+        start = self.pos
+        token = self._peek()
+        if token[0] == OP and token[1] in ('-', '+'):
+            self._next()
+            operand = self._parse_unary()
+            if isinstance(operand, Literal) and isinstance(operand.value, (int, float)) and \
+                    not isinstance(operand.value, bool):
+                # the signed number is a literal
+                return Literal(-operand.value if token[1] == '-' else operand.value, self._text(start))
+            return UnaryOp(token[1], operand, self._text(start))
+        return self._parse_primary()
+
+    def _parse_primary(self):
+        start = self.pos
+        token = self._next()
+        kind, value, upper = token[0], token[1], token[2]
+        if kind == NUMBER:
+            is_float = '.' in value or 'e' in value or 'E' in value
+            return Literal(float(value) if is_float else int(value), value)
+        if kind == STRING:
+            return Literal(value[1:-1].replace(value[0] * 2, value[0]), value)
+        if kind == PUNCT and value == '(':
+            if self._is_keyword('SELECT'):
+                self._error('sub-query is not supported')
+            node = self._parse_expr()
+            self._expect_punct(')')
+            # the parenthesized expression keeps the parentheses in its text
+            return node._replace(text=self._text(start))
+        if kind == QUOTED_NAME:
+            self.pos -= 1
+            return self._parse_column(start)
+        if kind == NAME:
+            if upper == 'NULL':
+                return Literal(None, value)
+            if upper in ('TRUE', 'FALSE'):
+                return Literal(upper == 'TRUE', value)
+            if upper == 'SELECT':
+                self.pos -= 1
+                self._error('sub-query is not supported')
+            if upper == 'CASE':
+                return self._parse_case(start)
+            if self._is_punct('('):
+                return self._parse_call(start, value)
+            if upper in _RESERVED_WORDS:
+                self.pos -= 1
+                self._error('unexpected keyword')
+            self.pos -= 1
+            return self._parse_column(start)
+        self.pos -= 1
+        self._error('expression expected')
+
+    def _parse_column(self, start: int):
+        names = [self._parse_name('column name')]
+        while self._is_punct('.') and self._peek(1)[0] in (NAME, QUOTED_NAME):
+            self._next()
+            names.append(self._parse_name('column name'))
+        if len(names) > 2:
+            self._error('invalid column identifier')
+        table = names[0] if len(names) == 2 else None
+        return Column(table, names[-1], self._text(start))
+
+    def _parse_case(self, start: int):
+        # CASE [operand] WHEN ... THEN ... [WHEN ... THEN ...] [ELSE ...] END, the CASE keyword is consumed
+        operand = None if self._is_keyword('WHEN') else self._parse_expr()
+        conditions, results = [], []
+        while self._accept_keyword('WHEN'):
+            when_start = self.pos
+            condition = self._parse_expr()
+            if operand is not None:
+                condition = BinaryOp('=', operand, condition, f'{operand.text} = {self._text(when_start)}')
+            conditions.append(condition)
+            self._expect_keyword('THEN')
+            results.append(self._parse_expr())
+        if not conditions:
+            self._error('WHEN expected')
+        default = self._parse_expr() if self._accept_keyword('ELSE') else Literal(None, 'NULL')
+        self._expect_keyword('END')
+        return Case(tuple(conditions), tuple(results), default, self._text(start))
+
+    def _parse_call(self, start: int, name: str):
+        self._expect_punct('(')
+        args = []
+        if self._peek()[0] == OP and self._peek()[1] == '*':
+            self._next()
+            args.append(Star())
+        elif self._is_keyword('DISTINCT'):
+            self._error('distinct in function call is not supported')
+        elif not self._is_punct(')'):
+            args = self._parse_expr_list()
+        self._expect_punct(')')
+
+        over = None
+        if self._accept_keyword('OVER'):
+            over = self._parse_window_spec()
+        return Call(name.lower(), tuple(args), over, self._text(start))
+
+    def _parse_window_spec(self):
+        self._expect_punct('(')
+        partition_by, order_by = (), ()
+        if self._accept_keyword('PARTITION'):
+            self._expect_keyword('BY')
+            partition_by = tuple(self._parse_expr_list())
+        if self._accept_keyword('ORDER'):
+            self._expect_keyword('BY')
+            order_by = tuple(self._parse_order_items())
+        if not self._is_punct(')'):
+            self._error('invalid token in window spec')
+        self._next()
+        return WindowSpec(partition_by, order_by)
@@ -0,0 +1,228 @@
+import operator
+
+from .ast import Literal, Call, UnaryOp, BinaryOp, InList, IsNull, Between, Case
+
+# the operators folded over the constant operands, the comparison of null is kept for the engine to decide
+_FOLD_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# the types of the literal values folded
+_CONST_TYPES = (bool, int, float, str)
+
+
+def simplify_expr(expr):
+    """
+    rewrite the expression before execution: fold the constant sub-expressions into literals, merge the equalities
+    of the same operand joined by OR into one in-list, and remove the always-true/always-false terms of AND/OR. the
+    folded node keeps the text of the original one
+    :param expr: the parsed expression
+    :return: the rewritten expression
+    """
+    if isinstance(expr, Call):
+        if expr.over is not None:
+            return expr
+        return expr._replace(args=tuple(simplify_expr(arg) for arg in expr.args))
+    if isinstance(expr, UnaryOp):
+        return _fold_unary(expr._replace(operand=simplify_expr(expr.operand)))
+    if isinstance(expr, BinaryOp):
+        expr = expr._replace(left=simplify_expr(expr.left), right=simplify_expr(expr.right))
+        if expr.op == 'and':
+            return _simplify_and(expr)
+        if expr.op == 'or':
+            return _merge_in_lists(_simplify_or(expr))
+        return _fold_binary(expr)
+    if isinstance(expr, InList):
+        return _fold_in_list(expr._replace(operand=simplify_expr(expr.operand),
+                                           items=tuple(simplify_expr(item) for item in expr.items)))
+    if isinstance(expr, IsNull):
+        expr = expr._replace(operand=simplify_expr(expr.operand))
+        if isinstance(expr.operand, Literal):
+            return Literal((expr.operand.value is None) != expr.negated, expr.text)
+        return expr
+    if isinstance(expr, Between):
+        expr = expr._replace(operand=simplify_expr(expr.operand), low=simplify_expr(expr.low),
+                             high=simplify_expr(expr.high))
+        if _is_const(expr.operand, expr.low, expr.high):
+            between = _try_fold(lambda v, lo, hi: lo <= v <= hi, expr.operand, expr.low, expr.high)
+            if between is not None:
+                return Literal(between != expr.negated, expr.text)
+        return expr
+    if isinstance(expr, Case):
+        return _fold_case(expr._replace(conditions=tuple(simplify_expr(c) for c in expr.conditions),
+                                        results=tuple(simplify_expr(r) for r in expr.results),
+                                        default=simplify_expr(expr.default)))
+    return expr
+
+
+def is_true(expr):
+    return isinstance(expr, Literal) and expr.value is True
+
+
+def is_false(expr):
+    return isinstance(expr, Literal) and expr.value is False
+
+
+def _is_const(*exprs):
+    return all(isinstance(e, Literal) and isinstance(e.value, _CONST_TYPES) for e in exprs)
+
+
+def _try_fold(func, *literals):
+    """
+    compute the value of the constant operation, None if it fails (e.g. division by zero), the operation is then
+    computed by the engine
+    """
+    try:
+        value = func(*[literal.value for literal in literals])
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    return value if isinstance(value, _CONST_TYPES) else None
+
+
+def _fold_unary(expr: UnaryOp):
+    if not _is_const(expr.operand):
+        return expr
+    value = expr.operand.value
+    if expr.op == 'not':
+        return Literal(not value, expr.text) if isinstance(value, bool) else expr
+    if isinstance(value, str):
+        return expr
+    return Literal(-value if expr.op == '-' else value, expr.text)
+
+
+def _fold_binary(expr: BinaryOp):
+    if not _is_const(expr.left, expr.right):
+        return expr
+    if expr.op == '||':
+        return Literal(str(expr.left.value) + str(expr.right.value), expr.text)
+    if expr.op not in _FOLD_OPS:
+        return expr
+    value = _try_fold(_FOLD_OPS[expr.op], expr.left, expr.right)
+    return expr if value is None else Literal(value, expr.text)
+
+
+def _fold_in_list(expr: InList):
+    if not _is_const(expr.operand, *expr.items):
+        return expr
+    matched = any(_try_fold(operator.eq, expr.operand, item) for item in expr.items)
+    return Literal(matched != expr.negated, expr.text)
+
+
+def _fold_case(expr: Case):
+    # the always-false (or null) branches are removed, the always-true branch is the default of the branches before it
+    conditions, results = [], []
+    for condition, result in zip(expr.conditions, expr.results):
+        if is_true(condition):
+            expr = expr._replace(default=result)
+            break
+        if not is_false(condition) and not (isinstance(condition, Literal) and condition.value is None):
+            conditions.append(condition)
+            results.append(result)
+    if not conditions:
+        return expr.default
+    return expr._replace(conditions=tuple(conditions), results=tuple(results))
+
+
+def _simplify_and(expr: BinaryOp):
+    # x and true = x, x and false = false (even for the null x)
+    if is_false(expr.left) or is_false(expr.right):
+        return Literal(False, expr.text)
+    if is_true(expr.left):
+        return expr.right
+    if is_true(expr.right):
+        return expr.left
+    return expr
+
+
+def _simplify_or(expr: BinaryOp):
+    # x or false = x, x or true = true (even for the null x)
+    if is_true(expr.left) or is_true(expr.right):
+        return Literal(True, expr.text)
+    if is_false(expr.left):
+        return expr.right
+    if is_false(expr.right):
+        return expr.left
+    return expr
+
+
+def _or_terms(expr):
+    if isinstance(expr, BinaryOp) and expr.op == 'or':
+        return _or_terms(expr.left) + _or_terms(expr.right)
+    return [expr]
+
+
+def _node_key(node):
+    # the structural key of the expression regardless of its text
+    if isinstance(node, Literal):
+        return 'literal', type(node.value).__name__, node.value
+    if isinstance(node, tuple) and hasattr(node, '_fields'):
+        return (type(node).__name__,) + tuple(_node_key(getattr(node, f)) for f in node._fields if f != 'text')
+    if isinstance(node, (tuple, list)):
+        return tuple(_node_key(n) for n in node)
+    return node
+
+
+def _equality_items(term):
+    """
+    the operand and the constant items of the equality term (operand = constant, or operand in (constants)), None
+    for other terms
+    """
+    if isinstance(term, BinaryOp) and term.op == '=':
+        for operand, item in ((term.left, term.right), (term.right, term.left)):
+            if _is_const(item) and not isinstance(operand, Literal):
+                return operand, [item]
+    if isinstance(term, InList) and not term.negated and _is_const(*term.items) and \
+            not isinstance(term.operand, Literal):
+        return term.operand, list(term.items)
+    return None
+
+
+def _merge_in_lists(expr):
+    """
+    merge the equalities of the same operand in the OR chain into one in-list at the place of the first of them
+    """
+    terms = _or_terms(expr)
+    if len(terms) < 2:
+        return expr
+    groups = dict()
+    for term in terms:
+        equality = _equality_items(term)
+        if equality is not None:
+            groups.setdefault(_node_key(equality[0]), []).append((term, equality))
+    if all(len(group) < 2 for group in groups.values()):
+        return expr
+
+    merged_terms = []
+    for term in terms:
+        equality = _equality_items(term)
+        group = groups.get(_node_key(equality[0])) if equality is not None else None
+        if group is None or len(group) < 2:
+            merged_terms.append(term)
+            continue
+        if group[0][0] is not term:
+            # merged into the in-list of the first term
+            continue
+        operand = equality[0]
+        items, seen = [], set()
+        for _, (_, group_items) in group:
+            for item in group_items:
+                if _node_key(item) not in seen:
+                    seen.add(_node_key(item))
+                    items.append(item)
+        text = '{} in ({})'.format(operand.text, ', '.join(item.text for item in items))
+        merged_terms.append(InList(operand, tuple(items), False, text))
+
+    merged = merged_terms[0]
+    for term in merged_terms[1:]:
+        merged = BinaryOp('or', merged, term, f'{merged.text} or {term.text}')
+    return merged._replace(text=expr.text)
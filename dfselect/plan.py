@@ -0,0 +1,310 @@
+from typing import NamedTuple, Any
+
+from .errors import DFSelectExecError
+from .parse import AGG_FUNC_NAMES
+from .parse.ast import Column, Literal, Star, Call, UnaryOp, BinaryOp, InList, IsNull, Between, Case, children, \
+    walk
+
+
+class BoundColumn(NamedTuple):
+    # the column name in the table, and its position in the columns of the table
+    name: str
+    position: int
+    # the dtype of the loaded column, None for the column computed by the operators
+    dtype: Any
+    text: str
+
+
+# the prefix of the hidden columns of the common expressions
+_COMMON_EXPR_PREFIX = '__common_'
+
+
+def bind_operators(operators, schema, share_exprs: bool = False):
+    """
+    bind the column references in the expressions of the operators to the columns of the table, once the schema of
+    the loaded (and joined) table is known, so that the executors get the columns by position without resolving
+    the names again. the columns computed by the operators (e.g. window columns, group-by expressions) are bound
+    as they are extended to the table
+    :param operators: the operators after LOAD/JOIN
+    :param schema: the columns of the loaded table of form (column_name, dtype)
+    :param share_exprs: whether to compute the common expressions of the operators once into the hidden columns by
+    the EXTEND operator, see `share_common_exprs`
+    :return: the bound operator list
+    """
+    if share_exprs:
+        operators = share_common_exprs(operators, schema)
+    binder = _Binder(schema)
+    bound_operators = []
+    for op_code, op_args in operators:
+        if op_code == 'EXTEND':
+            op_args = [(binder.bind(expr), name) for expr, name in op_args]
+            for _, name in op_args:
+                binder.extend(name)
+        elif op_code == 'FILTER':
+            op_args = [binder.bind(op_args[0])]
+        elif op_code == 'WINDOW':
+            op_args = [binder.bind_window(window_column) for window_column in op_args]
+            for window_column in op_args:
+                binder.extend(window_column[-1])
+        elif op_code == 'ORDER':
+            op_args = [(binder.bind(expr), asc) for expr, asc in op_args]
+        elif op_code == 'GROUP':
+            group_items = [(binder.bind(expr), alias) for expr, alias in op_args[0]]
+            binder.group(group_items)
+            op_args = [group_items, [binder.bind_projected(column) for column in op_args[1]]]
+        elif op_code == 'PROJECT':
+            op_args = [binder.bind_projected(column) for column in op_args]
+        bound_operators.append((op_code, op_args))
+    return bound_operators
+
+
+def share_common_exprs(operators, schema):
+    """
+    find the expressions computed more than once by the order-by, group-by, window and select clauses, compute each
+    of them once into a hidden column by the EXTEND operator placed before the first operator using it, and refer
+    to the hidden column in every clause instead. the query without projection is kept as it is, since its result
+    would include the hidden columns
+    :param operators: the (unbound) operators after LOAD/JOIN
+    :param schema: the columns of the loaded table of form (column_name, dtype)
+    :return: the operator list with the EXTEND operators
+    """
+    op_codes = [op[0] for op in operators]
+    if 'PROJECT' not in op_codes:
+        return operators
+    extended = [w[-1] for op_code, op_args in operators if op_code == 'WINDOW' for w in op_args]
+    probe = _Binder(schema)
+    if any(name in probe.positions for name in extended):
+        # the window column replaces the loaded column of the same name, the column refers to different values
+        # before and after the window operator
+        return operators
+
+    def _key(node):
+        return expr_key(probe.bind(node, strict=False))
+
+    # the operator of the aggregated columns is the group operator, the select clause is the same as its columns
+    group_idx = op_codes.index('GROUP') if 'GROUP' in op_codes else None
+    counts, first_uses = dict(), dict()
+    for idx, (op_code, op_args) in enumerate(operators):
+        use_idx = group_idx if op_code == 'PROJECT' and group_idx is not None else idx
+        for expr in _row_exprs(op_code, op_args, group_idx is not None):
+            for node in walk(expr):
+                if _is_shareable(node):
+                    key = _key(node)
+                    counts[key] = counts.get(key, 0) + 1
+                    first_uses.setdefault(key, use_idx)
+    names = {key: f'{_COMMON_EXPR_PREFIX}{idx}'
+             for idx, key in enumerate(key for key, count in counts.items() if count > 1)}
+    if not names:
+        return operators
+
+    used = dict()
+
+    def _share(node):
+        if _is_shareable(node):
+            key = _key(node)
+            if key in names:
+                used.setdefault(key, node)
+                return Column(None, names[key], node.text)
+        return _map_children(node, _share)
+
+    def _share_agg_args(node):
+        if _is_agg_call(node):
+            return node._replace(args=tuple(_share(arg) for arg in node.args))
+        return _map_children(node, _share_agg_args)
+
+    # the projected group-by expression is shared as the group-by expression, to refer to its group column
+    group_keys = {_key(expr) for expr, _ in operators[group_idx][1][0]} if group_idx is not None else set()
+
+    def _share_projected(node):
+        if group_idx is None:
+            return _share(node)
+        return _map_children(node, _share) if _key(node) in group_keys else _share_agg_args(node)
+
+    shared_operators = []
+    for op_code, op_args in operators:
+        if op_code == 'WINDOW':
+            op_args = [(func_name, [_share(arg) if idx == 0 and arg != '*' else arg for idx, arg in enumerate(args)],
+                        [_share(expr) for expr in partition_by], [(_share(expr), asc) for expr, asc in order_by],
+                        column_alias)
+                       for func_name, args, partition_by, order_by, column_alias in op_args]
+        elif op_code == 'ORDER':
+            op_args = [(_share(expr), asc) for expr, asc in op_args]
+        elif op_code == 'GROUP':
+            op_args = [[(_map_children(expr, _share), alias) for expr, alias in op_args[0]],
+                       [(_share_projected(expr), alias) for expr, alias in op_args[1]]]
+        elif op_code == 'PROJECT':
+            op_args = [(_share_projected(expr), alias) for expr, alias in op_args]
+        shared_operators.append((op_code, op_args))
+
+    # the hidden columns are extended before the first operators using them
+    extensions = dict()
+    for key, node in used.items():
+        extensions.setdefault(first_uses[key], []).append((node, names[key]))
+    for idx in sorted(extensions, reverse=True):
+        shared_operators.insert(idx, ('EXTEND', extensions[idx]))
+    return shared_operators
+
+
+def split_conjuncts(expr):
+    """
+    split the boolean expression into its conjuncts joined by AND
+    :param expr: the boolean expression
+    :return: the conjunct list
+    """
+    if isinstance(expr, BinaryOp) and expr.op == 'and':
+        return split_conjuncts(expr.left) + split_conjuncts(expr.right)
+    return [expr]
+
+
+def join_conjuncts(conjuncts):
+    """
+    join the conjuncts by AND, the reverse of `split_conjuncts`
+    """
+    expr = conjuncts[0]
+    for conjunct in conjuncts[1:]:
+        expr = BinaryOp('and', expr, conjunct, f'{expr.text} and {conjunct.text}')
+    return expr
+
+
+def expr_key(expr):
+    """
+    the structural key of the expression, the expressions of equal keys compute the same values whatever their
+    texts in the query are
+    :param expr: the (bound) expression
+    :return: the hashable key
+    """
+    if isinstance(expr, BoundColumn):
+        return 'column', expr.position
+    if isinstance(expr, Literal):
+        # the type is kept in the key, since 1 == 1.0 == True
+        return 'literal', type(expr.value).__name__, expr.value
+    if isinstance(expr, tuple) and hasattr(expr, '_fields'):
+        return (type(expr).__name__,) + tuple(expr_key(getattr(expr, f)) for f in expr._fields if f != 'text')
+    if isinstance(expr, (tuple, list)):
+        return tuple(expr_key(e) for e in expr)
+    return expr
+
+
+class _Binder(object):
+
+    def __init__(self, schema):
+        self.columns = [name for name, _ in schema]
+        self.dtypes = [dtype for _, dtype in schema]
+        self.positions = dict()
+        for position, name in enumerate(self.columns):
+            self.positions.setdefault(name, position)
+        # the group columns of the group-by expressions, by the expression key
+        self.group_columns = dict()
+
+    def extend(self, name: str):
+        # the computed column replaces the column of the same name, or is appended to the table
+        if name in self.positions:
+            self.dtypes[self.positions[name]] = None
+            return
+        self.positions[name] = len(self.columns)
+        self.columns.append(name)
+        self.dtypes.append(None)
+
+    def group(self, group_items):
+        for expr, alias in group_items:
+            if not isinstance(expr, BoundColumn):
+                self.extend(alias)
+                expr_column = BoundColumn(alias, self.positions[alias], None, expr.text)
+                self.group_columns[expr_key(expr)] = expr_column
+
+    def resolve(self, column: Column, strict: bool = True):
+        position = self.positions.get(column.full_name)
+        if position is None and column.table:
+            # the column of the major table is referred with the table prefix
+            position = self.positions.get(column.name)
+        if position is None:
+            if not strict:
+                return column
+            raise DFSelectExecError('invalid column {}'.format(column.full_name))
+        return BoundColumn(self.columns[position], position, self.dtypes[position], column.text)
+
+    def bind(self, expr, strict: bool = True):
+        """
+        bind the column references of the expression
+        :param expr: the expression
+        :param strict: whether the column not found is an error, or kept unbound
+        :return: the bound expression
+        """
+        if isinstance(expr, Column):
+            return self.resolve(expr, strict)
+        return _map_children(expr, lambda child: self.bind(child, strict))
+
+    def bind_projected(self, column):
+        # the projected group-by expression refers to its group column
+        expr = self.bind(column[0])
+        return self.group_columns.get(expr_key(expr), expr), column[1]
+
+    def bind_window(self, window_column):
+        func_name, func_args, partition_by, order_by, column_alias = window_column
+        # the first argument is the column expression, the others are literal params
+        func_args = [self.bind(arg) if idx == 0 and arg != '*' else arg for idx, arg in enumerate(func_args)]
+        return (func_name, func_args, [self.bind(expr) for expr in partition_by],
+                [(self.bind(expr), asc) for expr, asc in order_by], column_alias)
+
+
+def _map_children(expr, func):
+    """
+    rebuild the expression by the sub-expressions mapped by the function
+    """
+    if isinstance(expr, Call):
+        return expr._replace(args=tuple(func(arg) for arg in expr.args))
+    if isinstance(expr, (UnaryOp, IsNull)):
+        return expr._replace(operand=func(expr.operand))
+    if isinstance(expr, BinaryOp):
+        return expr._replace(left=func(expr.left), right=func(expr.right))
+    if isinstance(expr, InList):
+        return expr._replace(operand=func(expr.operand), items=tuple(func(item) for item in expr.items))
+    if isinstance(expr, Between):
+        return expr._replace(operand=func(expr.operand), low=func(expr.low), high=func(expr.high))
+    if isinstance(expr, Case):
+        return expr._replace(conditions=tuple(func(c) for c in expr.conditions),
+                             results=tuple(func(r) for r in expr.results), default=func(expr.default))
+    return expr
+
+
+def _is_agg_call(expr):
+    return isinstance(expr, Call) and expr.over is None and expr.name in AGG_FUNC_NAMES
+
+
+def _is_shareable(expr):
+    """
+    check whether the expression computes a column of the table by row, the column reference and the constant are
+    never shared
+    """
+    if isinstance(expr, (Column, BoundColumn, Literal, Star)):
+        return False
+    nodes = list(walk(expr))
+    return not any(_is_agg_call(node) for node in nodes) and any(isinstance(n, (Column, BoundColumn)) for n in nodes)
+
+
+def _row_exprs(op_code: str, op_args, grouped: bool):
+    """
+    the expressions of the operator computed by row, for the aggregated columns the arguments of the aggregate
+    function calls only
+    """
+    if op_code == 'WINDOW':
+        for _, func_args, partition_by, order_by, _ in op_args:
+            if func_args and func_args[0] != '*':
+                yield func_args[0]
+            yield from partition_by
+            yield from (expr for expr, _ in order_by)
+    elif op_code == 'ORDER':
+        yield from (expr for expr, _ in op_args)
+    elif op_code == 'GROUP':
+        # the group-by expression is computed by the group operator, its sub-expressions may be shared, the
+        # aggregated columns are counted by the project operator
+        for expr, _ in op_args[0]:
+            yield from children(expr)
+    elif op_code == 'PROJECT':
+        for expr, _ in op_args:
+            if not grouped:
+                yield expr
+                continue
+            for node in walk(expr):
+                if _is_agg_call(node):
+                    yield from (arg for arg in node.args if not isinstance(arg, Star))
@@ -0,0 +1,210 @@
+"""
+the long-lived query server, which holds a shared context of the registered tables, the loader cache and the result
+cache, so that the tables are loaded once instead of once per process
+
+    POST /query     the query as the body of text, or the json object {"query": ..., "format": "json" | "arrow"}
+    GET  /tables    the registered tables
+    GET  /health    the server status
+
+the result is returned as json of form {"columns": [...], "data": [[...], ...]}, or as arrow ipc stream if the format
+is "arrow" (or accepted by the header `Accept: application/vnd.apache.arrow.stream`), which requires pyarrow
+"""
+import importlib.util
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlsplit, parse_qs
+
+from .context import ctx_init, ctx_tables, ctx_config_get_exec_engine
+from .errors import DFSelectParseError, DFSelectExecError, DFSelectContextError
+from .log import log
+
+# the default count of the queries run at the same time
+DEFAULT_SERVER_WORKERS = 4
+# the default count of the queries waiting for a worker, the query is rejected once the queue is full
+DEFAULT_SERVER_MAX_PENDING = 16
+
+_JSON_CONTENT_TYPE = 'application/json'
+_ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+_RESULT_FORMATS = ('json', 'arrow')
+
+
+def make_server(ctx: dict = None, host: str = '127.0.0.1', port: int = 8765, socket_path: str = None,
+                workers: int = DEFAULT_SERVER_WORKERS, max_pending: int = DEFAULT_SERVER_MAX_PENDING):
+    """
+    create the query server over the shared context, call `serve_forever()` of it to serve the queries
+    :param ctx: the shared context object, with the tables registered
+    :param host: the host to listen on
+    :param port: the port to listen on, 0 to pick a free port
+    :param socket_path: the path of the unix socket to listen on instead of the tcp port
+    :param workers: the count of the queries run at the same time
+    :param max_pending: the count of the queries waiting for a worker
+    :return: the server object
+    """
+    if workers <= 0 or max_pending < 0:
+        raise DFSelectContextError(f'invalid server workers {workers} or max pending {max_pending}')
+    if socket_path:
+        if os.path.exists(socket_path):
+            # the socket left by the last server
+            os.unlink(socket_path)
+        server = _UnixQueryServer(socket_path, _QueryHandler)
+    else:
+        server = _QueryServer((host, port), _QueryHandler)
+    server.ctx = ctx_init(ctx)
+    server.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dfselect-query')
+    server.slots = threading.BoundedSemaphore(workers + max_pending)
+    return server
+
+
+def serve(ctx: dict = None, host: str = '127.0.0.1', port: int = 8765, socket_path: str = None,
+          workers: int = DEFAULT_SERVER_WORKERS, max_pending: int = DEFAULT_SERVER_MAX_PENDING):
+    """
+    serve the queries over the shared context until interrupted, see `make_server`
+    """
+    server = make_server(ctx, host, port, socket_path, workers, max_pending)
+    log.info('df-select serving on {}'.format(socket_path or '{}:{}'.format(*server.server_address[:2])))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown_pool()
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def run_query(ctx: dict, query: str, result_format: str = 'json'):
+    """
+    run the query over the context and encode the result
+    :param ctx: the context object
+    :param query: the select query
+    :param result_format: json or arrow
+    :return: the content type and the encoded result
+    """
+    from . import df_select
+    result = df_select(query, ctx=ctx)
+    if result_format == 'arrow':
+        return _ARROW_CONTENT_TYPE, _encode_arrow(result)
+    return _JSON_CONTENT_TYPE, _encode_json(result)
+
+
+def _encode_json(result):
+    if hasattr(result, 'to_json'):
+        return result.to_json(orient='split', index=False, date_format='iso').encode('utf-8')
+    return json.dumps(result, default=str).encode('utf-8')
+
+
+def _encode_arrow(result):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise DFSelectExecError('pyarrow is required to return the result as arrow ipc stream')
+    table = pa.Table.from_pandas(result, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class _QueryServerMixin(ThreadingMixIn):
+    daemon_threads = True
+
+    def shutdown_pool(self):
+        self.pool.shutdown(wait=True)
+
+
+class _QueryServer(_QueryServerMixin, HTTPServer):
+    pass
+
+
+class _UnixQueryServer(_QueryServerMixin, UnixStreamServer):
+    address_family = socket.AF_UNIX
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    server_version = 'df-select'
+
+    def address_string(self):
+        # the client of the unix socket has no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        log.debug('%s - %s', self.address_string(), format % args)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/health':
+            return self._reply_json(200, dict(status='ok'))
+        if path == '/tables':
+            return self._reply_json(200, dict(tables=self._tables()))
+        return self._reply_json(404, dict(error=f'path {path} not found'))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/query':
+            return self._reply_json(404, dict(error=f'path {url.path} not found'))
+        try:
+            query, result_format = self._read_query(parse_qs(url.query))
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._reply_json(400, dict(error=str(e)))
+
+        if result_format == 'arrow' and importlib.util.find_spec('pyarrow') is None:
+            return self._reply_json(406, dict(error='pyarrow is required to return the result as arrow ipc stream'))
+        # the query is rejected at once if all the workers are busy and the queue is full
+        if not self.server.slots.acquire(blocking=False):
+            return self._reply_json(503, dict(error='server busy, retry later'))
+        try:
+            content_type, body = self.server.pool.submit(run_query, self.server.ctx, query, result_format).result()
+        except (DFSelectParseError, DFSelectExecError, DFSelectContextError) as e:
+            return self._reply_json(400, dict(error=str(e)))
+        except Exception as e:
+            log.exception(f'failed to run query: {query}')
+            return self._reply_json(500, dict(error='{}: {}'.format(type(e).__name__, e)))
+        finally:
+            self.server.slots.release()
+        self._reply(200, content_type, body)
+
+    def _read_query(self, params: dict):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        result_format = params.get('format', [None])[0]
+        if (self.headers.get('Content-Type') or '').startswith(_JSON_CONTENT_TYPE):
+            request = json.loads(body or '{}')
+            if not isinstance(request, dict):
+                raise ValueError('the request should be a json object')
+            query, result_format = request.get('query'), request.get('format', result_format)
+        else:
+            query = body
+        if result_format is None:
+            result_format = 'arrow' if _ARROW_CONTENT_TYPE in (self.headers.get('Accept') or '') else 'json'
+        if not query or not query.strip():
+            raise ValueError('the query is empty')
+        if result_format not in _RESULT_FORMATS:
+            raise ValueError(f'unknown result format {result_format}, should be one of {_RESULT_FORMATS}')
+        return query, result_format
+
+    def _tables(self):
+        ctx = self.server.ctx
+        engine = ctx_config_get_exec_engine(ctx)
+        tables = []
+        for name, df in ctx_tables(ctx).items():
+            table = dict(name=name)
+            if hasattr(engine, 'table_schema'):
+                table['columns'] = [dict(name=str(column), type=str(dtype)) for column, dtype in engine.table_schema(df)]
+            tables.append(table)
+        return tables
+
+    def _reply_json(self, status: int, obj):
+        self._reply(status, _JSON_CONTENT_TYPE, json.dumps(obj).encode('utf-8'))
+
+    def _reply(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,153 @@
+"""
+the sinks which receive the query result batch by batch as it is produced, e.g. to write the result of a chunked
+table into a file without collecting it in memory
+
+    df_select('select * from events where level = "error"', ctx, sink=CsvSink('errors.csv'))
+
+the sink is opened by the first batch and closed once all the batches are written, at least one (maybe empty) batch
+is written, so that the empty result still has its header or schema written
+"""
+from .errors import DFSelectExecError
+
+# the default max rows of the batches written into the sink, the result in memory is sliced into batches of the rows
+DEFAULT_SINK_BATCH_ROWS = 65536
+
+
+class ResultSink(object):
+    """
+    the base of the result sinks, the subclass writes the batches in `write` and flushes in `close`
+    """
+    batch_rows = DEFAULT_SINK_BATCH_ROWS
+
+    def write(self, batch):
+        """
+        write a batch of the result
+        :param batch: the DataFrame batch, the batches are of the same columns
+        :return: None
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        close the sink once all the batches are written, or the query failed
+        :return: None
+        """
+        pass
+
+
+class CsvSink(ResultSink):
+    """
+    write the result into a csv file, or into a writable text stream (e.g. `socket.makefile('w')`), which is flushed
+    but never closed by the sink
+    """
+
+    def __init__(self, path_or_buf, batch_rows: int = DEFAULT_SINK_BATCH_ROWS, **to_csv_kwargs):
+        """
+        :param path_or_buf: the file path or the text stream
+        :param batch_rows: the max rows of the batches
+        :param to_csv_kwargs: the arguments of `DataFrame.to_csv`, the index is not written by default
+        """
+        self.path_or_buf = path_or_buf
+        self.batch_rows = batch_rows
+        self.to_csv_kwargs = {'index': False, **to_csv_kwargs}
+        self._file = None
+
+    def write(self, batch):
+        header = self.to_csv_kwargs.get('header', True)
+        if self._file is None:
+            self._file = open(self.path_or_buf, 'w', newline='') if isinstance(self.path_or_buf, str) \
+                else self.path_or_buf
+        else:
+            header = False
+        batch.to_csv(self._file, **{**self.to_csv_kwargs, 'header': header})
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._file is not self.path_or_buf:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+
+class ParquetSink(ResultSink):
+    """
+    write the result into a parquet file of a row group for each batch, which requires pyarrow. the schema is taken
+    from the first batch, the next batches are converted to it
+    """
+
+    def __init__(self, path: str, batch_rows: int = DEFAULT_SINK_BATCH_ROWS, **writer_kwargs):
+        """
+        :param path: the file path
+        :param batch_rows: the max rows of the batches, i.e. of the row groups
+        :param writer_kwargs: the arguments of `pyarrow.parquet.ParquetWriter`, e.g. compression
+        """
+        self.path = path
+        self.batch_rows = batch_rows
+        self.writer_kwargs = writer_kwargs
+        self._writer = None
+
+    def write(self, batch):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise DFSelectExecError('pyarrow is required to write the result into parquet')
+        if self._writer is None:
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            self._writer = pq.ParquetWriter(self.path, table.schema, **self.writer_kwargs)
+        else:
+            table = pa.Table.from_pandas(batch, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class CallbackSink(ResultSink):
+    """
+    pass each batch of the result to the callback, e.g. to send it over a connection
+    """
+
+    def __init__(self, callback, batch_rows: int = DEFAULT_SINK_BATCH_ROWS):
+        """
+        :param callback: the function called with each DataFrame batch
+        :param batch_rows: the max rows of the batches
+        """
+        self.callback = callback
+        self.batch_rows = batch_rows
+
+    def write(self, batch):
+        self.callback(batch)
+
+
+def frame_batches(df, batch_rows: int):
+    """
+    slice the result in memory into the batches of the max rows without copy
+    :param df: the DataFrame result
+    :param batch_rows: the max rows of the batches
+    :return: the iterator of the batches, at least one (maybe empty) batch is produced
+    """
+    yield df.iloc[:batch_rows]
+    for start in range(batch_rows, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows]
+
+
+def write_sink(batches, sink):
+    """
+    write the batches of the result into the sink, the sink is closed even if the query fails
+    :param batches: the iterator of the result batches
+    :param sink: the result sink
+    :return: the count of the rows written
+    """
+    rows = 0
+    try:
+        for batch in batches:
+            sink.write(batch)
+            rows += len(batch)
+    finally:
+        sink.close()
+    return rows
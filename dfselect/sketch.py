@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+# the default size parameter of the quantile sketch, the rank error is about 1.7 / k
+DEFAULT_QUANTILE_SKETCH_K = 200
+# the default precision of the distinct count sketch, 2^p registers, the relative error is about 1.04 / sqrt(2^p)
+DEFAULT_DISTINCT_SKETCH_P = 12
+
+
+class QuantileSketch(object):
+    """
+    the mergeable quantile sketch of KLL (Karnin, Lang and Liberty)
+
+    the items are kept in compactors of levels, an item at level h stands for 2^h items of the stream, a compactor
+    over its capacity sorts its items and promotes every other item to the next level. the quantiles are exact
+    until the first compaction
+    """
+
+    def __init__(self, k: int = DEFAULT_QUANTILE_SKETCH_K, seed: int = None):
+        self.k = k
+        self.n = 0
+        self.compactors = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_values(cls, values, k: int = DEFAULT_QUANTILE_SKETCH_K):
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    def update(self, values):
+        """
+        add the values into the sketch, the null values are skipped
+        :param values: the array-like values
+        :return: the sketch itself
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.compactors[0] = np.concatenate([self.compactors[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        merge the other sketch into this sketch
+        :param other: the other sketch
+        :return: the sketch itself
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float = 0.5):
+        """
+        estimate the quantile of the values
+        :param q: the quantile in [0, 1]
+        :return: the estimated quantile, nan if the sketch is empty
+        """
+        if not self.n:
+            return np.nan
+        if len(self.compactors) == 1:
+            return float(np.quantile(self.compactors[0], q))
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(c), 2 ** h, dtype=np.int64) for h, c in enumerate(self.compactors)])
+        order = np.argsort(items, kind='mergesort')
+        cum_weights = np.cumsum(weights[order])
+        idx = np.searchsorted(cum_weights, q * cum_weights[-1], side='left')
+        return float(items[order][min(idx, len(items) - 1)])
+
+    def _capacity(self, level: int):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        while sum(len(c) for c in self.compactors) > sum(self._capacity(h) for h in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # keep the odd item at the level, promote every other item of the rest
+                kept, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                promoted = items[self._rng.integers(0, 2)::2]
+                self.compactors[level] = kept
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+                break
+
+    def __getstate__(self):
+        return dict(k=self.k, n=self.n, compactors=self.compactors)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rng = np.random.default_rng()
+
+
+class DistinctSketch(object):
+    """
+    the mergeable distinct count sketch of HyperLogLog
+
+    the 64-bit hash of each value selects a register by its first p bits, the register keeps the max position of
+    the first 1-bit in the rest bits. the distinct count is estimated by the harmonic mean of the registers, and by
+    linear counting of the empty registers for the small counts
+    """
+
+    def __init__(self, p: int = DEFAULT_DISTINCT_SKETCH_P):
+        # the rest bits of the hash must be exact in float64 to get the position of the first 1-bit
+        if not 11 <= p <= 18:
+            raise ValueError(f'precision of distinct sketch should be in [11, 18], got {p}')
+        self.p = p
+        self.registers = np.zeros(2 ** p, dtype=np.uint8)
+
+    @classmethod
+    def from_values(cls, values, p: int = DEFAULT_DISTINCT_SKETCH_P):
+        sketch = cls(p)
+        sketch.update(values)
+        return sketch
+
+    def update(self, values):
+        """
+        add the values into the sketch, the null values are skipped
+        :param values: the array-like values
+        :return: the sketch itself
+        """
+        values = pd.Series(values).dropna()
+        if not len(values):
+            return self
+        # the numbers of different dtypes are counted by value
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            values = values.astype('float64')
+        hashed = pd.util.hash_array(values.to_numpy())
+        rest_bits = 64 - self.p
+        indexes = (hashed >> np.uint64(rest_bits)).astype(np.int64)
+        rests = hashed & np.uint64((1 << rest_bits) - 1)
+        ranks = (rest_bits + 1 - np.frexp(rests.astype(np.float64))[1]).astype(np.uint8)
+        np.maximum.at(self.registers, indexes, ranks)
+        return self
+
+    def merge(self, other):
+        """
+        merge the other sketch into this sketch
+        :param other: the other sketch of the same precision
+        :return: the sketch itself
+        """
+        if other.p != self.p:
+            raise ValueError(f'can not merge distinct sketches of precision {self.p} and {other.p}')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """
+        estimate the distinct count of the values
+        :return: the estimated distinct count
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
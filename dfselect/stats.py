@@ -0,0 +1,136 @@
+from typing import NamedTuple, Any, Optional
+
+from .parse.ast import Column, Literal, UnaryOp, BinaryOp, InList, IsNull, Between
+from .plan import BoundColumn, split_conjuncts, join_conjuncts
+
+# the default selectivities of the predicates without the column statistics
+_DEFAULT_EQ_SELECTIVITY = 0.005
+_DEFAULT_RANGE_SELECTIVITY = 1 / 3
+_DEFAULT_BETWEEN_SELECTIVITY = 1 / 9
+_DEFAULT_LIKE_SELECTIVITY = 0.1
+_DEFAULT_SELECTIVITY = 0.5
+
+
+class ColumnStats(NamedTuple):
+    # the fraction of the null values in the column
+    null_fraction: float
+    # the estimated distinct count of the non-null values
+    distinct_count: int
+    # the min and max of the non-null values, None if the values are not numeric or datetime. the stats may be
+    # estimated by the engine, e.g. from a sample of the rows
+    min: Any
+    max: Any
+
+
+class TableStats(NamedTuple):
+    row_count: int
+    # the column stats by the column name
+    columns: dict
+    # whether the stats of all the columns are computed, the stats may be computed for the columns requested only
+    complete: bool = True
+
+    def column(self, name: str) -> Optional[ColumnStats]:
+        return self.columns.get(name)
+
+
+def order_conjuncts(expr, columns: dict):
+    """
+    reorder the conjuncts of the filter expression by the estimated selectivity, the most selective first, so that
+    the engine evaluating the conjuncts in order filters out most of the rows by the first ones
+    :param expr: the (bound) filter expression
+    :param columns: the column stats by the column name
+    :return: the reordered filter expression
+    """
+    conjuncts = split_conjuncts(expr)
+    if len(conjuncts) < 2:
+        return expr
+    # the sort is stable, the conjuncts of the same selectivity are kept in the order of the query
+    return join_conjuncts(sorted(conjuncts, key=lambda conjunct: estimate_selectivity(conjunct, columns)))
+
+
+def estimate_selectivity(expr, columns: dict):
+    """
+    estimate the fraction of the rows matched by the predicate, by the column stats of the columns it compares to the
+    constants, the default selectivity is used for the column without stats and the other predicates
+    :param expr: the (bound) predicate expression
+    :param columns: the column stats by the column name
+    :return: the selectivity in [0, 1]
+    """
+    if isinstance(expr, BinaryOp) and expr.op == 'and':
+        return estimate_selectivity(expr.left, columns) * estimate_selectivity(expr.right, columns)
+    if isinstance(expr, BinaryOp) and expr.op == 'or':
+        left, right = estimate_selectivity(expr.left, columns), estimate_selectivity(expr.right, columns)
+        return left + right - left * right
+    if isinstance(expr, UnaryOp) and expr.op == 'not':
+        return 1 - estimate_selectivity(expr.operand, columns)
+    if isinstance(expr, IsNull):
+        stats = _column_stats(expr.operand, columns)
+        if stats is None:
+            return _DEFAULT_EQ_SELECTIVITY if not expr.negated else 1 - _DEFAULT_EQ_SELECTIVITY
+        return 1 - stats.null_fraction if expr.negated else stats.null_fraction
+    if isinstance(expr, InList):
+        selectivity = min(1.0, len(expr.items) * _eq_selectivity(_column_stats(expr.operand, columns)))
+        return 1 - selectivity if expr.negated else selectivity
+    if isinstance(expr, Between):
+        selectivity = _range_selectivity(_column_stats(expr.operand, columns), expr.low, expr.high)
+        if selectivity is None:
+            selectivity = _DEFAULT_BETWEEN_SELECTIVITY
+        return 1 - selectivity if expr.negated else selectivity
+    if isinstance(expr, BinaryOp) and expr.op == 'like':
+        return _DEFAULT_LIKE_SELECTIVITY
+    if isinstance(expr, BinaryOp) and expr.op in ('=', '!=', '<', '<=', '>', '>='):
+        op, operand, value = expr.op, expr.left, expr.right
+        if isinstance(operand, Literal):
+            # the constant on the left side, e.g. 3 < c
+            op = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}.get(op, op)
+            operand, value = value, operand
+        stats = _column_stats(operand, columns)
+        if op in ('=', '!='):
+            selectivity = _eq_selectivity(stats) if isinstance(value, Literal) else _DEFAULT_SELECTIVITY
+            return 1 - selectivity if op == '!=' else selectivity
+        low, high = (value, None) if op in ('>', '>=') else (None, value)
+        selectivity = _range_selectivity(stats, low, high)
+        return _DEFAULT_RANGE_SELECTIVITY if selectivity is None else selectivity
+    return _DEFAULT_SELECTIVITY
+
+
+def _column_stats(expr, columns: dict):
+    # the stats of the column reference, bound or not
+    if isinstance(expr, Column):
+        return columns.get(expr.full_name) or columns.get(expr.name)
+    if isinstance(expr, BoundColumn):
+        return columns.get(expr.name)
+    return None
+
+
+def _eq_selectivity(stats: ColumnStats):
+    if stats is None or not stats.distinct_count:
+        return _DEFAULT_EQ_SELECTIVITY if stats is None else 0.0
+    return (1 - stats.null_fraction) / stats.distinct_count
+
+
+def _range_selectivity(stats: ColumnStats, low, high):
+    """
+    the fraction of the non-null values in [low, high] by the linear interpolation over [min, max], None if the
+    bounds or the column are not numeric
+    """
+    if stats is None or not _is_number(stats.min) or not _is_number(stats.max):
+        return None
+    bounds = []
+    for bound, default in ((low, stats.min), (high, stats.max)):
+        if bound is None:
+            bounds.append(default)
+        elif isinstance(bound, Literal) and _is_number(bound.value):
+            bounds.append(bound.value)
+        else:
+            return None
+    low_value, high_value = max(bounds[0], stats.min), min(bounds[1], stats.max)
+    if low_value > high_value:
+        return 0.0
+    width = stats.max - stats.min
+    fraction = (high_value - low_value) / width if width > 0 else 1.0
+    return (1 - stats.null_fraction) * fraction
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,67 @@
+from .context import ctx_config_get_exec_engine, ctx_with_tables
+from .exec import exec_operators, exec_partial_aggregate
+from .log import log
+from .parse import parse_select, referenced_tables
+
+# the view of filter/project query, its result is appended by the result of the appended rows
+_VIEW_APPEND = 'append'
+# the view of aggregate query, its result is finalized from the partial states merged with the appended rows
+_VIEW_AGGREGATE = 'aggregate'
+# the view can not be maintained incrementally, its result is recomputed on every change
+_VIEW_RECOMPUTE = 'recompute'
+
+
+def materialize_view(ctx: dict, query: str):
+    """
+    materialize the view of a select query
+    :param ctx: the context object
+    :param query: the select query of the view
+    :return: the view object and the materialized result
+    """
+    operators = parse_select(query)
+    view = dict(query=query, operators=operators, tables=referenced_tables(operators), mode=_VIEW_RECOMPUTE,
+                aggregate=None)
+
+    op_codes = [op[0] for op in operators]
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    if {'JOIN', 'ORDER', 'LIMIT', 'WINDOW', 'DISTINCT'}.intersection(op_codes):
+        # the result of join (also the self-join), order, limit, window function or distinct depends on the whole
+        # table, the appended rows are joined with the rows before as well
+        return view, exec_operators(operators, ctx)
+
+    aggregate = exec_partial_aggregate(operators, ctx)
+    if aggregate is not None:
+        view.update(mode=_VIEW_AGGREGATE, aggregate=aggregate)
+        return view, aggregate.finalize()
+
+    if 'GROUP' not in op_codes and hasattr(exec_engine, 'append'):
+        view['mode'] = _VIEW_APPEND
+    return view, exec_operators(operators, ctx)
+
+
+def maintain_view(ctx: dict, view: dict, result, table_key: str, appended_rows):
+    """
+    maintain the materialized view when a referenced table is changed
+    :param ctx: the context object
+    :param view: the view object
+    :param result: the current materialized result
+    :param table_key: the changed table key
+    :param appended_rows: the rows appended to the table, None if the table is replaced
+    :return: the maintained result, and the rows appended to the result (None if not maintained by appending)
+    """
+    if appended_rows is None or view['mode'] == _VIEW_RECOMPUTE:
+        log.debug(f'recompute view: {view["query"]}')
+        maintained_view, result = materialize_view(ctx, view['query'])
+        view.update(maintained_view)
+        return result, None
+    if len(appended_rows) == 0:
+        return result, appended_rows
+
+    exec_engine = ctx_config_get_exec_engine(ctx)
+    appended_ctx = ctx_with_tables(ctx, {table_key: appended_rows})
+    if view['mode'] == _VIEW_AGGREGATE:
+        view['aggregate'] = view['aggregate'].merge(exec_partial_aggregate(view['operators'], appended_ctx))
+        return view['aggregate'].finalize(), None
+
+    return exec_engine.append(result, exec_operators(view['operators'], appended_ctx))
+
@@ -32,19 +32,19 @@ setup(
 
     install_requires=['pandas'],
 
-    packages=find_packages('.'),
+    packages=find_packages('.', exclude=['tests', 'tests.*']),
     package_dir=({'dfselect': 'dfselect'}),
     zip_safe=False,
 
     include_package_data=True,
     package_data={'': ['*.json', '*.xml', '*.yml', '*.tpl']},
 
-    # entry_points={
-    #     'console_scripts': [
-    #         'parade = parade.cmdline:execute',
-    #     ],
-    # },
-    #
+    entry_points={
+        'console_scripts': [
+            'dfselect = dfselect.cli:main',
+        ],
+    },
+
     # extras_require={
     #     "feature": ["parade-feature"],
     #     "notebook": ["parade-notebook"],
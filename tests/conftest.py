@@ -0,0 +1,82 @@
+import pytest
+
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table, ctx_append_table, ctx_config_add_table_loader
+from tests.helpers import assert_same_rows
+
+
+class FeatureHarness(object):
+    """
+    the pair of contexts over the same tables to test a feature: the feature context has the feature enabled (the
+    table options of `ctx_add_table`, the config, or a context given by the test), the plain context has none, the
+    query results over both must be the same
+    """
+
+    def __init__(self, tables: dict, config: dict = None, loaded: bool = False, feature_ctx: dict = None,
+                 feature_tables: dict = None, **table_options):
+        """
+        :param tables: the tables by the table key
+        :param config: the config of the feature context
+        :param loaded: whether the feature context loads the tables by a table loader instead of registering them
+        :param feature_ctx: the feature context prepared by the test, the tables are registered to the plain one only
+        :param feature_tables: the tables of the feature context instead of the ones above, e.g. the chunk iterators
+        :param table_options: the options to register the tables of the feature context, see `ctx_add_table`
+        """
+        self.plain = ctx_init()
+        for table_key, df in tables.items():
+            ctx_add_table(self.plain, table_key, df)
+        if feature_ctx is not None:
+            self.feature = feature_ctx
+            return
+        self.feature = ctx_init(config=config)
+        feature_tables = feature_tables or tables
+        if loaded:
+            ctx_config_add_table_loader(self.feature, feature_tables.get)
+            return
+        for table_key, df in feature_tables.items():
+            ctx_add_table(self.feature, table_key, df, **table_options)
+
+    def append(self, table_key: str, rows):
+        ctx_append_table(self.feature, table_key, rows)
+        ctx_append_table(self.plain, table_key, rows)
+
+    def assert_same(self, query: str, plain_query: str = None, ordered: bool = False, normalize=None,
+                    check_dtype: bool = True):
+        """
+        assert the result of the query over the feature context is the same as over the plain context
+        :param query: the query over the feature context
+        :param plain_query: the query over the plain context, the same query if not provided
+        :param ordered: whether the rows are compared in order
+        :param normalize: the function to normalize both results before comparing, e.g. to decode the compacted dtypes
+        :param check_dtype: whether to compare the dtypes
+        :return: the result over the feature context
+        """
+        result = df_select(query, self.feature)
+        expected = df_select(plain_query or query, self.plain)
+        if normalize is not None:
+            result, expected = normalize(result), normalize(expected)
+        assert_same_rows(result, expected, ordered=ordered, check_dtype=check_dtype)
+        return result
+
+
+@pytest.fixture
+def feature_harness():
+    return FeatureHarness
+
+
+@pytest.fixture
+def spy(monkeypatch):
+    """
+    record the calls of a module function, e.g. `spy(pandas_engine, '_filter')`, the calls are of form (args, result)
+    """
+    def _spy(module, name: str):
+        calls = []
+        func = getattr(module, name)
+
+        def _recorded(*args, **kwargs):
+            result = func(*args, **kwargs)
+            calls.append((args, result))
+            return result
+        monkeypatch.setattr(module, name, _recorded)
+        return calls
+    return _spy
@@ -0,0 +1,13 @@
+import pandas as pd
+
+
+def assert_same_rows(result: pd.DataFrame, expected: pd.DataFrame, ordered: bool = False, check_dtype: bool = True):
+    """
+    assert the query results are of the same rows, in any order unless ordered, the index is ignored
+    """
+    assert list(result.columns) == list(expected.columns)
+    if not ordered:
+        result = result.sort_values(list(result.columns), ignore_index=True)
+        expected = expected.sort_values(list(expected.columns), ignore_index=True)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=check_dtype)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select, df_select_partial
+from dfselect.errors import DFSelectExecError
+from dfselect.sketch import DistinctSketch, QuantileSketch
+
+# the tolerances of several standard errors of the default sketch sizes
+DISTINCT_REL_ERROR = 0.05
+QUANTILE_RANK_ERROR = 0.02
+
+
+def _table(rows: int = 20000):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        'g': rng.integers(0, 3, rows),
+        'x': rng.integers(0, 5000, rows),
+        'v': rng.normal(size=rows),
+    })
+
+
+def _rank(values, estimate):
+    return np.mean(np.asarray(values) <= estimate)
+
+
+def test_distinct_sketch():
+    values = np.arange(50000)
+    assert abs(DistinctSketch.from_values(values).count() / 50000 - 1) < DISTINCT_REL_ERROR
+    # the small counts are exact by linear counting
+    assert DistinctSketch.from_values([3, 1, 2, 3, None, np.nan]).count() == 3
+    # the numbers of different dtypes are counted by value
+    assert DistinctSketch.from_values(pd.Series([1, 2, 3])).update(pd.Series([1.0, 2.0])).count() == 3
+
+    merged = DistinctSketch.from_values(values[::2]).merge(DistinctSketch.from_values(values[1::2]))
+    np.testing.assert_array_equal(merged.registers, DistinctSketch.from_values(values).registers)
+    with pytest.raises(ValueError):
+        DistinctSketch(11).merge(DistinctSketch(12))
+
+
+def test_quantile_sketch():
+    values = np.random.default_rng(2).normal(size=100000)
+    sketch = QuantileSketch.from_values(values)
+    assert sketch.n == len(values)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        assert abs(_rank(values, sketch.quantile(q)) - q) < QUANTILE_RANK_ERROR
+
+    merged = QuantileSketch.from_values(values[:30000]).merge(QuantileSketch.from_values(values[30000:]))
+    assert merged.n == len(values)
+    assert abs(_rank(values, merged.quantile(0.75)) - 0.75) < QUANTILE_RANK_ERROR
+
+    # the quantiles are exact until the first compaction, the nulls are skipped
+    assert QuantileSketch.from_values([4.0, np.nan, 1.0, 3.0, 2.0]).quantile(0.5) == 2.5
+    assert np.isnan(QuantileSketch().quantile())
+
+
+def test_approx_aggregates_by_group():
+    t = _table()
+    result = df_select('select g, approx_count_distinct(x) as c, approx_quantile(v, 0.9) as q from t group by g',
+                       t=t).set_index('g')
+    for g, group in t.groupby('g'):
+        assert abs(result.loc[g, 'c'] / group['x'].nunique() - 1) < DISTINCT_REL_ERROR
+        assert abs(_rank(group['v'], result.loc[g, 'q']) - 0.9) < QUANTILE_RANK_ERROR
+
+
+def test_approx_aggregates_of_table():
+    t = _table()
+    result = df_select('select approx_count_distinct(x) as c, approx_quantile(v) as q from t', t=t)
+    assert len(result) == 1
+    assert abs(result['c'][0] / t['x'].nunique() - 1) < DISTINCT_REL_ERROR
+    assert abs(_rank(t['v'], result['q'][0]) - 0.5) < QUANTILE_RANK_ERROR
+
+
+def test_merged_partials_same_as_whole():
+    t = _table()
+    query = 'select g, approx_count_distinct(x) as c from t group by g'
+    partials = [df_select_partial(query, t=t.iloc[i::3]) for i in range(3)]
+    # the merged distinct sketches are the same as the sketch of the whole table
+    pd.testing.assert_frame_equal(partials[0].merge(*partials[1:]).finalize().reset_index(drop=True),
+                                  df_select(query, t=t).reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize('query', [
+    'select approx_quantile(v, 2) as q from t',
+    'select approx_quantile(v, g) as q from t',
+])
+def test_invalid_quantile(query):
+    with pytest.raises(DFSelectExecError, match='approx_quantile'):
+        df_select(query, t=_table(10))
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select
+from tests.helpers import assert_same_rows
+
+T = pd.DataFrame({'a': [1, 2, 3, 4, 5, 6], 'b': [1.5, np.nan, 2.5, 0.5, 3.0, 1.0], 'g': ['x', 'y', 'x', 'y', 'x', None]})
+
+# the queries of the bound expressions, and the same computed by pandas
+CASES = [
+    ('select a + b * 2 as c from t', lambda t: pd.DataFrame({'c': t.a + t.b * 2})),
+    ('select a, b from t where a > 2 and b < 3', lambda t: t.loc[(t.a > 2) & (t.b < 3), ['a', 'b']]),
+    ("select a from t where g = 'x' or b is null", lambda t: t.loc[(t.g == 'x') | t.b.isna(), ['a']]),
+    ('select a, a % 4 as r from t where a between 2 and 5',
+     lambda t: t.loc[t.a.between(2, 5), ['a']].assign(r=t.a % 4)),
+    ('select a from t where a in (1, 3, 9)', lambda t: t.loc[t.a.isin([1, 3, 9]), ['a']]),
+    ('select coalesce(b, 9) as b from t', lambda t: t[['b']].fillna(9.0)),
+    ("select a, case when a > 3 then 'hi' else 'lo' end as c from t",
+     lambda t: t[['a']].assign(c=np.where(t.a > 3, 'hi', 'lo'))),
+    ('select g, sum(a) as s, count(*) + 1 as n, avg(b) as m from t group by g',
+     lambda t: t.groupby('g').agg(s=('a', 'sum'), n=('a', 'size'), m=('b', 'mean')).reset_index()
+     .assign(n=lambda r: r.n + 1)),
+    ('select g, max(a * 2) as x from t where b > 1 group by g',
+     lambda t: t[t.b > 1].assign(x=t.a * 2).groupby('g').agg(x=('x', 'max')).reset_index()),
+    ('select max(a) - min(a) as r, min(b) as m from t',
+     lambda t: pd.DataFrame({'r': [t.a.max() - t.a.min()], 'm': [t.b.min()]})),
+]
+
+
+@pytest.mark.parametrize('query, compute', CASES, ids=[c[0] for c in CASES])
+def test_bound_same_as_pandas(query, compute):
+    assert_same_rows(df_select(query, t=T), compute(T), check_dtype=False)
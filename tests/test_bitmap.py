@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas as pandas_engine
+
+QUERIES = [
+    'select i from t where k = 2',
+    'select i from t where 2 != k',
+    'select i from t where k in (1, 3, 7)',
+    'select i from t where k not in (1, 3)',
+    'select i from t where not (k = 1 or k = 2)',
+    'select i from t where k = 1.0 and i > 2',
+    "select i from t where s = 'b'",
+    "select i from t where s != 'b'",
+    "select i from t where s not in ('a', 'z')",
+    'select i from t where s is null',
+    'select i from t where s is not null and k != 3',
+    'select i from t where f = 0.5 or f != 1.5',
+    "select i from t where d = '2024-01-02'",
+    "select i from t where d != '2024-01-02' or s in ('c')",
+]
+
+
+def _table():
+    return pd.DataFrame({
+        'i': np.arange(10),
+        'k': [1, 2, 3, 1, 2, 3, 1, 2, 3, 1],
+        's': ['a', 'b', None, 'c', 'b', 'a', None, 'c', 'b', 'a'],
+        'f': [0.5, np.nan, 1.5, 0.5, 1.5, np.nan, 0.5, 0.5, 1.5, 0.5],
+        'd': pd.to_datetime(['2024-01-01', '2024-01-02', None, '2024-01-02', '2024-01-01'] * 2),
+    })
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_bitmap_same_as_plain(query, feature_harness):
+    harness = feature_harness({'t': _table()}, bitmap_columns=['k', 's', 'f', 'd'])
+    harness.assert_same(query)
+
+    # the appended rows of a new value and of nulls
+    harness.append('t', pd.DataFrame({'i': [10, 11, 12], 'k': [7, 2, 1], 's': ['z', None, 'b'],
+                                      'f': [np.nan, 2.5, 0.5], 'd': pd.to_datetime([None, '2024-01-03', '2024-01-02'])}))
+    harness.assert_same(query)
+
+
+@pytest.mark.parametrize('query, residual_rows', [
+    ('select i from t where k in (1, 3, 7)', None),
+    ("select i from t where s = 'b' and k != 3", None),
+    # the conjunct of the column not indexed is evaluated over the rows matched by the bitmaps only
+    ('select i from t where k = 1 and i > 2', 4),
+])
+def test_bitmaps_used(query, residual_rows, feature_harness, spy):
+    by_bitmaps, filtered = spy(pandas_engine, 'filter_by_bitmaps'), spy(pandas_engine, '_filter')
+    feature_harness({'t': _table()}, bitmap_columns=['k', 's']).assert_same(query)
+    assert len(by_bitmaps) == 1
+    # the filter of the plain table is the last one
+    assert [len(args[0]) for args, _ in filtered[:-1]] == ([] if residual_rows is None else [residual_rows])
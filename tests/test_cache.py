@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+import dfselect
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table, ctx_set_config, ctx_load_table, \
+    ctx_tables
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    "select k, v from t where s = 'a b'",
+    "select k, v from t where s = 'a  b'",
+    "select   k, v from t  where s = 'a b' ;",
+    'select s, sum(v) as v from t group by s',
+    'select k from t where v > 1 order by k desc limit 2',
+]
+
+
+def _table():
+    return pd.DataFrame({'k': [1, 2, 3], 'v': [1, 2, 3], 's': ['a b', 'a  b', 'c']})
+
+
+def _ctx(result_cache: bool):
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', _table())
+    ctx_set_config(ctx, 'result_cache', result_cache)
+    return ctx
+
+
+def test_cached_results_same_as_uncached(feature_harness):
+    harness = feature_harness({'t': _table()}, config={'result_cache': True})
+    for _ in range(2):
+        for query in QUERIES:
+            harness.assert_same(query)
+    harness.append('t', pd.DataFrame({'k': [4], 'v': [4], 's': ['a b']}))
+    for query in QUERIES:
+        harness.assert_same(query)
+
+
+def test_string_literal_blanks_not_shared():
+    ctx = _ctx(True)
+    assert df_select("select v from t where s = 'a b'", ctx)['v'].tolist() == [1]
+    assert df_select("select v from t where s = 'a  b'", ctx)['v'].tolist() == [2]
+
+
+def test_unseeded_sample_not_cached():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', pd.DataFrame({'k': range(1000)}))
+    ctx_set_config(ctx, 'result_cache', True)
+    samples = [df_select('select k from t tablesample (10 percent)', ctx)['k'].tolist() for _ in range(3)]
+    assert samples[0] != samples[1] or samples[1] != samples[2]
+
+    query = 'select k from t tablesample (10 percent) repeatable (7)'
+    assert df_select(query, ctx)['k'].tolist() == df_select(query, ctx)['k'].tolist()
+
+
+def test_hit_skips_parsing(monkeypatch):
+    ctx = _ctx(True)
+    query = 'select k from t where v > 1'
+    expected = df_select(query, ctx)
+
+    def parse_select(_):
+        raise AssertionError('parsed on cache hit')
+
+    monkeypatch.setattr(dfselect, 'parse_select', parse_select)
+    assert_same_rows(df_select(query, ctx), expected)
+    assert_same_rows(df_select('select  k  from t where v > 1;', ctx), expected)
+
+
+def test_result_config_in_key(monkeypatch):
+    ctx = _ctx(True)
+    runs = []
+    exec_operators = dfselect.exec_operators
+    monkeypatch.setattr(dfselect, 'exec_operators', lambda *args: runs.append(1) or exec_operators(*args))
+    query = 'select k from t'
+    df_select(query, ctx)
+    df_select(query, ctx)
+    assert len(runs) == 1
+    ctx_set_config(ctx, 'compact_dtypes', True)
+    df_select(query, ctx)
+    assert len(runs) == 2
+
+
+@pytest.mark.parametrize('alias_replace', [True, False])
+def test_load_table_alias_replace(alias_replace):
+    ctx = _ctx(False)
+    df = ctx_tables(ctx)['t']
+    kwargs = {} if alias_replace else {'alias_replace': False}
+    assert ctx_load_table(ctx, 't', 'x', **kwargs) is df
+    assert ('t' not in ctx_tables(ctx)) == alias_replace
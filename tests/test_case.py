@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas.expr as expr_module
+import dfselect.exec.pandas.udf as udf_repo
+from dfselect import df_select
+
+# the case expressions, and their values computed row by row of (a, b, g), a null condition never matches
+CASES = [
+    ("case when a > 2 then 'big' when a > 0 then 'small' else 'neg' end",
+     lambda a, b, g: 'big' if a > 2 else 'small' if a > 0 else 'neg'),
+    ("case g when 'x' then 1 when 'y' then 2 end",
+     lambda a, b, g: 1 if g == 'x' else 2 if g == 'y' else None),
+    ('case when a > 1 and b < 20 then b * 2 when b is null then -1 else a end',
+     lambda a, b, g: b * 2 if a > 1 and b < 20 else -1 if b != b else a),
+    ("case when a > 2 then 'big' else a end",
+     lambda a, b, g: 'big' if a > 2 else a),
+    ('if(a > 1, b, 0)',
+     lambda a, b, g: b if a > 1 else 0),
+    ("if(a > 3, 'x', if(a > 1, 'y', case when b > 15 then 'z' end))",
+     lambda a, b, g: 'x' if a > 3 else 'y' if a > 1 else 'z' if b > 15 else None),
+    ("case when g = 'x' then a when 1 = 1 then b when a > 0 then 0 end",
+     lambda a, b, g: a if g == 'x' else b),
+]
+
+
+def _table():
+    return pd.DataFrame({
+        'a': [0, 1, 2, 3, 4, np.nan, -1],
+        'b': [10.0, 20.0, np.nan, 5.0, 25.0, 30.0, 15.0],
+        'g': ['x', 'y', 'z', None, 'x', 'y', 'z'],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+
+
+def _same_value(value, expected):
+    if expected is None or (isinstance(expected, float) and np.isnan(expected)):
+        return value is None or pd.isna(value)
+    return value == expected
+
+
+@pytest.mark.parametrize('case, reference', CASES)
+def test_same_as_row_by_row(case, reference, monkeypatch):
+    calls = []
+    select = np.select
+    monkeypatch.setattr(expr_module.np, 'select', lambda *args: calls.append(1) or select(*args))
+    udf = udf_repo.udf_IF
+    monkeypatch.setattr(udf_repo, 'udf_IF', lambda *args: calls.append('udf') or udf(*args))
+
+    t = _table()
+    result = df_select(f'select a, {case} as c from t', t=t)
+    # the null numbers are nan to the reference, the comparisons of nan are false as the null conditions
+    expected = [reference(a, b, None if pd.isna(g) else g) for a, b, g in zip(t['a'], t['b'], t['g'])]
+    assert all(_same_value(v, e) for v, e in zip(result['c'].tolist(), expected)), (result['c'].tolist(), expected)
+    # the nested branches are selected at once, never by the udf row by row
+    assert calls == [1]
+
+
+def test_filtered_rows_keep_index():
+    result = df_select("select a, case when a > 2 then 'big' else 'small' end as c from t where b > 12",
+                       t=_table())
+    assert result['c'].tolist() == ['small', 'big', 'small', 'small']
+
+
+def test_numeric_without_else():
+    result = df_select('select case when a > 2 then a end as c from t', t=_table())
+    assert result['c'].dtype.kind == 'f'
+    assert result['c'].isna().tolist() == [True, True, True, False, False, True, True]
+
+
+def test_constant_conditions():
+    result = df_select("select case when 1 = 2 then 'never' else g end as c from t", t=_table())
+    assert result['c'].tolist()[:3] == ['x', 'y', 'z']
+    result = df_select("select if(1 > 0, 'all', g) as c from t", t=_table())
+    assert result['c'].tolist() == ['all'] * 7
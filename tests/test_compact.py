@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas as pandas_engine
+
+QUERIES = [
+    'select * from t',
+    # the arithmetic of the downcast integers must not overflow
+    'select a * 1000 as x, c * c * c * c * c as y, -c as z, a + c as w from t',
+    'select g, sum(c * 1000) as s, sum(a) as a, avg(c) as m from t group by g',
+    'select i, sum(c) over (partition by g order by i) as s from t',
+    'select q + 1 as q, coalesce(q, 9) as r from t where q is not null or a > 100',
+    "select i, s from t where s < 'b' or s >= 'x'",
+    "select i from t where s between 'ab' and 'b_c' and g in ('u', 'w')",
+    "select i, case when s > 'b' then 'hi' else 'lo' end as k from t",
+    'select distinct g, s from t',
+    'select g, s, count(*) as n from t group by g, s',
+    'select i, s, g from t order by s desc, g, i limit 9',
+    "select i from t where o = 3 or f",
+]
+
+
+def _table():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame({
+        'i': np.arange(n),
+        'a': rng.integers(-120, 120, n),
+        'c': np.append(rng.integers(0, 127, n - 2), [127, -128]),
+        'q': np.where(rng.random(n) < 0.2, np.nan, rng.integers(0, 50, n)),
+        'o': pd.Series(rng.integers(0, 5, n), dtype=object),
+        'f': pd.Series(rng.random(n) < 0.5, dtype=object),
+        's': rng.choice(['a', 'ab', 'b', 'b_c', 'x', 'zz'], n),
+        'g': rng.choice(['u', 'v', 'w'], n),
+    })
+
+
+def _normalized(df: pd.DataFrame):
+    """
+    convert the compacted columns of the result back: the categoricals to the strings, the (nullable) numbers to the
+    floats, the nullable bools to the bools
+    """
+    columns = dict()
+    for name, values in df.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.cat.categories.dtype)
+        elif pd.api.types.is_bool_dtype(values.dtype) or pd.api.types.infer_dtype(values) == 'boolean':
+            values = values.astype(bool)
+        elif pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.infer_dtype(values) == 'integer':
+            values = values.astype('float64')
+        columns[name] = values.reset_index(drop=True)
+    return pd.DataFrame(columns)
+
+
+def _harness(feature_harness):
+    return feature_harness({'t': _table()}, config={'compact_dtypes': True}, loaded=True)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_compact_same_as_plain(query, feature_harness):
+    _harness(feature_harness).assert_same(query, ordered='order by' in query and 'over' not in query,
+                                          normalize=_normalized)
+
+
+def test_loaded_table_compacted(feature_harness, spy):
+    compacted = spy(pandas_engine, 'compact_frame')
+    _harness(feature_harness).assert_same('select i from t where c > 100', normalize=_normalized)
+    assert len(compacted) == 1
+    (table,), df = compacted[0]
+    assert df['c'].dtype == np.int8 and df['a'].dtype == np.int8 and df['i'].dtype == np.int16
+    assert isinstance(df['g'].dtype, pd.CategoricalDtype)
+    assert df.memory_usage(deep=True).sum() < table.memory_usage(deep=True).sum() / 2
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select
+from tests.helpers import assert_same_rows
+
+# the queries of form (columns, filter and order clauses, limit, offset), selected with distinct, and without
+# distinct deduplicated by pandas
+CASES = [
+    ('a, b', '', None, 0),
+    ('b', 'where a > 1', None, 0),
+    ('a', 'order by a desc', 2, 0),
+    ('b, c', 'order by c, b', 3, 2),
+    ('c', '', 2, 0),
+    ('a, c', 'where b is not null', 1, 5),
+    ('b', 'order by b', 10, 0),
+]
+
+
+def _table():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'a': rng.integers(0, 4, 300).astype(float), 'b': rng.choice(['x', 'y', None], 300),
+                         'c': rng.integers(0, 50, 300)}).mask(rng.random((300, 3)) < 0.05)
+
+
+def _chunks():
+    table = _table()
+    return iter([table.iloc[start:start + 32] for start in range(0, len(table), 32)])
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+@pytest.mark.parametrize('columns, clauses, limit, offset', CASES)
+def test_distinct_same_as_drop_duplicates(columns, clauses, limit, offset, chunked, feature_harness):
+    harness = feature_harness({'t': _table()}, feature_tables={'t': _chunks()} if chunked else None)
+    tail = '' if limit is None else f' limit {offset}, {limit}'
+    query = f'select distinct {columns} from t {clauses}{tail}'
+    selected = df_select(f'select {columns} from t {clauses}', harness.plain)
+    expected = selected.drop_duplicates().iloc[offset:None if limit is None else offset + limit]
+    result = df_select(query, harness.feature)
+    ordered = 'order by' in clauses
+    if limit is not None and not ordered:
+        # any distinct rows are returned under the limit without order
+        assert len(result) == len(expected)
+        assert not result.duplicated().any()
+        expected = selected.merge(result).drop_duplicates()
+    assert_same_rows(result, expected, ordered=ordered)
+
+
+def test_distinct_limit_stops_early():
+    read = []
+
+    def _read_chunks():
+        for chunk in _chunks():
+            read.append(len(chunk))
+            yield chunk
+
+    result = df_select('select distinct a from t limit 3', t=_read_chunks())
+    assert len(result) == 3
+    # the distinct values are found in the first chunk, the chunks after it are never read
+    assert len(read) == 1
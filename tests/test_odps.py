@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+odps_engine = pytest.importorskip('dfselect.exec.odps')
+
+
+class _Collection(object):
+    """
+    the collection of the rows in memory, sliced and deduplicated as the odps collection
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    def __getitem__(self, item):
+        assert isinstance(item, slice) and item.step is None
+        return _Collection(self.df.iloc[item])
+
+    def distinct(self):
+        return _Collection(self.df.drop_duplicates())
+
+
+@pytest.mark.parametrize('limit', [(0, 5), (10, 5), (3, 100)])
+def test_limit_offset(limit):
+    df = pd.DataFrame({'a': range(30)})
+    from_idx, count = limit
+    assert odps_engine.exec_LIMIT(_Collection(df), {}, *limit).df.equals(df.iloc[from_idx:from_idx + count])
+
+
+def test_distinct_limit_offset():
+    df = pd.DataFrame({'a': [i // 2 for i in range(40)]})
+    result = odps_engine.exec_DISTINCT(_Collection(df), {}, (10, 5)).df
+    assert result['a'].tolist() == [10, 11, 12, 13, 14]
+
+
+def test_first_loader_wins():
+    from dfselect.context import ctx_init, ctx_config_add_table_loader
+    ctx = ctx_init()
+    called = []
+    first, second = _Collection(pd.DataFrame({'a': [1]})), _Collection(pd.DataFrame({'a': [2]}))
+    ctx_config_add_table_loader(ctx, lambda table_key: called.append('first') or first)
+    ctx_config_add_table_loader(ctx, lambda table_key: called.append('second') or second)
+    assert odps_engine.exec_LOAD(None, ctx, ('t', 't')) is first
+    assert called == ['first']
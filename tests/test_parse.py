@@ -0,0 +1,92 @@
+import pytest
+
+from dfselect.errors import DFSelectParseError
+from dfselect.parse import parse_select
+from dfselect.parse.ast import Column, Literal, BinaryOp, Case, TableSample
+from dfselect.parse.parser import parse_select_ast
+
+
+@pytest.mark.parametrize('query, table, alias', [
+    ('select * from t', 't', 't'),
+    ('select * from db.tbl', 'db.tbl', 'tbl'),
+    ('select * from `my table` as x', 'my table', 'x'),
+    ('select * from @ext_table', '@ext_table', 'ext_table'),
+    ('select id from @mysql-dev.hogwarts.institution_admin as a', '@mysql-dev.hogwarts.institution_admin', 'a'),
+    ('select id from @mysql-dev.db-2.t u', '@mysql-dev.db-2.t', 'u'),
+])
+def test_table_ref(query, table, alias):
+    assert parse_select(query)[0] == ('LOAD', [(table, alias)])
+
+
+def test_joined_table_ref():
+    operators = parse_select('select a.id from @mysql-dev.h.t1 as a left join @mysql-dev.h.t2 u on a.id = u.id')
+    assert operators[1][0] == 'JOIN'
+    assert operators[1][1][:2] == (('@mysql-dev.h.t2', 'u'), 'LEFT')
+
+
+def test_dash_of_blanks_is_not_table_name():
+    with pytest.raises(DFSelectParseError):
+        parse_select('select * from a - b')
+    # the subtraction of the expressions is kept
+    assert parse_select('select a-b as c from t')[1][1][0][0].op == '-'
+
+
+@pytest.mark.parametrize('query, sample', [
+    ('select * from t tablesample (10 percent)', TableSample(10.0, 'PERCENT', None)),
+    ('select * from t as x tablesample (5 rows) repeatable (7)', TableSample(5, 'ROWS', 7)),
+])
+def test_table_sample(query, sample):
+    assert parse_select_ast(query).table.sample == sample
+    assert parse_select(query)[0][1][1] == tuple(sample)
+
+
+def test_window():
+    operators = parse_select('select a, row_number() over (partition by g order by v desc) as rn, '
+                             'lag(v, 1, 0) over (order by v) as p from t')
+    assert operators[1] == ('WINDOW', [
+        ('row_number', [], [Column(None, 'g', 'g')], [(Column(None, 'v', 'v'), False)], 'rn'),
+        ('lag', [Column(None, 'v', 'v'), 1, 0], [], [(Column(None, 'v', 'v'), True)], 'p'),
+    ])
+    # the window columns are projected by their aliases
+    assert [alias for _, alias in operators[2][1]] == ['a', 'rn', 'p']
+
+
+def test_case():
+    expr = parse_select_ast("select case g when 1 then 'a' when 2 then 'b' end as c from t").items[0].expr
+    assert isinstance(expr, Case)
+    assert [c.op for c in expr.conditions] == ['=', '=']
+    assert [r.value for r in expr.results] == ['a', 'b']
+    assert expr.default == Literal(None, 'NULL')
+
+    expr = parse_select_ast('select case when a > 1 then 1 else 0 end from t').items[0].expr
+    assert expr.conditions == (BinaryOp('>', Column(None, 'a', 'a'), Literal(1, '1'), 'a > 1'),)
+    assert expr.default == Literal(0, '0')
+
+
+@pytest.mark.parametrize('query, message', [
+    ('select a from t where a = #', "invalid character '#' at position 26"),
+    ('select a, from t', "near 'from' at position 10"),
+    ('select a from t,u', "near ',' at position 15"),
+    ('select a from t limit 1 limit 2', "duplicated LIMIT clause near '2' at position 30"),
+    ('select a from t tablesample (200 percent)', 'out of range'),
+    ('select a from t tablesample (5 blocks)', "invalid table sample, use 'n PERCENT' or 'n ROWS'"),
+    ('select a from t join u tablesample (5 rows) on t.a = u.a', 'on the major table only'),
+])
+def test_error_position(query, message):
+    with pytest.raises(DFSelectParseError, match=message):
+        parse_select(query)
+
+
+@pytest.mark.parametrize('query, message', [
+    ('select a from t having a > 1', 'having-clause is not supported'),
+    ('select a from t union select a from u', 'only single select query'),
+    ('select a from (select a from t)', 'sub-query is not supported'),
+    ('select a from t where a in (select a from u)', 'sub-query is not supported'),
+    ('select a from t cross join u', 'cross join is not supported'),
+    ('select count(distinct a) from t', 'distinct in function call is not supported'),
+    ('select g, row_number() over (order by g) as r from t group by g', 'not supported in aggregation'),
+    ('select a from t limit -1', 'invalid limit size'),
+])
+def test_rejected(query, message):
+    with pytest.raises(DFSelectParseError, match=message):
+        parse_select(query)
@@ -0,0 +1,66 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select, df_select_partial
+from dfselect.context import ctx_init, ctx_config_add_table_loader
+from dfselect.exec.pandas.chunked import ChunkedFrame
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    'select g, max(v) as m, min(v) as n from t group by g',
+    'select g, min(d) as d, max(s) as s from t group by g',
+    'select g, sum(v) * 2 as s, count(*) + 1 as n from t group by g',
+    'select g, max(v) - min(v) as r, avg(v) as a, count(v) as c from t group by g',
+    'select max(v) as m, min(s) as s, sum(v) / count(*) as a from t',
+    'select g, max(v * 2) as m, sum(v + 1) as s from t where v > 1 group by g',
+]
+
+
+def _table():
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame({
+        'g': rng.choice(['a', 'b', 'c', None], n),
+        'v': np.where(rng.random(n) < 0.1, np.nan, rng.integers(-50, 50, n)),
+        's': rng.choice(['x', 'y', 'z'], n),
+        'd': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 100, n), unit='D'),
+    })
+
+
+def _chunks():
+    table = _table()
+    return iter([table.iloc[start:start + 64] for start in range(0, len(table), 64)])
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_chunked_same_as_in_memory(query, monkeypatch):
+    expected = df_select(query, t=_table())
+
+    # the chunked table is aggregated chunk by chunk, never collected into memory
+    def _to_frame(self):
+        raise AssertionError('the chunked table is collected')
+    monkeypatch.setattr(ChunkedFrame, 'to_frame', _to_frame)
+    assert_same_rows(df_select(query, t=_chunks()), expected)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_merged_partials_same_as_in_memory(query):
+    table = _table()
+    partials = [pickle.loads(pickle.dumps(df_select_partial(query, t=table.iloc[start:start + 100])))
+                for start in range(0, len(table), 100)]
+    assert_same_rows(partials[0].merge(*partials[1:]).finalize(), df_select(query, t=table))
+
+
+def test_chunk_loader_not_cached(tmp_path):
+    path = tmp_path / 't.csv'
+    _table().to_csv(path, index=False)
+    ctx = ctx_init(config={'loader_cache': True})
+    ctx_config_add_table_loader(ctx, lambda table_key: pd.read_csv(path, chunksize=64) if table_key == 't' else None)
+    query = 'select count(*) as n, max(v) as m from t'
+    expected = df_select(query, t=_table())
+    assert_same_rows(df_select(query, ctx), expected)
+    # the chunks of the loader are read again, instead of the exhausted iterator
+    assert_same_rows(df_select(query, ctx), expected)
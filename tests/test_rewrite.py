@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.parse as parse_module
+from dfselect import df_select
+from dfselect.parse import parse_select
+from dfselect.parse.ast import Column, Literal, BinaryOp, InList, Case
+from dfselect.parse.parser import parse_select_ast
+from dfselect.parse.rewrite import simplify_expr
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    'select a, 1 + 2 * 3 as c, a * (4 - 2) as d from t',
+    "select a, 'x' || 1 as s from t where 2 > 1",
+    'select a from t where a = 1 or a = 3 or b > 5 or 2 = a',
+    'select a from t where a in (1, 2) or a = 4 or not (1 = 1)',
+    'select a from t where (b = 1 or b = 2) and true and a is not null',
+    'select a from t where 1 = 2 or a between 2 - 1 and 1 + 2',
+    'select a, case when 1 > 2 then a when b > 2 then b when 1 = 1 then 0 else 9 end as c from t',
+    'select a, case when false then a else -b end as c from t order by 0 - b, a',
+    'select a, a / (2 - 2) as c from t',
+]
+
+
+def _expr(expr_text: str):
+    return simplify_expr(parse_select_ast(f'select {expr_text} from t').items[0].expr)
+
+
+def _table():
+    return pd.DataFrame({'a': [1, 2, 3, 4, np.nan], 'b': [5, 6, 1, 2, 3]})
+
+
+def test_fold_constants():
+    assert _expr('1 + 2 * 3') == Literal(7, '1 + 2 * 3')
+    assert _expr("'a' || 1") == Literal('a1', "'a' || 1")
+    assert _expr('-(2 - 5)').value == 3
+    assert _expr('2 between 1 and 3').value is True
+    assert _expr('3 in (1, 2)').value is False
+    assert _expr('null is null').value is True
+    # the folded operand is kept in place
+    assert _expr('a + (1 + 1)') == BinaryOp('+', Column(None, 'a', 'a'), Literal(2, '(1 + 1)'), 'a + (1 + 1)')
+
+
+@pytest.mark.parametrize('expr_text', ['1 / 0', '1 % 0', "'a' + 1", 'null = 1'])
+def test_unfolded(expr_text):
+    # the operations failing or comparing null are computed by the engine
+    assert isinstance(_expr(expr_text), BinaryOp)
+
+
+def test_merge_or_into_in_list():
+    expr = _expr('a = 1 or b = 2 or 3 = a or a in (1, 4) or b > 1')
+    assert expr.left.left == InList(Column(None, 'a', 'a'), (Literal(1, '1'), Literal(3, '3'), Literal(4, '4')),
+                                    False, 'a in (1, 3, 4)')
+    assert expr.left.right.text == 'b = 2'
+    assert expr.right.text == 'b > 1'
+    # the original text is kept for the column alias
+    assert expr.text == 'a = 1 or b = 2 or 3 = a or a in (1, 4) or b > 1'
+    # the equalities of different operands are not merged
+    assert _expr('a = 1 or b = 1').op == 'or'
+
+
+def test_and_or_with_constants():
+    assert _expr('a > 1 and 1 = 1').text == 'a > 1'
+    assert _expr('a > 1 and 1 = 2').value is False
+    assert _expr('a > 1 or 1 = 1').value is True
+    assert _expr('a > 1 or 1 = 2').text == 'a > 1'
+
+
+def test_prune_case_branches():
+    expr = _expr('case when 1 > 2 then a when b > 0 then b when 1 = 1 then 0 else 9 end')
+    assert isinstance(expr, Case)
+    assert [c.text for c in expr.conditions] == ['b > 0']
+    assert expr.default.value == 0
+    assert _expr('case when false then a else b end') == Column(None, 'b', 'b')
+    assert _expr('case when null then a end').value is None
+
+
+def test_always_true_filter_dropped():
+    assert [op_code for op_code, _ in parse_select('select a from t where 1 = 1 or a > 1')] == ['LOAD', 'PROJECT']
+    assert [op_code for op_code, _ in parse_select('select a from t where 1 = 2')] == ['LOAD', 'FILTER', 'PROJECT']
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_as_unfolded(query, monkeypatch):
+    result = df_select(query, t=_table())
+    monkeypatch.setattr(parse_module, 'simplify_expr', lambda expr: expr)
+    assert_same_rows(result, df_select(query, t=_table()), check_dtype=False)
@@ -0,0 +1,181 @@
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from dfselect.cli import main, file_table_loader
+from dfselect.context import ctx_init, ctx_add_table, ctx_config_add_table_loader
+from dfselect.server import make_server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path: str):
+        super().__init__('localhost')
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def _ctx():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', pd.DataFrame({'k': [1, 2, 3], 's': ['a', 'b', 'c']}))
+    return ctx
+
+
+def _start(ctx: dict, **kwargs):
+    server = make_server(ctx, port=0, **kwargs)
+    threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05), daemon=True).start()
+    return server
+
+
+def _stop(server):
+    server.shutdown()
+    server.shutdown_pool()
+    server.server_close()
+
+
+@pytest.fixture
+def server():
+    server = _start(_ctx())
+    yield server
+    _stop(server)
+
+
+def _request(conn, method: str, path: str, body=None, headers: dict = None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def _conn(server):
+    return http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+
+
+def test_query(server):
+    status, body = _request(_conn(server), 'POST', '/query', 'select k, s from t where k > 1')
+    assert status == 200
+    assert json.loads(body) == dict(columns=['k', 's'], data=[[2, 'b'], [3, 'c']])
+
+    status, body = _request(_conn(server), 'POST', '/query', json.dumps(dict(query='select count(*) as c from t')),
+                            {'Content-Type': 'application/json'})
+    assert status == 200 and json.loads(body)['data'] == [[3]]
+
+
+def test_tables_and_health(server):
+    status, body = _request(_conn(server), 'GET', '/tables')
+    assert status == 200
+    assert json.loads(body)['tables'][0]['name'] == 't'
+    assert [c['name'] for c in json.loads(body)['tables'][0]['columns']] == ['k', 's']
+    assert _request(_conn(server), 'GET', '/health') == (200, b'{"status": "ok"}')
+
+
+@pytest.mark.parametrize('method, path, body, headers, status', [
+    ('GET', '/nothing', None, None, 404),
+    ('POST', '/tables', 'select k from t', None, 404),
+    ('POST', '/query', 'select k frm t', None, 400),
+    ('POST', '/query', 'select x from t', None, 400),
+    ('POST', '/query', 'select k from missing', None, 400),
+    ('POST', '/query', '  ', None, 400),
+    ('POST', '/query?format=csv', 'select k from t', None, 400),
+    ('POST', '/query', '[1]', {'Content-Type': 'application/json'}, 400),
+])
+def test_error_status(server, method, path, body, headers, status):
+    reply_status, reply = _request(_conn(server), method, path, body, headers)
+    assert reply_status == status
+    assert 'error' in json.loads(reply)
+
+
+def test_arrow_result(server):
+    status, body = _request(_conn(server), 'POST', '/query?format=arrow', 'select k from t')
+    if importlib.util.find_spec('pyarrow') is None:
+        assert status == 406
+    else:
+        import pyarrow as pa
+        assert status == 200
+        assert pa.ipc.open_stream(body).read_all().column('k').to_pylist() == [1, 2, 3]
+
+
+def test_busy_rejected():
+    started, release = threading.Event(), threading.Event()
+
+    def _blocking_loader(table_source):
+        started.set()
+        release.wait(10)
+        return pd.DataFrame({'k': [1]})
+
+    ctx = _ctx()
+    ctx_config_add_table_loader(ctx, _blocking_loader)
+    server = _start(ctx, workers=1, max_pending=0)
+    try:
+        replies = []
+        blocked = threading.Thread(
+            target=lambda: replies.append(_request(_conn(server), 'POST', '/query', 'select k from slow')))
+        blocked.start()
+        assert started.wait(10)
+        assert _request(_conn(server), 'POST', '/query', 'select k from t')[0] == 503
+        release.set()
+        blocked.join(10)
+        assert replies[0][0] == 200
+        # the slot is released once the query is done
+        assert _request(_conn(server), 'POST', '/query', 'select k from t')[0] == 200
+    finally:
+        release.set()
+        _stop(server)
+
+
+def test_unix_socket(tmp_path):
+    socket_path = str(tmp_path / 'dfselect.sock')
+    server = _start(_ctx(), socket_path=socket_path)
+    try:
+        status, body = _request(_UnixConnection(socket_path), 'POST', '/query', 'select s from t where k = 2')
+        assert status == 200 and json.loads(body)['data'] == [['b']]
+    finally:
+        _stop(server)
+
+
+def test_file_table_loader(tmp_path):
+    pd.DataFrame({'k': [1, 2]}).to_csv(tmp_path / 'u.csv', index=False)
+    loader = file_table_loader(str(tmp_path))
+    assert loader('u')['k'].tolist() == [1, 2]
+    assert loader('missing') is None
+
+
+def test_cli_invalid_table():
+    with pytest.raises(SystemExit):
+        main(['serve', '--table', 'no-path'])
+
+
+def test_cli_serve(tmp_path):
+    pd.DataFrame({'k': [1, 2, 3]}).to_csv(tmp_path / 't.csv', index=False)
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    pd.DataFrame({'k': [2, 3], 'w': [20, 30]}).to_csv(data_dir / 'u.csv', index=False)
+    socket_path = str(tmp_path / 'cli.sock')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, '-m', 'dfselect', 'serve', '--socket', socket_path,
+                                '--table', f't={tmp_path / "t.csv"}', '--data-dir', str(data_dir),
+                                '--result-cache'], cwd=root)
+    try:
+        deadline = time.time() + 30
+        while not os.path.exists(socket_path):
+            assert process.poll() is None and time.time() < deadline
+            time.sleep(0.05)
+        for _ in range(2):
+            status, body = _request(_UnixConnection(socket_path), 'POST', '/query',
+                                    'select t.k, u.w from t join u on t.k = u.k')
+            assert status == 200
+            assert json.loads(body)['data'] == [[2, 20], [3, 30]]
+    finally:
+        process.terminate()
+        process.wait(10)
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+import dfselect.exec as exec_module
+import dfselect.exec.pandas.udf as udf_repo
+from dfselect import df_select
+from dfselect.parse import parse_select
+from dfselect.parse.ast import Column
+from dfselect.plan import share_common_exprs
+from tests.helpers import assert_same_rows
+
+SCHEMA = [('a', 'int64'), ('b', 'int64'), ('g', 'int64')]
+
+# the queries calling f(a, b) more than once, and the count of the rows to call it on, the call shared is computed
+# once per row
+QUERIES = [
+    ('select f(a, b) as x, f(a, b) * 2 as y from t', 6),
+    ('select a, f(a, b) as x from t order by f(a, b) desc, a', 6),
+    ('select f(a, b) + 1 as x from t where a > 1 order by f(a, b), a', 5),
+    ('select g, sum(f(a, b)) as s, max(f(a, b)) as m, avg(f(a, b)) + 1 as v from t group by g', 6),
+    ('select a, sum(f(a, b)) over (partition by g order by a) as s, f(a, b) as x from t order by f(a, b), a', 6),
+    ('select a, f(t.a, b) as x, f(a, t.b) as y from t', 6),
+]
+# the queries left as they are, their results would include the hidden columns, or the window column shadows the
+# loaded column
+UNSHARED_QUERIES = [
+    'select * from t order by a + b, a + b',
+    'select a + b as x, sum(b) over (order by a) as a, a + b as y from t',
+]
+
+
+def _table():
+    return pd.DataFrame({'a': [1, 2, 3, 4, 5, 6], 'b': [5, 4, 3, 2, 1, 1], 'g': [1, 1, 2, 2, 2, 3]})
+
+
+def _count_udf(monkeypatch):
+    calls = []
+    udf = udf_repo.udf_F
+    monkeypatch.setattr(udf_repo, 'udf_F', lambda a, b: calls.append(1) or udf(a, b))
+    return calls
+
+
+def _unshared(monkeypatch):
+    bind_operators = exec_module.bind_operators
+    monkeypatch.setattr(exec_module, 'bind_operators',
+                        lambda operators, schema, share_exprs=False: bind_operators(operators, schema))
+
+
+def test_shared_by_key():
+    operators = share_common_exprs(parse_select('select t.a + b as x, (a+b)*2 as y from t order by a + b')[1:],
+                                   SCHEMA)
+    assert [op_code for op_code, _ in operators] == ['EXTEND', 'ORDER', 'PROJECT']
+    assert [name for _, name in operators[0][1]] == ['__common_0']
+    assert operators[1][1][0][0] == Column(None, '__common_0', 'a + b')
+    assert operators[2][1][0][0] == Column(None, '__common_0', 't.a + b')
+
+
+@pytest.mark.parametrize('query, rows', QUERIES)
+def test_computed_once(query, rows, monkeypatch):
+    calls = _count_udf(monkeypatch)
+    result = df_select(query, t=_table())
+    assert len(calls) == rows
+    assert not [c for c in result.columns if c.startswith('__common_')]
+
+    _unshared(monkeypatch)
+    calls.clear()
+    assert_same_rows(result, df_select(query, t=_table()), ordered='order by' in query)
+    assert len(calls) > rows
+
+
+@pytest.mark.parametrize('query', UNSHARED_QUERIES)
+def test_left_unshared(query, monkeypatch):
+    operators = parse_select(query)[1:]
+    assert share_common_exprs(operators, SCHEMA) == operators
+    result = df_select(query, t=_table())
+    assert not [c for c in result.columns if c.startswith('__common_')]
+    _unshared(monkeypatch)
+    assert_same_rows(result, df_select(query, t=_table()), ordered=True)
@@ -0,0 +1,108 @@
+import multiprocessing
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table, ctx_publish_tables, ctx_unpublish_tables, ctx_attach_catalog
+from dfselect.errors import DFSelectContextError
+from dfselect.exec.pandas.shared import attach_table
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    'select * from t',
+    'select s, sum(i) as i, max(f) as f, min(d) as d from t where b group by s',
+    'select c, count(*) as n from t group by c',
+    'select t.i, u.w from t join u on t.i = u.i',
+]
+
+
+def _tables():
+    return {
+        't': pd.DataFrame({
+            'i': np.arange(6, dtype='int64'),
+            'f': [0.5, np.nan, 1.5, 2.5, 3.5, 4.5],
+            'd': pd.date_range('2024-01-01', periods=6),
+            'b': [True, False, True, True, False, True],
+            's': ['a', 'b', None, 'a', 'b', 'c'],
+            'c': pd.Categorical(['x', 'y', 'x', 'x', 'y', 'y']),
+        }),
+        'u': pd.DataFrame({'i': [1, 3, 5], 'w': [10, 30, 50]}, index=[7, 8, 9]),
+    }
+
+
+def _query_attached(catalog: str, query: str):
+    # run in a worker process, the tables are not registered but attached from the catalog
+    ctx = ctx_init()
+    ctx_attach_catalog(ctx, catalog)
+    return df_select(query, ctx)
+
+
+def _inspect_attached(catalog: str, table_key: str):
+    df = attach_table(catalog, table_key)
+    if df is None:
+        return None
+    values = df['i'].to_numpy()
+    return df, not values.flags.writeable and not values.flags.owndata, attach_table(catalog, table_key) is df
+
+
+@pytest.fixture
+def catalog():
+    ctx = ctx_init()
+    for key, df in _tables().items():
+        ctx_add_table(ctx, key, df)
+    catalog = f'test-{uuid.uuid4().hex[:8]}'
+    ctx_publish_tables(ctx, catalog)
+    yield catalog, ctx
+    ctx_unpublish_tables(ctx, catalog, list(_tables()))
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_query_in_other_process(catalog, pool, query):
+    catalog, ctx = catalog
+    result = pool.apply(_query_attached, (catalog, query))
+    assert_same_rows(result, df_select(query, ctx))
+
+
+def test_attached_without_copy(catalog, pool):
+    catalog, _ = catalog
+    df, is_view, reused = pool.apply(_inspect_attached, (catalog, 't'))
+    assert is_view and reused
+    pd.testing.assert_frame_equal(df, _tables()['t'])
+    # the non-default index is kept
+    df, _, _ = pool.apply(_inspect_attached, (catalog, 'u'))
+    pd.testing.assert_frame_equal(df, _tables()['u'])
+
+
+def test_published_again(catalog, pool):
+    catalog, ctx = catalog
+    assert pool.apply(_query_attached, (catalog, 'select count(*) as n from t'))['n'][0] == 6
+    ctx_add_table(ctx, 't', _tables()['t'].iloc[:2], replace=True)
+    ctx_publish_tables(ctx, catalog, ['t'])
+    # the process attached to the old table sees the new one
+    assert pool.apply(_query_attached, (catalog, 'select count(*) as n from t'))['n'][0] == 2
+
+
+def test_unpublished(catalog, pool):
+    catalog, ctx = catalog
+    ctx_unpublish_tables(ctx, catalog, ['u'])
+    assert pool.apply(_inspect_attached, (catalog, 'u')) is None
+    with pytest.raises(DFSelectContextError):
+        pool.apply(_query_attached, (catalog, 'select * from u'))
+
+
+def test_invalid_publish():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', _tables()['t'])
+    with pytest.raises(DFSelectContextError):
+        ctx_publish_tables(ctx, 'bad/name', ['t'])
+    with pytest.raises(DFSelectContextError):
+        ctx_publish_tables(ctx, 'test', ['missing'])
@@ -0,0 +1,138 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select
+from dfselect.context import ctx_init
+from dfselect.sink import CallbackSink, CsvSink, write_sink
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    'select * from t',
+    'select i, v * 2 as w from t where v > 3',
+    "select i, s from t where s = 'b' or i < 3",
+    'select i from t where v > 100',
+    'select s, sum(v) as v from t group by s',
+    'select i, v from t order by v desc, i limit 7',
+]
+
+
+def _table():
+    return pd.DataFrame({'i': np.arange(20), 'v': np.arange(20) % 7 * 1.5, 's': list('abcd') * 5})
+
+
+def _chunks():
+    table = _table()
+    return iter([table.iloc[start:start + 6] for start in range(0, len(table), 6)])
+
+
+def _harness(feature_harness, chunked: bool):
+    return feature_harness({'t': _table()}, feature_tables={'t': _chunks()} if chunked else None)
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+@pytest.mark.parametrize('query', QUERIES)
+def test_callback_sink_same_as_result(query, chunked, feature_harness):
+    harness = _harness(feature_harness, chunked)
+    batches = []
+    rows = df_select(query, harness.feature, sink=CallbackSink(batches.append, batch_rows=4))
+    expected = df_select(query, harness.plain)
+    assert rows == len(expected)
+    assert batches and all(len(batch) <= 4 for batch in batches)
+    assert_same_rows(pd.concat(batches), expected, ordered='order by' in query)
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+@pytest.mark.parametrize('query', QUERIES)
+def test_csv_sink_same_as_result(query, chunked, feature_harness):
+    harness = _harness(feature_harness, chunked)
+    buffer = io.StringIO()
+    df_select(query, harness.feature, sink=CsvSink(buffer, batch_rows=4))
+    expected = df_select(query, harness.plain)
+    # the header is written once, even for the empty result
+    written = pd.read_csv(io.StringIO(buffer.getvalue()), dtype=expected.dtypes.to_dict())
+    assert_same_rows(written, expected, ordered='order by' in query)
+
+
+def test_chunks_streamed_into_sink():
+    read, read_at_batches = [], []
+
+    def _read_chunks():
+        for chunk in _chunks():
+            read.append(len(chunk))
+            yield chunk
+
+    rows = df_select('select i, v from t where v > 1', t=_read_chunks(),
+                     sink=CallbackSink(lambda batch: read_at_batches.append(len(read)), batch_rows=4))
+    assert rows == len(df_select('select i, v from t where v > 1', t=_table()))
+    # the batches are written as the chunks are read, the whole result is never collected
+    assert len(read_at_batches) > len(read)
+    assert read_at_batches[0] == 1 and read_at_batches == sorted(read_at_batches)
+
+
+def test_cached_result_written_into_sink(monkeypatch):
+    import dfselect
+    ctx = ctx_init(tables={'t': _table()}, config={'result_cache': True})
+    query = 'select i, v from t where v > 3'
+    expected = df_select(query, ctx)
+
+    # the cached result is written without executing the query again
+    def _exec_operators(*args):
+        raise AssertionError('the cached query is executed')
+    monkeypatch.setattr(dfselect, 'exec_operators', _exec_operators)
+    batches = []
+    assert df_select(query, ctx, sink=CallbackSink(batches.append, batch_rows=4)) == len(expected)
+    assert len(batches) == -(-len(expected) // 4)
+    assert_same_rows(pd.concat(batches), expected)
+
+
+def test_odps_result_read_page_by_page(monkeypatch):
+    odps_engine = pytest.importorskip('dfselect.exec.odps')
+    rows = [[i, f'n{i}'] for i in range(10)]
+    reads, dropped = [], []
+
+    class _Record(object):
+        def __init__(self, values):
+            self.values = values
+
+    class _Reader(object):
+        count = len(rows)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def read(self, start, count):
+            reads.append((start, count))
+            return [_Record(r) for r in rows[start:start + count]]
+
+    class _Table(object):
+        schema = type('_Schema', (), {'columns': [type('_Column', (), {'name': n}) for n in ('i', 's')]})
+
+        def open_reader(self):
+            return _Reader()
+
+        def drop(self):
+            dropped.append(True)
+
+    class _Odps(object):
+        def get_table(self, name):
+            assert name.startswith('tmp_dfselect_sink_')
+            return _Table()
+
+    class _Collection(object):
+        def persist(self, name, lifecycle, odps):
+            assert lifecycle == 1 and isinstance(odps, _Odps)
+
+    monkeypatch.setattr(odps_engine, 'CollectionExpr', _Collection)
+    monkeypatch.setattr(odps_engine, '_o', _Odps())
+    batches = []
+    assert write_sink(odps_engine.output_batches(_Collection(), 4), CallbackSink(batches.append)) == len(rows)
+    assert reads == [(0, 4), (4, 4), (8, 2)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert pd.concat(batches, ignore_index=True).equals(pd.DataFrame(rows, columns=['i', 's']))
+    assert dropped
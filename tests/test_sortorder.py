@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas as pandas_engine
+
+QUERIES = [
+    'select i, v from t where i >= 3 and i < 7',
+    'select i, v from t where 4 > i',
+    'select i, v from t where i = 5 and v > 0',
+    'select i, v from t where i between 2 and 4 or i = 8',
+    'select i, v from t where i > 2.5 and i <= 6.0',
+    'select i, v from t where i < 99999999999',
+    'select i, f from t where f between 0.25 and 1.25',
+    "select i, s from t where s >= 'c' and s < 'f'",
+    "select i, d from t where d > '2024-01-03'",
+]
+ORDERED_QUERIES = [
+    'select i, v from t order by i',
+    'select i, v from t where i > 1 order by i limit 3',
+    'select i, s from t order by s desc, i',
+]
+
+
+def _table():
+    return pd.DataFrame({
+        'i': [1, 2, 2, 3, 4, 5, 6, 7, 8, 9],
+        'v': [5, -1, 3, 0, 2, 9, -4, 1, 1, 7],
+        'f': [0.0, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.25],
+        's': list('abcdeffghi'),
+        'd': pd.date_range('2024-01-01', periods=10),
+    })
+
+
+@pytest.mark.parametrize('sorted_by', [['i', 'f', 's', 'd'], True])
+@pytest.mark.parametrize('query', QUERIES + ORDERED_QUERIES)
+def test_sorted_same_as_plain(query, sorted_by, feature_harness):
+    harness = feature_harness({'t': _table()}, sorted_by=sorted_by)
+    ordered = query in ORDERED_QUERIES
+    harness.assert_same(query, ordered=ordered)
+
+    # the rows appended in order keep the columns sorted, the out-of-order rows do not
+    for rows in (pd.DataFrame({'i': [9, 10], 'v': [0, 3], 'f': [2.5, 2.75], 's': ['i', 'j'],
+                               'd': pd.to_datetime(['2024-01-11', '2024-01-12'])}),
+                 pd.DataFrame({'i': [0], 'v': [4], 'f': [-1.0], 's': ['a'], 'd': pd.to_datetime(['2023-12-31'])})):
+        harness.append('t', rows)
+        harness.assert_same(query, ordered=ordered)
+
+
+@pytest.mark.parametrize('query', [
+    'select i, v from t where i >= 3 and i < 7',
+    "select i, s from t where s >= 'c' and s < 'f'",
+    "select i, d from t where d > '2024-01-03'",
+])
+def test_range_sliced(query, feature_harness, spy):
+    sliced, filtered = spy(pandas_engine, 'slice_sorted'), spy(pandas_engine, '_filter')
+    feature_harness({'t': _table()}, sorted_by=True).assert_same(query)
+    # the range of the sorted column is sliced by binary search, the filter is evaluated over the plain table only
+    assert len(sliced) == 1 and sliced[0][1][1] is None
+    assert len(filtered) == 1
+
+
+def test_order_of_sorted_skipped(feature_harness, spy):
+    checked, sort_keys = spy(pandas_engine, 'is_sorted'), spy(pandas_engine, '_get_sort_keys')
+    feature_harness({'t': _table()}, sorted_by=['i']).assert_same('select i, v from t order by i', ordered=True)
+    # the order of the sorted table is known, only the plain table is checked, neither is sorted again
+    assert len(checked) == 1 and not sort_keys
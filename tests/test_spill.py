@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas as pandas_engine
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table
+from tests.helpers import assert_same_rows
+
+# the budget of a few rows, the tables below are spilled
+MEMORY_BUDGET = 512
+
+ORDERED_QUERIES = [
+    'select k, v from l order by v, k',
+    'select k, v from l order by v desc, k',
+    'select k, v, s from l order by s, k desc',
+    'select k, v from l where v > 3 order by v * -1, k limit 7',
+]
+JOIN_QUERIES = [
+    'select l.k, l.v, r.w from l {} join r on l.k = r.k',
+    'select l.k, l.v, r.w from l {} join r on l.k = r.k and l.s = r.s',
+    'select l.k, l.v, r.w from l {} join r on l.f = r.k',
+]
+
+
+def _left():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'k': np.arange(60) % 23,
+        'v': rng.integers(0, 10, 60),
+        'f': (np.arange(60) % 31).astype('float64'),
+        's': [f's{i % 3}' for i in range(60)],
+    })
+
+
+def _right(rows: int):
+    return pd.DataFrame({
+        'k': np.arange(rows) * 2 % 29,
+        'w': np.arange(rows) * 10,
+        's': [f's{i % 2}' for i in range(rows)],
+    })
+
+
+def _ctxs(tmp_path, right_rows: int = 40):
+    spilled = ctx_init(config={'memory_budget': MEMORY_BUDGET, 'spill_dir': str(tmp_path)})
+    plain = ctx_init()
+    for ctx in (spilled, plain):
+        ctx_add_table(ctx, 'l', _left())
+        ctx_add_table(ctx, 'r', _right(right_rows))
+    return spilled, plain
+
+
+@pytest.mark.parametrize('query', ORDERED_QUERIES)
+def test_external_sort_same_as_memory(query, tmp_path, spy):
+    calls = spy(pandas_engine, 'external_sort')
+    spilled, plain = _ctxs(tmp_path)
+    assert_same_rows(df_select(query, spilled), df_select(query, plain), ordered=True)
+    assert calls
+
+
+@pytest.mark.parametrize('how', ['inner', 'left', 'right', 'full'])
+@pytest.mark.parametrize('query', JOIN_QUERIES)
+def test_grace_hash_join_same_as_memory(query, how, tmp_path, spy):
+    calls = spy(pandas_engine, 'grace_hash_join')
+    spilled, plain = _ctxs(tmp_path)
+    query = query.format(how)
+    assert_same_rows(df_select(query, spilled), df_select(query, plain))
+    assert calls
+
+
+@pytest.mark.parametrize('how', ['inner', 'left'])
+@pytest.mark.parametrize('query', JOIN_QUERIES)
+def test_broadcast_hash_join_same_as_memory(query, how, tmp_path, spy):
+    calls = spy(pandas_engine, 'broadcast_hash_join')
+    # the join table fits in half of the budget, the other one is joined against it chunk by chunk
+    spilled, plain = _ctxs(tmp_path, right_rows=4)
+    query = query.format(how)
+    assert_same_rows(df_select(query, spilled), df_select(query, plain))
+    assert calls and calls[0][0][-1] == 'right'
+
+
+def test_spill_files_removed(tmp_path):
+    spilled, _ = _ctxs(tmp_path)
+    result = df_select('select l.k, r.w from l join r on l.k = r.k order by l.k', spilled)
+    assert len(result) and not list(tmp_path.iterdir())
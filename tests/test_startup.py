@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+# the modules `import dfselect` must not import, they are imported by the first query of the engine
+LAZY_MODULES = ('pandas', 'odps', 'sqlparse')
+# the budget of `import dfselect` in milliseconds, loose enough for the slow CI machines
+IMPORT_BUDGET_MS = 300
+
+
+def _import_times():
+    """
+    import dfselect in a fresh interpreter with `-X importtime`
+    :return: the dict of the imported module name to its cumulative import time in microseconds
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import dfselect'], cwd=root,
+                            check=True, capture_output=True, text=True).stderr
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_is_lazy():
+    times = _import_times()
+    assert 'dfselect' in times
+    eager = sorted(name for name in times if name.split('.')[0] in LAZY_MODULES)
+    assert not eager, f'`import dfselect` imports {eager} eagerly'
+
+
+def test_import_within_budget():
+    # the best of a few runs, to be robust to the noise of the machine
+    import_ms = min(_import_times()['dfselect'] for _ in range(3)) / 1000
+    assert import_ms < IMPORT_BUDGET_MS, f'`import dfselect` takes {import_ms:.1f}ms'
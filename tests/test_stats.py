@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec as exec_module
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table, ctx_append_table, ctx_table_stats
+from dfselect.parse.parser import parse_select_ast
+from dfselect.plan import split_conjuncts
+from dfselect.stats import ColumnStats, order_conjuncts, estimate_selectivity
+from tests.helpers import assert_same_rows
+
+QUERIES = [
+    "select k, s from t where s like 'x%' and k = 7 and v > 0.5",
+    "select k from t where v between 0.1 and 0.2 and g = 'b' and k is not null",
+    "select k from t where (g = 'a' or g = 'c') and k < 100 and not v > 0.9",
+    "select t.k, u.w from t join u on t.g = u.g where u.k > 1 and t.k = 3 and t.s like '%1'",
+    "select g, count(*) as c from t where k > 10 and g != 'a' and v is null group by g",
+]
+
+
+def _table(rows: int = 1000):
+    rng = np.random.default_rng(3)
+    v = rng.random(rows)
+    v[::10] = np.nan
+    return pd.DataFrame({
+        'k': np.arange(rows),
+        'g': [('a', 'b', 'c')[i % 3] for i in range(rows)],
+        's': [f'x{i}' if i % 4 else f'y{i}' for i in range(rows)],
+        'v': v,
+    })
+
+
+def _ctx():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', _table())
+    ctx_add_table(ctx, 'u', pd.DataFrame({'g': ['a', 'b', 'd'], 'k': [1, 2, 3], 'w': [10, 20, 30]}))
+    return ctx
+
+
+def _where(query: str):
+    return parse_select_ast(query).where
+
+
+def test_table_stats():
+    ctx = _ctx()
+    stats = ctx_table_stats(ctx, 't')
+    assert stats.row_count == 1000 and stats.complete
+    assert stats.column('k') == ColumnStats(0.0, 1000, 0, 999)
+    assert stats.column('g') == ColumnStats(0.0, 3, None, None)
+    assert stats.column('v').null_fraction == 0.1 and stats.column('v').distinct_count == 900
+    # the stats are kept in context until the table changes
+    assert ctx_table_stats(ctx, 't') is stats
+    ctx_append_table(ctx, 't', _table(10))
+    assert ctx_table_stats(ctx, 't', compute=False) is None
+    assert ctx_table_stats(ctx, 't').row_count == 1010
+    assert ctx_table_stats(ctx, 'missing') is None
+
+
+def test_table_stats_of_columns():
+    ctx = _ctx()
+    stats = ctx_table_stats(ctx, 't', ['k'])
+    assert list(stats.columns) == ['k'] and not stats.complete
+    stats = ctx_table_stats(ctx, 't', ['g'])
+    assert list(stats.columns) == ['k', 'g']
+    assert ctx_table_stats(ctx, 't').complete
+
+
+def test_sampled_stats_of_large_table():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', pd.DataFrame({'k': np.arange(100000), 'g': np.arange(100000) % 50}))
+    stats = ctx_table_stats(ctx, 't')
+    assert stats.row_count == 100000
+    # the unique column is estimated as unique, the column of few values is counted from the sample
+    assert stats.column('k').distinct_count == 100000
+    assert stats.column('g').distinct_count == 50
+
+
+def test_order_conjuncts():
+    stats = ctx_table_stats(_ctx(), 't')
+    expr = order_conjuncts(_where("select k from t where s like 'x%' and g = 'b' and k = 7 and v > 0.5"),
+                           stats.columns)
+    assert expr.text == "k = 7 and s like 'x%' and g = 'b' and v > 0.5"
+    assert estimate_selectivity(_where('select k from t where k < 100'), stats.columns) == pytest.approx(0.1, 0.01)
+    assert estimate_selectivity(_where('select k from t where v is null'), stats.columns) == 0.1
+    # the conjuncts of the same selectivity are kept in the order of the query
+    expr = _where('select k from t where a = 1 and b = 2')
+    assert order_conjuncts(expr, dict()) == expr
+
+
+def test_filter_reordered(monkeypatch):
+    ordered = []
+    order_func = exec_module.order_conjuncts
+    monkeypatch.setattr(exec_module, 'order_conjuncts',
+                        lambda expr, columns: ordered.append(order_func(expr, columns)) or ordered[-1])
+    df_select(QUERIES[0], _ctx())
+    assert [c.text for c in split_conjuncts(ordered[0])] == ['k = 7', "s like 'x%'", 'v > 0.5']
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_same_as_unordered(query, monkeypatch):
+    ctx = _ctx()
+    result = df_select(query, ctx)
+    assert ctx_table_stats(ctx, 't', compute=False) is not None
+    monkeypatch.setattr(exec_module, '_order_filter_conjuncts', lambda bound_cmds, source_cmds, ctx: bound_cmds)
+    assert_same_rows(result, df_select(query, _ctx()))
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas.store as store_module
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table, ctx_save_tables, ctx_attach_store
+
+QUERIES = [
+    'select * from t',
+    "select i, s from t where s = 'a' or f > 1",
+    "select i from t where s > 'a' and s != 'c'",
+    "select i, s from t where s in ('b', 'q') or s is null",
+    'select s, count(*) as n, sum(f) as f from t group by s',
+    "select i, d from t where d >= '2024-01-02' and b",
+    'select n, max(i) as i from t where n is not null group by n',
+    'select distinct s from t',
+    'select i, s from t order by s desc, i limit 4',
+]
+
+
+def _table():
+    return pd.DataFrame({
+        'i': np.arange(8),
+        'f': [0.5, np.nan, 1.5, 2.5, np.nan, 0.0, 1.0, 2.0],
+        's': ['a', 'b', None, 'a', 'c', 'b', 'b', 'a'],
+        'b': [True, False, True, True, False, False, True, False],
+        'd': pd.to_datetime(['2024-01-01', None, '2024-01-02', '2024-01-03'] * 2),
+        'n': pd.array([1, None, 3, 1, None, 3, 1, 2], dtype='Int64'),
+    })
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', _table())
+    ctx_save_tables(ctx, str(tmp_path))
+    return str(tmp_path)
+
+
+def _store_ctx(store_dir: str, decode_strings: bool):
+    ctx = ctx_init()
+    ctx_attach_store(ctx, store_dir, decode_strings=decode_strings)
+    return ctx
+
+
+@pytest.mark.parametrize('decode_strings', [False, True])
+@pytest.mark.parametrize('query', QUERIES)
+def test_store_same_as_memory(store_dir, query, decode_strings, feature_harness):
+    harness = feature_harness({'t': _table()}, feature_ctx=_store_ctx(store_dir, decode_strings))
+    harness.assert_same(query, ordered='order by' in query, normalize=_in_memory)
+
+
+@pytest.mark.parametrize('decode_strings', [False, True])
+def test_columns_mapped(store_dir, decode_strings, spy):
+    opened = spy(store_module, 'open_table_store')
+    df_select('select i from t where i > 1', _store_ctx(store_dir, decode_strings))
+    assert len(opened) == 1
+    table = opened[0][1]
+    # the numeric columns are mapped from the files instead of read into memory
+    for name in ('i', 'f', 'b', 'd'):
+        values = table[name].to_numpy()
+        while not isinstance(values, np.memmap) and values.base is not None:
+            values = values.base
+        assert isinstance(values, np.memmap), name
+    # the string column is a categorical over the mapped codes unless decoded
+    assert isinstance(table['s'].dtype, pd.CategoricalDtype) != decode_strings
+
+
+def test_store_round_trip(store_dir):
+    ctx = ctx_init()
+    ctx_attach_store(ctx, store_dir, decode_strings=True)
+    pd.testing.assert_frame_equal(_in_memory(df_select('select * from t', ctx)), _table())
+
+
+def _in_memory(df: pd.DataFrame):
+    """
+    copy the mapped columns of the result into memory, and decode the string columns loaded as categoricals
+    """
+    columns = dict()
+    for name, values in df.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.cat.categories.dtype)
+        elif isinstance(values.dtype, np.dtype):
+            values = pd.Series(np.array(values), index=values.index)
+        columns[name] = values
+    return pd.DataFrame(columns)
@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+import dfselect.view as view_module
+from dfselect import df_select
+from dfselect.context import ctx_create_view
+
+# the view queries, and whether the view is maintained from the appended rows instead of recomputed
+VIEW_QUERIES = [
+    ('select k, v from t where v > 15', True),
+    ('select k, sum(v) as s, count(*) as n from t group by k', True),
+    ('select a.k, a.v, b.v as w from t as a join t as b on a.k = b.k', False),
+    ('select k, v from t order by v desc limit 2', False),
+    ('select distinct k from t', False),
+]
+
+
+@pytest.mark.parametrize('query, incremental', VIEW_QUERIES)
+def test_view_maintained_as_recomputed(query, incremental, feature_harness, spy):
+    harness = feature_harness({'t': pd.DataFrame({'k': [1, 2, 3], 'v': [10, 20, 30]})})
+    ctx_create_view(harness.feature, 'v', query)
+    recomputed = spy(view_module, 'materialize_view')
+    harness.append('t', pd.DataFrame({'k': [2, 3], 'v': [40, 50]}))
+
+    harness.assert_same('select * from v', plain_query=query, check_dtype=False)
+    assert len(recomputed) == (0 if incremental else 1)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dfselect import df_select
+from tests.helpers import assert_same_rows
+
+WINDOWS = [
+    '',
+    'partition by g',
+    'order by o',
+    'order by o desc',
+    'partition by g order by o',
+    'partition by g order by o desc, h',
+]
+# the ranking and offset functions are computed over the ordered windows only
+RANK_FUNCS = ['row_number()', 'rank()', 'dense_rank()', 'lag(v)', 'lead(v)', 'lag(v, 2)', 'lead(v, 1, -1)',
+              'lag(v, 2, 0)']
+AGG_FUNCS = ['sum(v)', 'count(v)', 'count(*)', 'avg(v)', 'min(v)', 'max(v)']
+
+
+def _table():
+    return pd.DataFrame({
+        'i': range(12),
+        'g': ['a', 'b', 'a', None, 'b', 'a', 'c', None, 'a', 'b', 'c', 'a'],
+        'o': [3, 1, 1, 2, 1, 3, 5, 2, 2, 4, 5, 1],
+        'h': [1, 2, 2, 1, 1, 0, 1, 2, 1, 2, 0, 1],
+        'v': [1.0, 2.0, np.nan, 4.0, 5.0, 6.0, np.nan, 8.0, 9.0, np.nan, np.nan, 12.0],
+    })
+
+
+def _parse_window(window: str):
+    partition_by, order_by = [], []
+    if window.startswith('partition by'):
+        partition_by = [window.split()[2]]
+    if 'order by' in window:
+        for item in window.split('order by')[1].split(','):
+            parts = item.split()
+            order_by.append((parts[0], len(parts) == 1 or parts[1] != 'desc'))
+    return partition_by, order_by
+
+
+def _reference(t: pd.DataFrame, func: str, window: str):
+    """
+    compute the window function row by row, the rows of the same order-by values are peers
+    """
+    partition_by, order_by = _parse_window(window)
+    name, args = func[:-1].split('(')
+    args = [a.strip() for a in args.split(',') if a.strip()]
+    values = []
+    for _, row in t.iterrows():
+        partition = t
+        if partition_by:
+            key = t[partition_by[0]]
+            partition = t[key.isna() if pd.isna(row[partition_by[0]]) else key == row[partition_by[0]]]
+        if order_by:
+            partition = partition.sort_values([c for c, _ in order_by], ascending=[a for _, a in order_by],
+                                              kind='mergesort')
+        order_keys = [tuple(r[c] for c, _ in order_by) for _, r in partition.iterrows()]
+        position = list(partition['i']).index(row['i'])
+        row_key = order_keys[position]
+        peers_end = max(p for p, k in enumerate(order_keys) if k == row_key) if order_by else len(partition) - 1
+        window_rows = partition.iloc[:peers_end + 1]
+
+        if name == 'row_number':
+            values.append(position + 1)
+        elif name == 'rank':
+            values.append(order_keys.index(row_key) + 1)
+        elif name == 'dense_rank':
+            values.append(len(set(order_keys[:order_keys.index(row_key)])) + 1)
+        elif name in ('lag', 'lead'):
+            offset = int(args[1]) if len(args) > 1 else 1
+            target = position - offset if name == 'lag' else position + offset
+            if 0 <= target < len(partition):
+                values.append(partition['v'].iloc[target])
+            else:
+                values.append(float(args[2]) if len(args) > 2 else np.nan)
+        elif args == ['*']:
+            values.append(len(window_rows))
+        else:
+            window_values = window_rows['v'].dropna()
+            if name == 'count':
+                values.append(len(window_values))
+            elif not len(window_values):
+                values.append(np.nan)
+            else:
+                values.append(dict(sum=np.sum, avg=np.mean, min=np.min, max=np.max)[name](window_values))
+    return pd.DataFrame({'i': t['i'], 'w': pd.Series(values, dtype='float64')})
+
+
+@pytest.mark.parametrize('func, window', [(f, w) for f in RANK_FUNCS for w in WINDOWS if 'order by' in w] +
+                         [(f, w) for f in AGG_FUNCS for w in WINDOWS])
+def test_same_as_reference(func, window):
+    t = _table()
+    result = df_select(f'select i, {func} over ({window}) as w from t', t=t)
+    expected = _reference(t, func, window)
+    assert_same_rows(result.astype({'w': 'float64'}), expected)
+
+
+def test_window_column_ordered_by_alias():
+    result = df_select('select i, row_number() over (order by o desc, i) as r from t order by r', t=_table())
+    assert result['r'].tolist() == list(range(1, 13))
+    assert result['i'].tolist() == [6, 10, 9, 0, 5, 3, 7, 8, 1, 2, 4, 11]
+
+
+def test_lag_default_not_filled_for_nulls():
+    # the default value fills the rows shifted out of the partition only, the null values are kept
+    result = df_select('select i, lag(v, 1, 0) over (order by i) as p from t', t=_table())
+    assert result['p'][:3].tolist() == [0, 1.0, 2.0]
+    assert np.isnan(result['p'][3])
+
+
+def test_sum_of_null_partition_is_null():
+    result = df_select('select i, sum(v) over (partition by g) as s from t where g = \'c\'', t=_table())
+    assert result['s'].isna().all()
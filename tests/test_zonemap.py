@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dfselect.exec.pandas as pandas_engine
+from dfselect import df_select
+from dfselect.context import ctx_init, ctx_add_table
+
+QUERIES = [
+    'select i, f from t where f != 1',
+    'select i, f from t where f = 1',
+    'select i, f from t where f > 1.5 or i < 2',
+    'select i, f from t where i between 3 and 5',
+    'select i, f from t where i in (0, 7)',
+    "select i, d from t where d < '2024-01-03'",
+    "select i, d from t where d != '2024-01-01'",
+]
+
+
+def _table():
+    return pd.DataFrame({
+        'i': np.arange(8),
+        'f': [1.0, np.nan, 1.0, 1.0, 2.0, 2.0, np.nan, np.nan],
+        'd': pd.to_datetime(['2024-01-01', None, '2024-01-01', '2024-01-01',
+                             '2024-01-03', '2024-01-04', '2024-01-05', None]),
+    })
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_pruned_same_as_plain(query, feature_harness):
+    harness = feature_harness({'t': _table()}, zone_map_block_rows=4)
+    harness.assert_same(query)
+
+    harness.append('t', pd.DataFrame({'i': [8, 9], 'f': [1.0, np.nan], 'd': pd.to_datetime(['2024-01-01', None])}))
+    harness.assert_same(query)
+
+
+@pytest.mark.parametrize('query, rows', [
+    # the block of f in [1, 1] is skipped by f = 2, the block of 2s and nulls by f = 1
+    ('select i from t where f = 2', 4),
+    ('select i from t where f = 1', 4),
+    ('select i from t where i < 2', 4),
+    ('select i from t where i between 3 and 5', 8),
+    ('select i from t where i > 10', 0),
+])
+def test_blocks_skipped(query, rows, feature_harness, spy):
+    calls = spy(pandas_engine, '_filter')
+    harness = feature_harness({'t': _table()}, zone_map_block_rows=4)
+    harness.assert_same(query)
+    # the filter of the zone-mapped table is evaluated on the rows of the blocks left only
+    assert [len(args[0]) for args, _ in calls] == [rows, 8]
+
+
+def test_not_equal_keeps_block_of_nulls():
+    ctx = ctx_init()
+    ctx_add_table(ctx, 't', pd.DataFrame({'f': [1.0, np.nan, 1.0, 1.0]}), zone_map_block_rows=4)
+    assert len(df_select('select f from t where f != 1', ctx)) == 1